@@ -0,0 +1,201 @@
+"""Benchmark the prompt-driven and the workflow-engine HITL orchestrators.
+
+Runs the same scripted conversation (plan -> reject -> approve by default)
+through hitl_agent's prompt-driven root agent and through WorkflowAgent
+(ORCHESTRATOR_MODE=workflow), with in-memory services and the usual runner
+plugins, and reports per mode: latency, model calls, prompt and output
+tokens, tool calls, and how many conversations ended finalized. Uses the real
+model, so it needs the same credentials as the runners.
+
+Usage:
+    python benchmark_orchestrator.py
+    python benchmark_orchestrator.py --runs 5 -o orchestrator_benchmark.json
+    python benchmark_orchestrator.py --turn "Plan a 4 day trip to Jaipur from Delhi" \\
+        --turn "reject: only trains, no flights" --turn "approve"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure project root is on sys.path so we can import hitl_agent before installing.
+ROOT_DIR = Path(__file__).resolve().parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+load_dotenv()
+
+
+APP_NAME = "hitl_trip_planner"
+MODES = ["prompt", "workflow"]
+DEFAULT_TURNS = [
+    "Plan a 3 day trip to Goa from Mumbai",
+    "reject: need cheaper hotels under $100 a night",
+    "approve",
+]
+
+
+def _isolate_environment(workdir: str) -> None:
+    """Keep runs comparable: no background speculation, no learned profiles."""
+    os.environ["SPECULATION_ENABLED"] = "FALSE"
+    os.environ["TRACE_EXPORTER"] = "none"
+    os.environ["PREFERENCE_STORE_PATH"] = os.path.join(workdir, "preferences.db")
+
+
+def _counting_plugin():
+    from google.adk.plugins.base_plugin import BasePlugin
+
+    class CountingPlugin(BasePlugin):
+        """Counts model calls, tokens and tool calls for the current turn."""
+
+        def __init__(self):
+            super().__init__(name="benchmark_counter")
+            self.stats = {}
+
+        def start_turn(self) -> None:
+            self.stats = {"model_calls": 0, "prompt_tokens": 0, "output_tokens": 0, "tool_calls": 0}
+
+        async def before_model_callback(self, *, callback_context, llm_request):
+            self.stats["model_calls"] += 1
+            return None
+
+        async def after_model_callback(self, *, callback_context, llm_response):
+            usage = llm_response.usage_metadata
+            if usage:
+                self.stats["prompt_tokens"] += usage.prompt_token_count or 0
+                self.stats["output_tokens"] += usage.candidates_token_count or 0
+            return None
+
+        async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+            self.stats["tool_calls"] += 1
+            return None
+
+    return CountingPlugin()
+
+
+def build_root_agents() -> dict:
+    from hitl_agent import agent
+    from hitl_agent.workflow import WorkflowAgent, create_workflow_agent
+
+    workflow = agent.root_agent
+    if not isinstance(workflow, WorkflowAgent):
+        workflow = create_workflow_agent(
+            agent.proposal_agent,
+            agent.iterative_agent,
+            nlu_model=agent.WORKFLOW_NLU_MODEL,
+            after_agent_callback=agent.auto_save_to_memory_callback,
+        )
+    return {"prompt": agent.prompt_root_agent, "workflow": workflow}
+
+
+async def run_mode(mode: str, root_agent, turns: list[str], runs: int) -> dict:
+    from google.adk.memory import InMemoryMemoryService
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+    from hitl_agent.plugins import get_plugins
+    from hitl_agent.trips import trip_state
+
+    counter = _counting_plugin()
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app_name=APP_NAME,
+        agent=root_agent,
+        session_service=session_service,
+        memory_service=InMemoryMemoryService(),
+        plugins=[counter] + get_plugins(),
+    )
+
+    results = []
+    finalized = 0
+    for run in range(runs):
+        user_id = f"bench_{uuid.uuid4().hex[:8]}"
+        session = await session_service.create_session(app_name=APP_NAME, user_id=user_id)
+        for index, text in enumerate(turns):
+            counter.start_turn()
+            start = time.perf_counter()
+            error = None
+            try:
+                async for _ in runner.run_async(
+                    user_id=user_id,
+                    session_id=session.id,
+                    new_message=types.Content(role="user", parts=[types.Part(text=text)]),
+                ):
+                    pass
+            except Exception as e:
+                error = str(e)
+            results.append({
+                "run": run,
+                "turn": index,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+                **counter.stats,
+                "error": error,
+            })
+        session = await session_service.get_session(
+            app_name=APP_NAME, user_id=user_id, session_id=session.id,
+        )
+        finalized += bool(trip_state(session.state).get("trip_finalized"))
+        print(f"[Benchmark] {mode} run {run + 1}/{runs} done")
+
+    latencies = sorted(turn["latency_ms"] for turn in results)
+    return {
+        "turns": results,
+        "summary": {
+            "turns": len(results),
+            "latency_ms_mean": round(sum(latencies) / len(results), 2),
+            "latency_ms_p95": latencies[min(len(results) - 1, int(len(results) * 0.95))],
+            "model_calls": sum(turn["model_calls"] for turn in results),
+            "prompt_tokens": sum(turn["prompt_tokens"] for turn in results),
+            "output_tokens": sum(turn["output_tokens"] for turn in results),
+            "tool_calls": sum(turn["tool_calls"] for turn in results),
+            "finalized": finalized,
+            "errors": sum(1 for turn in results if turn["error"]),
+        },
+    }
+
+
+async def benchmark(turns: list[str], runs: int) -> dict:
+    agents = build_root_agents()
+    report = {"turns": turns, "runs": runs}
+    for mode in MODES:
+        report[mode] = await run_mode(mode, agents[mode], turns, runs)
+    return report
+
+
+def print_comparison(report: dict) -> None:
+    prompt, workflow = report["prompt"]["summary"], report["workflow"]["summary"]
+    print(f"\n{'Metric':<18} {'Prompt':>12} {'Workflow':>12} {'Change':>10}")
+    print("-" * 55)
+    for metric, old in prompt.items():
+        new = workflow[metric]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else ""
+        print(f"{metric:<18} {old:>12} {new:>12} {change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3, help="Conversations per mode")
+    parser.add_argument("--turn", action="append", default=[],
+                        help="User message (repeatable; default: plan, reject, approve)")
+    parser.add_argument("-o", "--output", default="orchestrator_benchmark.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _isolate_environment(workdir)
+        report = asyncio.run(benchmark(args.turn or DEFAULT_TURNS, args.runs))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_comparison(report)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,20 @@
 from .agent import root_agent
 from .services import get_session_service, get_memory_service
 
-# Export services for runners that want to use them
-session_service = get_session_service()
-memory_service = get_memory_service()
-
 __all__ = ["root_agent", "session_service", "memory_service"]
 
+# Export services for runners that want to use them. They are created on first
+# access so uvicorn worker processes do not build unused clients at import.
+_service_factories = {
+    "session_service": get_session_service,
+    "memory_service": get_memory_service,
+}
+_services = {}
+
+
+def __getattr__(name):
+    if name in _service_factories:
+        if name not in _services:
+            _services[name] = _service_factories[name]()
+        return _services[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,19 +3,28 @@
 Flow:
 1. User requests trip → capture_request → proposal_agent generates
 2. present_proposal outputs full proposal
-3. User: approve → process_approval → done
-4. User: reject → process_rejection → iterative_agent fixes AND presents revised
+3. User: approve → process_approval → done (choosing one option if the
+   proposal offers several for a section)
+4. User: reject → process_rejection → iterative_agent fixes every affected
+   section (or re-plans the rejected leg of a multi-city trip) in parallel AND
+   presents revised
+
+With ORCHESTRATOR_MODE=workflow the root agent is a code-driven state machine
+(workflow.py) instead of the prompt-driven model.
 """
 
-from google.adk.agents import Agent, LlmAgent, SequentialAgent
+import os
+
+from google.adk.agents import Agent, LlmAgent, ParallelAgent, SequentialAgent
 from google.adk.tools import FunctionTool, load_memory
 from google.adk.tools.preload_memory_tool import PreloadMemoryTool
+from google.genai import types
 
 from .tools import (
     capture_request,
     generate_route,
     generate_accommodation,
-    generate_activities,
+    format_activities,
     present_proposal,
     process_approval,
     process_rejection,
@@ -26,18 +35,31 @@ from .tools import (
     show_final_plan,
     recall_trip_info,
 )
+from .candidates import create_candidate_planners, skip_candidate_section
+from .itinerary import create_activity_agent
+from .legs import create_leg_planners, skip_multi_city
+from .trips import trip_state
+from .workflow import create_workflow_agent
 from .prompts import (
     ROOT_PROMPT,
     ROUTE_PROMPT,
     ACCOMMODATION_PROMPT,
     ACTIVITY_PROMPT,
+    CANDIDATE_PROMPT,
     FINALIZER_PROMPT,
-    ITERATIVE_PROMPT,
+    LEG_PROMPT,
+    SECTION_FIXER_PROMPT,
+    REVISION_PRESENTER_PROMPT,
 )
 
 
 MODEL_ID = "gemini-2.0-flash"
 
+# "prompt" (default): ROOT_PROMPT drives the loop; "workflow": workflow.py does
+ORCHESTRATOR_MODE = os.getenv("ORCHESTRATOR_MODE", "prompt").lower()
+# Model for the workflow orchestrator's intent extraction
+WORKFLOW_NLU_MODEL = os.getenv("WORKFLOW_NLU_MODEL", MODEL_ID)
+
 
 # ============================================================================
 # CALLBACK: Auto-save session to memory after each agent turn
@@ -70,6 +92,7 @@ route_agent = LlmAgent(
     model=MODEL_ID,
     instruction=ROUTE_PROMPT,
     tools=[FunctionTool(func=generate_route)],
+    before_agent_callback=skip_candidate_section("route"),
 )
 
 accommodation_agent = LlmAgent(
@@ -77,13 +100,16 @@ accommodation_agent = LlmAgent(
     model=MODEL_ID,
     instruction=ACCOMMODATION_PROMPT,
     tools=[FunctionTool(func=generate_accommodation)],
+    before_agent_callback=skip_candidate_section("accommodation"),
 )
 
-activity_agent = LlmAgent(
-    name="activity_agent",
+# Day ranges of long trips are generated in parallel (see itinerary.py)
+activity_agent = create_activity_agent(
     model=MODEL_ID,
-    instruction=ACTIVITY_PROMPT,
-    tools=[FunctionTool(func=generate_activities)],
+    prompt=ACTIVITY_PROMPT,
+    format_activities=format_activities,
+    state_view=trip_state,
+    before_agent_callback=skip_candidate_section("activities"),
 )
 
 finalizer_agent = LlmAgent(
@@ -96,35 +122,84 @@ finalizer_agent = LlmAgent(
 
 # ============================================================================
 # PROPOSAL AGENT (SequentialAgent)
+# A single-destination trip runs route -> accommodation -> activities; a
+# multi-city trip plans all its legs in parallel instead (see legs.py).
+# With PROPOSAL_CANDIDATES the most-rejected section's planner is skipped and
+# candidate_planners writes options for it instead (candidates.py)
 # ============================================================================
 
-proposal_agent = SequentialAgent(
-    name="proposal_agent",
-    description="Generates complete proposal sequentially",
+destination_planner = SequentialAgent(
+    name="destination_planner",
+    description="Plans a single-destination trip section by section",
     sub_agents=[
         route_agent,
         accommodation_agent,
         activity_agent,
+    ],
+    before_agent_callback=skip_multi_city,
+)
+
+proposal_agent = SequentialAgent(
+    name="proposal_agent",
+    description="Generates complete proposal sequentially",
+    sub_agents=[
+        destination_planner,
+        create_leg_planners(model=MODEL_ID, prompt=LEG_PROMPT),
+        create_candidate_planners(model=MODEL_ID, prompt=CANDIDATE_PROMPT),
         finalizer_agent,
     ],
 )
 
 
 # ============================================================================
-# ITERATIVE AGENT - has ALL fix tools directly, no sub-agents
-# This ensures it can fix AND present revised proposal in sequence
+# ITERATIVE AGENT - one fixer per section in parallel, then one presenter
+# A rejection can name several sections: each affected fixer makes its one
+# model call concurrently, and the revised proposal is presented once.
 # ============================================================================
 
-iterative_agent = LlmAgent(
-    name="iterative_agent",
+def _section_fixer(section: str, fix_tool) -> LlmAgent:
+    """LlmAgent that fixes one section, or ends at once if it is not affected."""
+
+    async def skip_unaffected_section(callback_context):
+        if section in trip_state(callback_context.state).get("affected_sections", []):
+            return None
+        # Returning content ends the agent without a model call
+        return types.Content(role="model", parts=[])
+
+    return LlmAgent(
+        name=f"{section}_fixer",
+        model=MODEL_ID,
+        instruction=SECTION_FIXER_PROMPT.format(section=section, tool=fix_tool.__name__),
+        tools=[FunctionTool(func=fix_tool)],
+        before_agent_callback=skip_unaffected_section,
+    )
+
+
+section_fixers = ParallelAgent(
+    name="section_fixers",
+    description="Fixes every affected section concurrently",
+    sub_agents=[
+        _section_fixer("route", fix_route),
+        _section_fixer("accommodation", fix_accommodation),
+        _section_fixer("activities", fix_activities),
+    ],
+    before_agent_callback=skip_multi_city,  # Multi-city trips re-plan legs instead
+)
+
+revision_presenter = LlmAgent(
+    name="revision_presenter",
     model=MODEL_ID,
-    description="Fixes specific parts and presents revised proposal",
-    instruction=ITERATIVE_PROMPT,
-    tools=[
-        FunctionTool(func=fix_route),
-        FunctionTool(func=fix_accommodation),
-        FunctionTool(func=fix_activities),
-        FunctionTool(func=present_revised_proposal),
+    instruction=REVISION_PRESENTER_PROMPT,
+    tools=[FunctionTool(func=present_revised_proposal)],
+)
+
+iterative_agent = SequentialAgent(
+    name="iterative_agent",
+    description="Fixes the affected parts in parallel and presents revised proposal",
+    sub_agents=[
+        section_fixers,
+        create_leg_planners(model=MODEL_ID, prompt=LEG_PROMPT, replan=True),
+        revision_presenter,
     ],
 )
 
@@ -153,3 +228,18 @@ root_agent = Agent(
     ],
     after_agent_callback=auto_save_to_memory_callback,  # Auto-save after each turn
 )
+
+
+# ============================================================================
+# WORKFLOW MODE - deterministic state machine around the same sub-agents
+# ============================================================================
+
+prompt_root_agent = root_agent
+
+if ORCHESTRATOR_MODE == "workflow":
+    root_agent = create_workflow_agent(
+        proposal_agent,
+        iterative_agent,
+        nlu_model=WORKFLOW_NLU_MODEL,
+        after_agent_callback=auto_save_to_memory_callback,
+    )
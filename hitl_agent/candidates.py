@@ -0,0 +1,224 @@
+"""Several options for the most-rejected section, chosen at approval (opt-in).
+
+Most rejections are about price tier or pace. With PROPOSAL_CANDIDATES=K
+(2-3), proposal_agent offers K alternatives for the section users reject most
+often (from the app-wide statistics in speculation.py; accommodation until
+there are any), e.g. budget / mid-range / premium accommodation. The options
+replace that section's planner: skip_candidate_section skips it, and the
+options are generated concurrently, one structured-output call each, after the
+other section planners and before the finalizer:
+
+    candidate_planners (ParallelAgent)
+        candidate_planner_1 .. candidate_planner_K -> candidate_<n>
+
+and shown in place of the section. candidate_section and candidate_<n> belong
+to the trip (trip:<id>:candidate_<n>, see trips.py): each planner stores its
+option itself instead of through output_key, which would write a session-wide
+key that concurrent turns for other trips share. The user approves by choosing one
+("approve 2"): process_approval puts the chosen option into the section and
+the final plan. A rejection of that section drops the options and revises as
+usual. Multi-city trips get no options.
+
+Only hitl_agent offers options; the A2A proposal_agent deployable always
+plans a single version of each section.
+"""
+
+import os
+from typing import Callable, Optional
+
+from google.adk.agents import LlmAgent, ParallelAgent
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.models import LlmResponse
+from google.genai import types
+from pydantic import BaseModel, ValidationError
+
+from .legs import trip_legs, trip_path
+from .speculation import STATS_KEY
+from .trips import trip_state
+
+
+# Tier of each option, per section, in the order they are offered
+CANDIDATE_TIERS = {
+    "route": ["cheapest", "fastest", "most comfortable"],
+    "accommodation": ["budget", "mid-range", "premium"],
+    "activities": ["relaxed", "balanced", "packed"],
+}
+
+SECTION_TITLES = {"route": "ROUTE", "accommodation": "ACCOMMODATIONS", "activities": "ACTIVITIES"}
+
+# Options per proposal for the most-rejected section (1 = a single proposal)
+PROPOSAL_CANDIDATES = min(int(os.getenv("PROPOSAL_CANDIDATES", "1")), len(CANDIDATE_TIERS["route"]))
+
+# Starts the per-trip tail of a candidate planner's instruction (kept out of the context cache)
+CANDIDATE_MARKER = "Option to plan"
+
+DEFAULT_SECTION = "accommodation"
+
+
+class SectionOption(BaseModel):
+    """One alternative for a section (the candidate planners' output schema)."""
+
+    details: str
+    cost: str
+
+
+def most_rejected_section(stats: Optional[dict]) -> str:
+    """Section with the most recorded rejections, accommodation if none."""
+    counts = {
+        section: entry.get("count", 0)
+        for section, entry in (stats or {}).items()
+        if section in CANDIDATE_TIERS
+    }
+    if not counts or not max(counts.values()):
+        return DEFAULT_SECTION
+    return max(counts, key=counts.get)
+
+
+def option_text(section: str, number: int, option: dict) -> str:
+    """Section text for one option, as it stands once chosen."""
+    return (
+        f"{SECTION_TITLES[section]} (OPTION {number} - {option['tier']}):\n"
+        f"{option['details']}\nCost: {option['cost']}"
+    )
+
+
+def options_text(section: str, options: list[dict]) -> str:
+    """Section text listing every option, shown in the proposal."""
+    lines = [f"{SECTION_TITLES[section]} - {len(options)} OPTIONS (reply 'approve <option number>'):"]
+    for number, option in enumerate(options, start=1):
+        lines.append(f"\nOption {number} ({option['tier']}):\n{option['details']}\nCost: {option['cost']}")
+    return "\n".join(lines)
+
+
+def choose_candidate(state, option: int) -> Optional[str]:
+    """Apply option (1-based) of the pending candidates; None if out of range.
+
+    The chosen option replaces the list of options in the section and in the
+    pending proposal.
+    """
+    candidates = state.get("candidates")
+    if not candidates or not 0 < option <= len(candidates["options"]):
+        return None
+    section = candidates["section"]
+    listed = state.get(section, "")
+    chosen = option_text(section, option, candidates["options"][option - 1])
+    state[section] = chosen
+    state["pending_proposal"] = state.get("pending_proposal", "").replace(listed, chosen)
+    state["candidates"] = None
+    return chosen
+
+
+def candidate_section(state) -> Optional[str]:
+    """Section this proposal offers options for, or None."""
+    if PROPOSAL_CANDIDATES < 2 or trip_legs(state):
+        return None
+    return most_rejected_section(state.get(STATS_KEY))
+
+
+def skip_candidate_section(section: str):
+    """before_agent_callback for a section planner: skip it when its section gets options."""
+
+    async def skip_for_options(callback_context):
+        if candidate_section(trip_state(callback_context.state)) != section:
+            return None
+        # The candidate planners write this section; end without a model call
+        return types.Content(role="model", parts=[])
+
+    return skip_for_options
+
+
+async def _pick_section(callback_context):
+    """before_agent_callback: pick the section to offer options for, or skip."""
+    state = trip_state(callback_context.state)
+    section = candidate_section(state)
+    if not section:
+        # Returning content ends the agent without a model call
+        return types.Content(role="model", parts=[])
+    state["candidate_section"] = section
+    # A planner that fails must not leave an option from an earlier proposal
+    for index in range(PROPOSAL_CANDIDATES):
+        state[f"candidate_{index + 1}"] = None
+    return None
+
+
+def _candidate_instruction(prompt: str, index: int) -> Callable[[ReadonlyContext], str]:
+    """Static prompt, then this option's tier and the plan it has to fit."""
+
+    def instruction(context: ReadonlyContext) -> str:
+        state = trip_state(context.state)
+        section = state.get("candidate_section") or DEFAULT_SECTION
+        request = state.get("request") or {}
+        lines = [
+            f"{CANDIDATE_MARKER}: the {CANDIDATE_TIERS[section][index]} {section}",
+            f"Trip: {request.get('duration_days')} days, {trip_path(request)}",
+        ]
+        for name in SECTION_TITLES:
+            # The picked section was not planned this time; any value is a stale one
+            if name != section and state.get(name):
+                lines.append(f"Current {name}:\n{state[name]}")
+        return prompt + "\n\n" + "\n".join(lines)
+
+    return instruction
+
+
+def _store_option(index: int):
+    """after_model_callback for a candidate planner: keep its option with the trip."""
+
+    async def store_option(callback_context, llm_response: LlmResponse):
+        if llm_response.partial or not llm_response.content or not llm_response.content.parts:
+            return None
+        text = "".join(part.text or "" for part in llm_response.content.parts if not part.thought)
+        try:
+            option = SectionOption.model_validate_json(text).model_dump()
+        except ValidationError as e:
+            print(f"[Candidates] Option {index + 1} unusable: {e}")
+            return None
+        trip_state(callback_context.state)[f"candidate_{index + 1}"] = option
+        return None
+
+    return store_option
+
+
+async def _collect_options(callback_context):
+    """after_agent_callback: show the options in place of the section."""
+    state = trip_state(callback_context.state)
+    section = state.get("candidate_section") or DEFAULT_SECTION
+    options = [
+        {"tier": CANDIDATE_TIERS[section][index], **state[f"candidate_{index + 1}"]}
+        for index in range(PROPOSAL_CANDIDATES)
+        if state.get(f"candidate_{index + 1}")
+    ]
+    # The options live on in "candidates" (or the section) from here
+    for index in range(PROPOSAL_CANDIDATES):
+        state[f"candidate_{index + 1}"] = None
+    if len(options) < 2:
+        # The section planner was skipped: a lone option becomes the section
+        if options:
+            state[section] = option_text(section, 1, options[0])
+        state["candidates"] = None
+        return None
+    state["candidates"] = {"section": section, "options": options}
+    state[section] = options_text(section, options)
+    print(f"[Candidates] {len(options)} {section} options")
+    return None
+
+
+def create_candidate_planners(model: str, prompt: str) -> ParallelAgent:
+    """PROPOSAL_CANDIDATES LlmAgents in parallel, one per tier of the picked section."""
+    planners = [
+        LlmAgent(
+            name=f"candidate_planner_{index + 1}",
+            model=model,
+            instruction=_candidate_instruction(prompt, index),
+            output_schema=SectionOption,
+            after_model_callback=_store_option(index),
+        )
+        for index in range(max(PROPOSAL_CANDIDATES, 1))
+    ]
+    return ParallelAgent(
+        name="candidate_planners",
+        description="Generates alternatives for the most-rejected section concurrently",
+        sub_agents=planners,
+        before_agent_callback=_pick_section,
+        after_agent_callback=_collect_options,
+    )
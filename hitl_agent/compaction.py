@@ -0,0 +1,165 @@
+"""Conversation-history compaction for long approve/reject loops.
+
+ADK replays the whole session into every model call, so each reject/revise
+round makes every later prompt larger. HistoryCompactionPlugin keeps the most
+recent user turns verbatim and replaces everything older with one bounded
+summary: the current trip sections from state, the latest feedback, and a
+short decision trail. Superseded proposal versions and old tool responses are
+dropped, so prompt size stays flat however many revisions happened.
+
+ADK's App(events_compaction_config=EventsCompactionConfig(...)) does not cover
+this. It summarises every compaction_interval invocations with an extra LLM
+call and appends the summary to the stored session, so the prompt still grows
+between compactions and old proposal versions survive in the summary text.
+This plugin makes no model call. It rebuilds the summary on every request from
+the authoritative sections in state, and the stored session is left untouched.
+"""
+
+import os
+import re
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "2"))
+HISTORY_TRAIL_LINES = int(os.getenv("HISTORY_TRAIL_LINES", "12"))
+HISTORY_SECTION_CHARS = int(os.getenv("HISTORY_SECTION_CHARS", "1500"))
+
+# Tool calls worth remembering in the decision trail
+DECISION_TOOLS = {"capture_request", "process_approval", "process_rejection"}
+PROPOSAL_TOOLS = {"present_proposal", "present_revised_proposal"}
+
+# Sections summarised from state, in display order
+SECTION_KEYS = ["route", "accommodation", "activities"]
+
+_FOREIGN_TOOL_CALL = re.compile(r"called tool `(\w+)`")
+
+
+def _truncate(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _is_user_message(content: types.Content) -> bool:
+    """True for a message typed by the human (not a tool result or agent context)."""
+    if content.role != "user" or not content.parts:
+        return False
+    texts = [part.text for part in content.parts if part.text]
+    if not texts or any(part.function_response for part in content.parts):
+        return False
+    # Other agents' events are replayed as user content starting with "For context:"
+    return not texts[0].startswith("For context:")
+
+
+def _decision_trail(contents: list[types.Content]) -> list[str]:
+    trail = []
+    for content in contents:
+        if _is_user_message(content):
+            text = " ".join(part.text for part in content.parts if part.text)
+            trail.append(f"User: {_truncate(text, 200)}")
+            continue
+        for part in content.parts or []:
+            call = part.function_call
+            if call and call.name in DECISION_TOOLS:
+                args = ", ".join(f"{k}={_truncate(str(v), 80)}" for k, v in (call.args or {}).items())
+                trail.append(f"{call.name}({args})")
+            elif call and call.name in PROPOSAL_TOOLS:
+                trail.append("Proposal presented (superseded)")
+            elif part.text:
+                for name in _FOREIGN_TOOL_CALL.findall(part.text):
+                    if name in PROPOSAL_TOOLS:
+                        trail.append("Proposal presented (superseded)")
+    return trail[-HISTORY_TRAIL_LINES:]
+
+
+def _same_state(state):
+    return state
+
+
+def _state_summary(state) -> list[str]:
+    lines = []
+    # A trip view (see HistoryCompactionPlugin's state_view) names its trip
+    trip_id = getattr(state, "trip_id", None)
+    if trip_id:
+        lines.append(f"Current trip: {trip_id}")
+    get = state.get
+
+    request = get("request")
+    if request:
+        lines.append(f"Current request: {request}")
+
+    sections = [get(key) for key in SECTION_KEYS if get(key)]
+    if not sections and get("pending_proposal"):
+        sections = [get("pending_proposal")]
+    for section in sections:
+        lines.append(_truncate(str(section), HISTORY_SECTION_CHARS))
+
+    if get("feedback"):
+        lines.append(
+            f"Latest feedback: {get('feedback')} "
+            f"(sections: {', '.join(get('affected_sections') or ['unknown'])})"
+        )
+    lines.append(
+        f"Awaiting approval: {bool(get('awaiting_approval'))}, "
+        f"finalized: {bool(get('trip_finalized'))}"
+    )
+    return lines
+
+
+def compact_contents(
+    contents: list[types.Content],
+    state,
+    keep_turns: int = HISTORY_KEEP_TURNS,
+) -> Optional[list[types.Content]]:
+    """Return compacted contents, or None if the history is already short."""
+    turn_starts = [i for i, content in enumerate(contents) if _is_user_message(content)]
+    if keep_turns < 1 or len(turn_starts) <= keep_turns:
+        return None
+
+    cut = turn_starts[-keep_turns]
+    older = contents[:cut]
+
+    lines = [
+        f"[Earlier conversation compacted: {len(older)} messages omitted. "
+        "Superseded proposal versions and old tool outputs were dropped; "
+        "use show_final_plan or recall_trip_info for full details.]"
+    ]
+    lines.extend(_state_summary(state))
+    trail = _decision_trail(older)
+    if trail:
+        lines.append("Decision trail:")
+        lines.extend(f"- {entry}" for entry in trail)
+
+    summary = types.Content(role="user", parts=[types.Part(text="\n".join(lines))])
+    return [summary] + contents[cut:]
+
+
+class HistoryCompactionPlugin(BasePlugin):
+    """Compacts old history out of every model request before it is sent."""
+
+    def __init__(self, keep_turns: int = HISTORY_KEEP_TURNS, state_view=_same_state):
+        """state_view(state) returns the mapping the summarised sections are read from."""
+        super().__init__(name="history_compaction")
+        self.keep_turns = keep_turns
+        self.state_view = state_view
+
+    async def before_model_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+    ) -> Optional[LlmResponse]:
+        compacted = compact_contents(
+            llm_request.contents, self.state_view(callback_context.state), self.keep_turns
+        )
+        if compacted is not None:
+            print(
+                f"[Compaction] {callback_context.agent_name}: "
+                f"{len(llm_request.contents)} -> {len(compacted)} contents"
+            )
+            llm_request.contents = compacted
+        return None
@@ -0,0 +1,145 @@
+"""Day-range chunked, parallel activity generation for long trips.
+
+A single model call that writes the whole day-by-day schedule gets slower with
+every day of the trip. activity_agent is instead a ParallelAgent of day-range
+agents: the trip is split into ranges of ACTIVITY_CHUNK_DAYS days (at most
+ACTIVITY_MAX_CHUNKS ranges; longer trips get longer ranges), every range is
+generated concurrently from the same shared context (destination, trip length
+and the accommodation already chosen), and the parts are merged into
+state["activities"] in day order. Ranges a short trip does not need end
+without a model call, so a short trip is still one call.
+
+Each range agent stores its ActivityDays output under activity_days_<n>. The
+trip length comes from state["request"]; without it the first agent plans the
+whole trip as before. A state_view can map request, accommodation and
+activities elsewhere (hitl_agent keeps them per trip, see trips.py).
+"""
+
+import os
+from typing import Callable, Optional
+
+from google.adk.agents import LlmAgent, ParallelAgent
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.genai import types
+from pydantic import BaseModel
+
+
+ACTIVITY_CHUNK_DAYS = int(os.getenv("ACTIVITY_CHUNK_DAYS", "4"))
+ACTIVITY_MAX_CHUNKS = int(os.getenv("ACTIVITY_MAX_CHUNKS", "4"))
+
+# Starts the per-trip tail of a range agent's instruction (kept out of the context cache)
+DAY_RANGE_MARKER = "Day range to plan"
+
+
+class ActivityDays(BaseModel):
+    """Activities for one day range (the range agents' output schema)."""
+
+    activities: str
+    highlights: str
+    schedule: str
+
+
+def day_ranges(duration_days) -> list[tuple[int, int]]:
+    """(first, last) day of each range; empty if the trip length is unknown."""
+    try:
+        days = int(duration_days or 0)
+    except (TypeError, ValueError):
+        return []
+    if days <= 0:
+        return []
+    size = max(ACTIVITY_CHUNK_DAYS, -(-days // ACTIVITY_MAX_CHUNKS))
+    return [(first, min(first + size - 1, days)) for first in range(1, days + 1, size)]
+
+
+def _ranges_for(state) -> list[tuple[int, int]]:
+    return day_ranges((state.get("request") or {}).get("duration_days"))
+
+
+def _same_state(state):
+    return state
+
+
+def _range_instruction(prompt: str, index: int, state_view: Callable) -> Callable[[ReadonlyContext], str]:
+    """Static prompt, then this agent's day range and the shared trip context."""
+
+    def instruction(context: ReadonlyContext) -> str:
+        state = state_view(context.state)
+        request = state.get("request") or {}
+        ranges = _ranges_for(state)
+        if ranges:
+            first, last = ranges[index]
+            days = f"days {first}-{last} of a {ranges[-1][1]} day trip"
+        else:
+            days = "the whole trip, every day"
+        lines = [f"{DAY_RANGE_MARKER}: {days}"]
+        if request.get("destination"):
+            lines.append(f"Destination: {request['destination']}")
+        if state.get("accommodation"):
+            lines.append(f"Where the traveller stays:\n{state['accommodation']}")
+        return prompt + "\n\n" + "\n".join(lines)
+
+    return instruction
+
+
+def _skip_unneeded_range(index: int, state_view: Callable):
+    async def skip_unneeded_range(callback_context):
+        if index < max(len(_ranges_for(state_view(callback_context.state))), 1):
+            return None
+        # Returning content ends the agent without a model call
+        return types.Content(role="model", parts=[])
+
+    return skip_unneeded_range
+
+
+def _merge_ranges(format_activities: Callable[..., str], state_view: Callable):
+    async def merge_activity_days(callback_context):
+        state = state_view(callback_context.state)
+        parts = [
+            state.get(f"activity_days_{index + 1}") or {}
+            for index in range(max(len(_ranges_for(state)), 1))
+        ]
+        state["activities"] = format_activities(
+            activities="\n".join(part.get("activities", "") for part in parts),
+            highlights="; ".join(part.get("highlights", "") for part in parts),
+            schedule="\n".join(part.get("schedule", "") for part in parts),
+        )
+        return None
+
+    return merge_activity_days
+
+
+def create_activity_agent(
+    model: str,
+    prompt: str,
+    format_activities: Callable[..., str],
+    state_view: Callable = _same_state,
+    before_agent_callback: Optional[Callable] = None,
+    tools: Optional[list] = None,
+) -> ParallelAgent:
+    """activity_agent: one LlmAgent per day range, merged into state["activities"].
+
+    format_activities(activities=, highlights=, schedule=) renders the merged
+    text the way the agent's proposal expects it. state_view(state) returns
+    the mapping the trip fields are read from and written to.
+    before_agent_callback, if given, can skip the whole agent. tools (e.g.
+    load_memory) are given to every range agent.
+    """
+    range_agents = [
+        LlmAgent(
+            name=f"activity_agent_{index + 1}",
+            model=model,
+            instruction=_range_instruction(prompt, index, state_view),
+            output_schema=ActivityDays,
+            output_key=f"activity_days_{index + 1}",
+            tools=list(tools or []),
+            before_agent_callback=_skip_unneeded_range(index, state_view),
+        )
+        for index in range(ACTIVITY_MAX_CHUNKS)
+    ]
+    return ParallelAgent(
+        name="activity_agent",
+        description="Generates the activities for each day range concurrently",
+        sub_agents=range_agents,
+        before_agent_callback=before_agent_callback,
+        after_agent_callback=_merge_ranges(format_activities, state_view),
+    )
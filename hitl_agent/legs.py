@@ -0,0 +1,195 @@
+"""Multi-city trips: one planner per leg, run in parallel, stitched together.
+
+capture_request records stops between the start and the final destination as
+an ordered list of legs in state["request"]["legs"]:
+    [{"from": "Mumbai", "to": "Goa", "days": 3}, {"from": "Goa", "to": "Hampi", "days": 2}]
+
+For such a trip proposal_agent skips the single-destination planners and runs
+leg_planners instead: one structured-output call per leg (route to the city,
+where to stay, what to do there), all legs concurrently. The LegPlans land in
+leg_plan_<n>, are kept with the trip (leg_plans) and stitched, leg by leg,
+into the usual route / accommodation / activities state, so the finalizer and
+present tools work unchanged.
+
+A rejection that names a leg (process_rejection's affected_leg) re-plans only
+that leg with the feedback (leg_replanners in iterative_agent); the other legs
+keep their plans and the proposal is stitched again. Feedback about no
+particular leg re-plans every leg, again in parallel. A trip can have at most
+MAX_TRIP_LEGS legs.
+"""
+
+import os
+from typing import Callable
+
+from google.adk.agents import LlmAgent, ParallelAgent
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.genai import types
+from pydantic import BaseModel
+
+from .trips import trip_state
+
+
+MAX_TRIP_LEGS = int(os.getenv("MAX_TRIP_LEGS", "4"))
+
+# Starts the per-trip tail of a leg planner's instruction (kept out of the context cache)
+LEG_MARKER = "Leg to plan"
+
+
+class LegPlan(BaseModel):
+    """Plan for one leg (the leg planners' output schema)."""
+
+    route: str
+    accommodation: str
+    activities: str
+
+
+def build_legs(start_location: str, cities: list[str], duration_days: int, days_per_city=None) -> list[dict]:
+    """Ordered legs start -> cities[0] -> cities[1] ...; days split evenly if not given."""
+    cities = [city for city in cities if city]
+    if not cities:
+        return []
+    days = list(days_per_city or [])[:len(cities)]
+    if len(days) != len(cities) or any(int(day) <= 0 for day in days):
+        total = max(int(duration_days or 0), len(cities))
+        days = [total // len(cities) + (1 if index < total % len(cities) else 0) for index in range(len(cities))]
+    legs = []
+    for index, city in enumerate(cities):
+        origin = start_location if index == 0 else cities[index - 1]
+        legs.append({"from": origin, "to": city, "days": int(days[index])})
+    return legs
+
+
+def trip_legs(state) -> list[dict]:
+    """Legs of the current request; empty for a single-destination trip."""
+    return list((state.get("request") or {}).get("legs") or [])
+
+
+def trip_path(request: dict) -> str:
+    """"Mumbai → Goa", or every city in order for a multi-city trip."""
+    legs = request.get("legs")
+    if legs:
+        return " → ".join([legs[0]["from"]] + [leg["to"] for leg in legs])
+    return f"{request.get('start_location')} → {request.get('destination')}"
+
+
+def leg_for_feedback(legs: list[dict], feedback: str) -> int:
+    """1-based leg whose city the feedback names, if exactly one does, else 0."""
+    text = (feedback or "").lower()
+    named = [index + 1 for index, leg in enumerate(legs) if leg["to"].lower() in text]
+    return named[0] if len(named) == 1 else 0
+
+
+async def skip_single_destination(callback_context):
+    """before_agent_callback: run only for multi-city trips."""
+    if trip_legs(trip_state(callback_context.state)):
+        return None
+    # Returning content ends the agent without a model call
+    return types.Content(role="model", parts=[])
+
+
+async def skip_multi_city(callback_context):
+    """before_agent_callback: run only for single-destination trips."""
+    if not trip_legs(trip_state(callback_context.state)):
+        return None
+    return types.Content(role="model", parts=[])
+
+
+def _leg_instruction(prompt: str, index: int, replan: bool) -> Callable[[ReadonlyContext], str]:
+    """Static prompt, then this leg and the whole itinerary it belongs to."""
+
+    def instruction(context: ReadonlyContext) -> str:
+        state = trip_state(context.state)
+        legs = trip_legs(state)
+        if index >= len(legs):
+            return prompt
+        leg = legs[index]
+        first_day = 1 + sum(previous["days"] for previous in legs[:index])
+        lines = [
+            f"{LEG_MARKER}: leg {index + 1} of {len(legs)}, {leg['from']} → {leg['to']}, "
+            f"{leg['days']} days (days {first_day}-{first_day + leg['days'] - 1} of the trip)",
+            f"Whole trip: {trip_path(state.get('request') or {})}",
+        ]
+        plans = state.get("leg_plans") or []
+        current = plans[index] if index < len(plans) else None
+        if replan and current:
+            lines.append(
+                f"Current plan for this leg:\nRoute: {current['route']}\n"
+                f"Accommodation: {current['accommodation']}\nActivities: {current['activities']}"
+            )
+            lines.append(f"The traveller rejected it with the feedback: {state.get('feedback', '')}")
+        return prompt + "\n\n" + "\n".join(lines)
+
+    return instruction
+
+
+def _skip_leg(index: int, replan: bool):
+    async def skip_leg(callback_context):
+        state = trip_state(callback_context.state)
+        needed = index < len(trip_legs(state))
+        if replan and state.get("affected_leg"):
+            needed = state.get("affected_leg") == index + 1
+        if needed:
+            return None
+        return types.Content(role="model", parts=[])
+
+    return skip_leg
+
+
+def stitch_legs(state, replan: bool = False) -> None:
+    """Keep the legs just planned and rebuild route / accommodation / activities."""
+    legs = trip_legs(state)
+    plans = list(state.get("leg_plans") or [])
+    plans += [{}] * (len(legs) - len(plans))
+    planned = range(len(legs))
+    if replan and state.get("affected_leg"):
+        planned = [state.get("affected_leg") - 1]
+    for index in planned:
+        plans[index] = state.get(f"leg_plan_{index + 1}") or plans[index]
+    state["leg_plans"] = plans[:len(legs)]
+    route, accommodation, activities = ["ROUTE:"], ["ACCOMMODATIONS:"], ["ACTIVITIES:"]
+    first_day = 1
+    for number, (leg, plan) in enumerate(zip(legs, plans), start=1):
+        last_day = first_day + leg["days"] - 1
+        route.append(f"Leg {number}: {leg['from']} → {leg['to']}\n{plan.get('route', '')}")
+        accommodation.append(f"{leg['to']} (leg {number}):\n{plan.get('accommodation', '')}")
+        activities.append(f"{leg['to']} (days {first_day}-{last_day}):\n{plan.get('activities', '')}")
+        first_day = last_day + 1
+    state["route"] = "\n\n".join(route)
+    state["accommodation"] = "\n\n".join(accommodation)
+    state["activities"] = "\n\n".join(activities)
+
+
+def _stitch(replan: bool):
+    async def stitch_legs_callback(callback_context):
+        stitch_legs(trip_state(callback_context.state), replan)
+        return None
+
+    return stitch_legs_callback
+
+
+def create_leg_planners(model: str, prompt: str, replan: bool = False) -> ParallelAgent:
+    """One LlmAgent per leg, in parallel; stitched into the proposal sections.
+
+    With replan=True only the rejected leg (state["affected_leg"], or every
+    leg if it is 0) runs, with its current plan and the feedback in the
+    instruction.
+    """
+    kind = "leg_replanner" if replan else "leg_planner"
+    planners = [
+        LlmAgent(
+            name=f"{kind}_{index + 1}",
+            model=model,
+            instruction=_leg_instruction(prompt, index, replan),
+            output_schema=LegPlan,
+            output_key=f"leg_plan_{index + 1}",
+            before_agent_callback=_skip_leg(index, replan),
+        )
+        for index in range(MAX_TRIP_LEGS)
+    ]
+    return ParallelAgent(
+        name=f"{kind}s",
+        description="Re-plans the rejected leg" if replan else "Plans every leg of a multi-city trip concurrently",
+        sub_agents=planners,
+        before_agent_callback=skip_single_destination,
+        after_agent_callback=_stitch(replan),
+    )
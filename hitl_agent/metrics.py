@@ -0,0 +1,260 @@
+"""Prometheus metrics for capacity planning.
+
+Exposed on /metrics by every server:
+- hitl_turn_duration_seconds: whole turns, by entry point (rest, ws, cli, a2a)
+- hitl_phase_duration_seconds: time inside each agent run, model call and tool
+- hitl_runs_in_flight: turns currently being processed
+- hitl_model_calls_total / hitl_model_tokens_total: per agent
+- hitl_context_cache_requests_total: model calls served from the context cache
+- hitl_service_call_duration_seconds / hitl_service_errors_total: session- and
+  memory-service calls (each also gets a span, see observe_services)
+- hitl_websocket_connections: open WebSocket connections
+- hitl_session_state_bytes: session state size seen by the A2A executors
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory so /metrics aggregates every worker.
+"""
+
+import functools
+import os
+import time
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from opentelemetry import trace
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.responses import Response
+
+
+# Agent turns take seconds to minutes, so the default buckets are too short
+TURN_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+CALL_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+TURN_SECONDS = Histogram(
+    "hitl_turn_duration_seconds", "Duration of a whole turn", ["entrypoint"],
+    buckets=TURN_BUCKETS,
+)
+PHASE_SECONDS = Histogram(
+    "hitl_phase_duration_seconds", "Duration of agent runs, model calls and tools",
+    ["phase", "name"], buckets=CALL_BUCKETS,
+)
+RUNS_IN_FLIGHT = Gauge(
+    "hitl_runs_in_flight", "Turns currently being processed",
+    multiprocess_mode="livesum",
+)
+MODEL_CALLS = Counter("hitl_model_calls_total", "Model calls", ["agent"])
+MODEL_TOKENS = Counter(
+    "hitl_model_tokens_total", "Model tokens (input, output, cached input)",
+    ["agent", "type"],
+)
+CONTEXT_CACHE_REQUESTS = Counter(
+    "hitl_context_cache_requests_total", "Model calls by context cache result",
+    ["agent", "result"],
+)
+SERVICE_SECONDS = Histogram(
+    "hitl_service_call_duration_seconds", "Session and memory service calls",
+    ["service", "method"], buckets=CALL_BUCKETS,
+)
+SERVICE_ERRORS = Counter(
+    "hitl_service_errors_total", "Failed session and memory service calls",
+    ["service", "method"],
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "hitl_websocket_connections", "Open WebSocket connections",
+    multiprocess_mode="livesum",
+)
+STATE_BYTES = Histogram(
+    "hitl_session_state_bytes", "Serialized session state size", ["agent"],
+    buckets=(1e3, 5e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6),
+)
+
+# Service methods timed and traced by observe_services
+SESSION_METHODS = ["create_session", "get_session", "list_sessions", "delete_session", "append_event"]
+MEMORY_METHODS = ["add_session_to_memory", "search_memory"]
+
+
+class track_turn:
+    """Time a turn and count it as in flight; a context manager or async decorator."""
+
+    def __init__(self, entrypoint: str):
+        self.entrypoint = entrypoint
+
+    def __enter__(self):
+        RUNS_IN_FLIGHT.inc()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        RUNS_IN_FLIGHT.dec()
+        TURN_SECONDS.labels(self.entrypoint).observe(time.perf_counter() - self._start)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track_turn(self.entrypoint):
+                return await func(*args, **kwargs)
+        return wrapper
+
+
+def track_websocket(func):
+    """Count the connection as open while the WebSocket handler runs."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        WEBSOCKET_CONNECTIONS.inc()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            WEBSOCKET_CONNECTIONS.dec()
+    return wrapper
+
+
+# ============================================================================
+# SERVICE INSTRUMENTATION
+# ============================================================================
+
+# Same tracer name as tracing.py; records once setup_tracing() installs a provider
+tracer = trace.get_tracer("hitl_trip_planner")
+
+
+def _observed_method(method, service: str, name: str):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        with tracer.start_as_current_span(f"{service}.{name}") as span:
+            for key in ("user_id", "session_id"):
+                if kwargs.get(key):
+                    span.set_attribute(f"hitl.{key}", str(kwargs[key]))
+            try:
+                return await method(*args, **kwargs)
+            except Exception:
+                SERVICE_ERRORS.labels(service, name).inc()
+                raise
+            finally:
+                SERVICE_SECONDS.labels(service, name).observe(time.perf_counter() - start)
+
+    wrapper._observed = True
+    return wrapper
+
+
+def observe_services(session_service=None, memory_service=None) -> None:
+    """Count, time and trace each session/memory-service call on these instances.
+
+    One wrapper per method does both, so the services are patched once; the
+    span is a no-op until tracing is set up.
+    """
+    for service, kind, methods in (
+        (session_service, "session", SESSION_METHODS),
+        (memory_service, "memory", MEMORY_METHODS),
+    ):
+        if service is None:
+            continue
+        for name in methods:
+            method = getattr(service, name, None)
+            if method is None or getattr(method, "_observed", False):
+                continue
+            # Patch the instance: ADK type-checks services, so a proxy object would not pass
+            setattr(service, name, _observed_method(method, kind, name))
+
+
+# ============================================================================
+# RUNNER PLUGIN
+# ============================================================================
+
+class MetricsPlugin(BasePlugin):
+    """Records agent, model and tool timings plus token usage per agent."""
+
+    def __init__(self):
+        super().__init__(name="metrics")
+        self._started: dict[tuple, float] = {}
+
+    def _start(self, key: tuple) -> None:
+        self._started[key] = time.perf_counter()
+
+    def _stop(self, key: tuple, phase: str, name: str) -> None:
+        start = self._started.pop(key, None)
+        if start is not None:
+            PHASE_SECONDS.labels(phase, name).observe(time.perf_counter() - start)
+
+    async def before_agent_callback(self, *, agent, callback_context: CallbackContext):
+        self._start(("agent", callback_context.invocation_id, agent.name))
+        return None
+
+    async def after_agent_callback(self, *, agent, callback_context: CallbackContext):
+        self._stop(("agent", callback_context.invocation_id, agent.name), "agent", agent.name)
+        return None
+
+    async def before_model_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+    ) -> Optional[LlmResponse]:
+        self._start(("model", callback_context.invocation_id, callback_context.agent_name))
+        return None
+
+    async def after_model_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_response: LlmResponse,
+    ) -> Optional[LlmResponse]:
+        if llm_response.partial:
+            return None
+        agent_name = callback_context.agent_name
+        self._stop(("model", callback_context.invocation_id, agent_name), "model", agent_name)
+        MODEL_CALLS.labels(agent_name).inc()
+
+        usage = llm_response.usage_metadata
+        if usage:
+            cached_tokens = usage.cached_content_token_count or 0
+            MODEL_TOKENS.labels(agent_name, "input").inc(usage.prompt_token_count or 0)
+            MODEL_TOKENS.labels(agent_name, "output").inc(usage.candidates_token_count or 0)
+            MODEL_TOKENS.labels(agent_name, "cached").inc(cached_tokens)
+            CONTEXT_CACHE_REQUESTS.labels(agent_name, "hit" if cached_tokens else "miss").inc()
+        return None
+
+    async def on_model_error_callback(self, *, callback_context: CallbackContext, llm_request, error):
+        self._started.pop(("model", callback_context.invocation_id, callback_context.agent_name), None)
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        self._start(("tool", tool_context.function_call_id))
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        self._stop(("tool", tool_context.function_call_id), "tool", tool.name)
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        self._stop(("tool", tool_context.function_call_id), "tool", tool.name)
+        return None
+
+
+# ============================================================================
+# EXPOSITION
+# ============================================================================
+
+def render_metrics() -> bytes:
+    """Metrics in the Prometheus text format, across workers when multiprocess."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+async def metrics_endpoint(request) -> Response:
+    """Starlette/FastAPI handler for GET /metrics."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
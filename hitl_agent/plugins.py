@@ -0,0 +1,26 @@
+"""Runner plugins shared by every HITL runner.
+
+Order matters: metrics run first so their timings include the other plugins,
+plugins that rewrite the model request come next, and the context cache runs
+last so it caches the final static prefix.
+"""
+
+from .caching import context_cache
+from .compaction import HistoryCompactionPlugin
+from .metrics import MetricsPlugin
+from .preferences import PREFERENCES_ENABLED, PreferenceProfilePlugin
+from .speculation import SPECULATION_ENABLED, SpeculationPlugin
+from .trips import trip_state
+
+
+def get_plugins():
+    """Build the plugin list for a Runner."""
+    plugins = [MetricsPlugin()]
+    if SPECULATION_ENABLED:
+        plugins.append(SpeculationPlugin())
+    # Summarise the invocation's trip (trips.py)
+    plugins.append(HistoryCompactionPlugin(state_view=trip_state))
+    if PREFERENCES_ENABLED:
+        plugins.append(PreferenceProfilePlugin())
+    plugins.append(context_cache)
+    return plugins
@@ -0,0 +1,182 @@
+"""Session and memory snapshots for WebSocket (re)connects.
+
+The web UI reconnects a couple of seconds after every dropped connection, so a
+deploy makes every open browser reconnect at once. Without help each connect
+costs a get_session and a search_memory call, and a transient get_session
+error used to silently start a new, empty session.
+
+ConnectionSnapshots keeps, per worker process:
+- which session each connection was on, and its version, for
+  RECONNECT_CACHE_SECONDS, so a quick reconnect resumes it without a
+  session-service call (only the id and last_update_time are kept, never the
+  session's events)
+- the memory count per user for MEMORY_SNAPSHOT_SECONDS, so the
+  "memory loaded" notice does not search memory again
+- the session version last saved to memory, so disconnecting twice without a
+  new turn does not save the same session again
+
+A new session is only created when the requested one genuinely does not exist;
+other errors are retried SESSION_LOOKUP_ATTEMPTS times and then reported.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Optional
+
+
+RECONNECT_CACHE_SECONDS = int(os.getenv("RECONNECT_CACHE_SECONDS", "30"))
+MEMORY_SNAPSHOT_SECONDS = int(os.getenv("MEMORY_SNAPSHOT_SECONDS", "300"))
+SESSION_LOOKUP_ATTEMPTS = int(os.getenv("SESSION_LOOKUP_ATTEMPTS", "3"))
+
+MEMORY_QUERY = "previous trip plans and preferences"
+
+
+class SessionUnavailable(Exception):
+    """The session service could not be reached; the session may still exist."""
+
+
+class SnapshotCache:
+    """Small dict with per-entry expiry, dropping the oldest entries when full."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[Any, tuple[float, Any]] = {}
+
+    def _purge(self) -> None:
+        # Every entry has the same TTL and put() moves a key to the end, so the
+        # entries are in expiry order: drop from the front
+        now = time.monotonic()
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+
+    def get(self, key) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    def put(self, key, value) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._purge()
+
+
+class SessionSnapshot:
+    """What a reconnect needs of a session: which one it is and its version."""
+
+    def __init__(self, session):
+        self.id = session.id
+        self.user_id = session.user_id
+        self.last_update_time = session.last_update_time
+
+
+def _is_not_found(error: Exception) -> bool:
+    # VertexAiSessionService raises a 404 ClientError for unknown sessions and
+    # ValueError for a session owned by another user; both mean "start anew"
+    return getattr(error, "code", None) == 404 or isinstance(error, ValueError)
+
+
+class ConnectionSnapshots:
+    """Session/memory lookups for WebSocket connects, cached per process."""
+
+    def __init__(
+        self,
+        session_service,
+        memory_service,
+        app_name: str,
+        session_ttl: int = RECONNECT_CACHE_SECONDS,
+        memory_ttl: int = MEMORY_SNAPSHOT_SECONDS,
+        attempts: int = SESSION_LOOKUP_ATTEMPTS,
+    ):
+        self.session_service = session_service
+        self.memory_service = memory_service
+        self.app_name = app_name
+        self.attempts = max(1, attempts)
+        self._sessions = SnapshotCache(session_ttl)  # (user_id, session_id) -> SessionSnapshot
+        self._memory_counts = SnapshotCache(memory_ttl)  # user_id -> count
+        self._saved = SnapshotCache(memory_ttl)  # session_id -> last_update_time
+
+    def remember(self, session) -> None:
+        """Note a connection's session and version for a quick reconnect."""
+        if session is not None:
+            self._sessions.put((session.user_id, session.id), SessionSnapshot(session))
+
+    async def _lookup(self, user_id: str, session_id: str):
+        for attempt in range(self.attempts):
+            try:
+                return await self.session_service.get_session(
+                    app_name=self.app_name,
+                    user_id=user_id,
+                    session_id=session_id,
+                )
+            except Exception as e:
+                if _is_not_found(e):
+                    return None
+                if attempt == self.attempts - 1:
+                    raise SessionUnavailable(str(e)) from e
+                print(f"[Reconnect] Session lookup failed ({e}), retrying")
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def open_session(self, user_id: str, session_id: Optional[str] = None):
+        """Resume session_id if it exists, otherwise create a new session.
+
+        A quick reconnect gets a SessionSnapshot (id, user_id and
+        last_update_time) instead of the Session. Raises SessionUnavailable
+        when the session service keeps failing.
+        """
+        if session_id:
+            snapshot = self._sessions.get((user_id, session_id))
+            if snapshot is not None:
+                print(f"[Reconnect] Resumed session {session_id} from snapshot")
+                return snapshot
+            session = await self._lookup(user_id, session_id)
+            if session is not None:
+                self.remember(session)
+                return session
+            print(f"[Reconnect] Session {session_id} not found, creating new")
+
+        session = await self.session_service.create_session(
+            app_name=self.app_name,
+            user_id=user_id,
+        )
+        self.remember(session)
+        return session
+
+    async def memory_count(self, user_id: str) -> Optional[int]:
+        """Number of memories for the user, searched at most once per snapshot TTL."""
+        count = self._memory_counts.get(user_id)
+        if count is not None:
+            return count
+        try:
+            memory_response = await self.memory_service.search_memory(
+                app_name=self.app_name,
+                user_id=user_id,
+                query=MEMORY_QUERY,
+            )
+        except Exception as e:
+            print(f"[Memory] Search error: {e}")
+            return None
+        # SearchMemoryResponse has a .memories attribute
+        count = len(getattr(memory_response, "memories", []) or [])
+        self._memory_counts.put(user_id, count)
+        return count
+
+    async def save_to_memory(self, session) -> bool:
+        """Save the session to memory unless this version was already saved."""
+        if session is None or self._saved.get(session.id) == session.last_update_time:
+            return False
+        if isinstance(session, SessionSnapshot):
+            session = await self._lookup(session.user_id, session.id)
+            if session is None:
+                return False
+        await self.memory_service.add_session_to_memory(session)
+        self._saved.put(session.id, session.last_update_time)
+        return True
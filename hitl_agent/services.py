@@ -14,9 +14,15 @@ def _create_vertex_services_condition(agent_engine_id: Optional[str]):
     return use_vertex and engine_id
 
 
+def sessions_shared_across_processes(agent_engine_id: Optional[str] = None) -> bool:
+    """Whether the configured session service is visible to every worker process."""
+    return bool(_create_vertex_services_condition(agent_engine_id) or os.getenv("SESSION_DB_URL"))
+
+
 def get_session_service(agent_engine_id: Optional[str] = None):
     """
-    Get configured VertexAI Session Service or fall back to in-memory.
+    Get configured VertexAI Session Service, a database-backed service
+    (SESSION_DB_URL), or fall back to in-memory.
     """
     if _create_vertex_services_condition(agent_engine_id):
         from google.adk.sessions import VertexAiSessionService
@@ -25,6 +31,13 @@ def get_session_service(agent_engine_id: Optional[str] = None):
         print(f"Using VertexAiSessionService with Agent Engine: {engine_id}")
         return VertexAiSessionService(agent_engine_id=engine_id)
 
+    db_url = os.getenv("SESSION_DB_URL")
+    if db_url:
+        from google.adk.sessions import DatabaseSessionService
+
+        print(f"Using DatabaseSessionService at {db_url}")
+        return DatabaseSessionService(db_url=db_url)
+
     from google.adk.sessions import InMemorySessionService
     print("Using InMemorySessionService (local testing mode)")
     return InMemorySessionService()
@@ -0,0 +1,53 @@
+"""Uvicorn serving for the FastAPI runners, with optional multi-worker mode."""
+
+import inspect
+import os
+
+import uvicorn
+
+from .services import sessions_shared_across_processes
+
+
+# Seconds a worker may take to import the app (the ADK import alone is slow)
+WORKER_STARTUP_TIMEOUT = int(os.getenv("WORKER_STARTUP_TIMEOUT", "60"))
+
+
+def get_worker_count() -> int:
+    """Worker processes from WEB_CONCURRENCY ("auto" = one per CPU core)."""
+    value = os.getenv("WEB_CONCURRENCY", "1").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def serve(app_path: str, app, host: str = "0.0.0.0", port: int = 8080):
+    """
+    Run the app with uvicorn.
+    
+    Each worker is a separate process that builds its own runner and services
+    in the app lifespan. Sessions must therefore live in a shared service
+    (VertexAI or SESSION_DB_URL); with in-memory sessions we stay at one worker.
+    A WebSocket stays on the worker that accepted it, and a reconnect reloads
+    the session from the shared service, so it may land on any worker.
+    
+    Args:
+        app_path: Import string of the app (e.g. "run_rest:app"), needed by workers
+        app: The app object, used directly in single-worker mode
+    """
+    workers = get_worker_count()
+    if workers > 1 and not sessions_shared_across_processes():
+        print(
+            f"WEB_CONCURRENCY={workers} ignored: in-memory sessions are per process. "
+            "Set AGENT_ENGINE_ID or SESSION_DB_URL to share sessions across workers."
+        )
+        workers = 1
+
+    if workers == 1:
+        uvicorn.run(app, host=host, port=port)
+    else:
+        print(f"Starting {workers} worker processes...")
+        options = {}
+        # Older uvicorn versions have no worker healthcheck setting
+        if "timeout_worker_healthcheck" in inspect.signature(uvicorn.Config).parameters:
+            options["timeout_worker_healthcheck"] = WORKER_STARTUP_TIMEOUT
+        uvicorn.run(app_path, host=host, port=port, workers=workers, **options)
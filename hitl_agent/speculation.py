@@ -0,0 +1,287 @@
+"""Speculative pre-generation of likely revisions (opt-in).
+
+While a proposal waits for the human's decision, SpeculationPlugin prepares a
+revised version of the section users reject most often, for the feedback they
+give most often (e.g. "cheaper hotels" for accommodation). The statistics are
+collected by process_rejection in app-wide state, across all users.
+
+If the human then rejects only that section with matching feedback, the
+prepared section is applied and the revised proposal is returned by
+process_rejection itself, without running iterative_agent: like the present
+tools it ends the turn (skip_summarization), and its response is marked
+"presented" so tools.event_text shows it to the user. Any other decision
+falls back to the normal flow. Approval or a new request cancels the
+speculation, and all speculative model calls share a token budget per rolling
+hour. A speculation reserves its estimated cost when it starts, so concurrent
+sessions cannot overrun the budget together, and the reservation is settled
+against the actual usage when it finishes.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Any, Optional
+
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from .legs import trip_legs
+from .trips import trip_state
+
+
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "FALSE").upper() == "TRUE"
+SPECULATION_MODEL = os.getenv("SPECULATION_MODEL", "gemini-2.0-flash")
+
+# Total tokens speculative calls may spend per rolling hour, in this process
+SPECULATION_TOKEN_BUDGET = int(os.getenv("SPECULATION_TOKEN_BUDGET", "200000"))
+
+# Only speculate on feedback seen at least this many times
+SPECULATION_MIN_REJECTIONS = int(os.getenv("SPECULATION_MIN_REJECTIONS", "3"))
+
+# Keyword overlap (0-1) a rejection needs with the anticipated feedback
+SPECULATION_MATCH_THRESHOLD = float(os.getenv("SPECULATION_MATCH_THRESHOLD", "0.5"))
+
+# Output tokens assumed for a revision until the call reports its usage
+ESTIMATED_OUTPUT_TOKENS = 1024
+
+STATS_KEY = "app:rejection_stats"
+MAX_FEEDBACK_PER_SECTION = 20
+MAX_SESSIONS = 1000
+
+# Fix-tool arguments for each section, in the order the tools take them
+SECTION_FIELDS = {
+    "route": ["improved_route", "transportation", "estimated_time"],
+    "accommodation": ["improved_hotels", "price_range", "locations"],
+    "activities": ["improved_activities", "highlights", "schedule"],
+}
+
+_STOPWORDS = {
+    "a", "an", "the", "i", "we", "want", "need", "would", "like", "please",
+    "to", "of", "for", "and", "or", "with", "in", "on", "is", "are", "be",
+    "more", "some", "it", "this", "that", "me", "my", "our", "instead",
+}
+
+
+def feedback_keywords(feedback: str) -> frozenset[str]:
+    """Significant lower-case words of a feedback text."""
+    words = re.findall(r"[a-z]+", (feedback or "").lower())
+    return frozenset(word for word in words if word not in _STOPWORDS)
+
+
+def feedback_matches(feedback: str, anticipated: str) -> bool:
+    actual, expected = feedback_keywords(feedback), feedback_keywords(anticipated)
+    if not actual or not expected:
+        return False
+    return len(actual & expected) / len(actual | expected) >= SPECULATION_MATCH_THRESHOLD
+
+
+def record_rejection(state, affected_section: str, feedback: str) -> None:
+    """Count a rejection in the app-wide statistics used to pick speculations."""
+    section = (affected_section or "").strip().lower()
+    if section not in SECTION_FIELDS:
+        return
+    stats = dict(state.get(STATS_KEY) or {})
+    entry = dict(stats.get(section) or {"count": 0, "feedback": {}})
+    entry["count"] += 1
+
+    key = " ".join(sorted(feedback_keywords(feedback)))
+    if key:
+        counts = dict(entry["feedback"])
+        sample = counts.get(key, {"text": feedback.strip(), "count": 0})
+        counts[key] = {"text": sample["text"], "count": sample["count"] + 1}
+        # Keep the most frequent feedback only
+        top = sorted(counts.items(), key=lambda item: -item[1]["count"])
+        entry["feedback"] = dict(top[:MAX_FEEDBACK_PER_SECTION])
+
+    stats[section] = entry
+    # Reassign so the change is recorded as a state delta
+    state[STATS_KEY] = stats
+
+
+def most_likely_rejection(stats: dict) -> Optional[tuple[str, str]]:
+    """(section, feedback) most often rejected, if seen often enough."""
+    best = None
+    for section, entry in (stats or {}).items():
+        for sample in entry.get("feedback", {}).values():
+            if sample["count"] >= SPECULATION_MIN_REJECTIONS and (
+                best is None or sample["count"] > best[2]
+            ):
+                best = (section, sample["text"], sample["count"])
+    return (best[0], best[1]) if best else None
+
+
+class Speculation:
+    """One in-flight or finished pre-generated revision for a session."""
+
+    def __init__(self, section: str, feedback: str, trip_id: Optional[str] = None):
+        self.section = section
+        self.feedback = feedback
+        self.trip_id = trip_id
+        self.task: Optional[asyncio.Task] = None
+        self.fix_args: Optional[dict] = None
+        self.estimated_tokens = 0
+        self.tokens_used: Optional[int] = None
+
+
+class SpeculationPlugin(BasePlugin):
+    """Pre-generates the most likely revision while approval is pending."""
+
+    def __init__(
+        self,
+        model: str = SPECULATION_MODEL,
+        token_budget: int = SPECULATION_TOKEN_BUDGET,
+    ):
+        super().__init__(name="speculation")
+        self.model = model
+        self.token_budget = token_budget
+        self._client = None
+        self._speculations: dict[str, Speculation] = {}  # session id -> speculation
+        self._spent: list[tuple[float, int]] = []  # (time, tokens) in the last hour
+        self._reserved: dict[Speculation, int] = {}  # running speculation -> estimated tokens
+
+    def _get_client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client()
+        return self._client
+
+    def _tokens_spent(self) -> int:
+        """Tokens spent in the last hour plus those reserved by running speculations."""
+        cutoff = time.time() - 3600
+        self._spent = [(at, tokens) for at, tokens in self._spent if at > cutoff]
+        return sum(tokens for _, tokens in self._spent) + sum(self._reserved.values())
+
+    def _cancel(self, session_id: str) -> None:
+        speculation = self._speculations.pop(session_id, None)
+        if speculation and speculation.task and not speculation.task.done():
+            speculation.task.cancel()
+            print(f"[Speculation] Cancelled {speculation.section} revision for {session_id}")
+
+    @staticmethod
+    def _prompt(speculation: Speculation, state: dict) -> str:
+        fields = SECTION_FIELDS[speculation.section]
+        request = state.get("request", {})
+        return (
+            f"A traveller is reviewing this {speculation.section} for a "
+            f"{request.get('duration_days')} day trip from "
+            f"{request.get('start_location')} to {request.get('destination')}:\n\n"
+            f"{state.get(speculation.section, '')}\n\n"
+            f"They are likely to reject it with the feedback: \"{speculation.feedback}\".\n"
+            f"Write an improved {speculation.section} that addresses this feedback. "
+            f"Reply with a JSON object with the string fields: {', '.join(fields)}."
+        )
+
+    async def _generate(self, speculation: Speculation, prompt: str) -> None:
+        fields = SECTION_FIELDS[speculation.section]
+        response = await self._get_client().aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(response_mime_type="application/json"),
+        )
+        usage = response.usage_metadata
+        speculation.tokens_used = (usage.total_token_count or 0) if usage else 0
+
+        fix_args = json.loads(response.text)
+        speculation.fix_args = {field: str(fix_args.get(field, "")) for field in fields}
+        print(f"[Speculation] Prepared {speculation.section} revision for '{speculation.feedback}'")
+
+    def _start(self, session_id: str, state: dict, trip_id: Optional[str]) -> None:
+        self._cancel(session_id)
+        likely = most_likely_rejection(state.get(STATS_KEY))
+        # Multi-city proposals are revised per leg, not per section
+        if not likely or not state.get(likely[0]) or trip_legs(state):
+            return
+
+        speculation = Speculation(*likely, trip_id=trip_id)
+        prompt = self._prompt(speculation, state)
+        # ~4 characters per prompt token, plus the revised section
+        speculation.estimated_tokens = len(prompt) // 4 + ESTIMATED_OUTPUT_TOKENS
+        if self._tokens_spent() + speculation.estimated_tokens > self.token_budget:
+            print("[Speculation] Token budget exhausted, not speculating")
+            return
+
+        self._reserved[speculation] = speculation.estimated_tokens
+        speculation.task = asyncio.create_task(self._generate(speculation, prompt))
+        speculation.task.add_done_callback(lambda task: self._settle(speculation))
+        speculation.task.add_done_callback(self._log_failure)
+        self._speculations[session_id] = speculation
+        while len(self._speculations) > MAX_SESSIONS:
+            self._cancel(next(iter(self._speculations)))
+
+    def _settle(self, speculation: Speculation) -> None:
+        """Replace a finished speculation's reservation with what it spent."""
+        self._reserved.pop(speculation, None)
+        # A call cancelled or failed before reporting usage is charged the estimate
+        tokens = speculation.tokens_used
+        self._spent.append((time.time(), speculation.estimated_tokens if tokens is None else tokens))
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            print(f"[Speculation] Failed: {task.exception()}")
+
+    def _serve(self, speculation: Speculation, tool_context: ToolContext) -> Optional[str]:
+        # Imported here: tools.py imports record_rejection from this module
+        from . import tools
+
+        fixers = {
+            "route": tools.fix_route,
+            "accommodation": tools.fix_accommodation,
+            "activities": tools.fix_activities,
+        }
+        fixers[speculation.section](**speculation.fix_args, tool_context=tool_context)
+        return tools.present_revised_proposal(
+            summary=f"Updated {speculation.section}: {speculation.feedback}",
+            tool_context=tool_context,
+        )
+
+    async def before_tool_callback(
+        self,
+        *,
+        tool,
+        tool_args: dict[str, Any],
+        tool_context: ToolContext,
+    ) -> Optional[dict]:
+        # Approval or a new request makes any pending speculation useless
+        if tool.name in ("process_approval", "capture_request"):
+            self._cancel(tool_context.session.id)
+        return None
+
+    async def after_tool_callback(
+        self,
+        *,
+        tool,
+        tool_args: dict[str, Any],
+        tool_context: ToolContext,
+        result: Any,
+    ) -> Optional[dict]:
+        session_id = tool_context.session.id
+
+        if tool.name in ("present_proposal", "present_revised_proposal"):
+            trip = trip_state(tool_context.state)
+            self._start(session_id, trip.to_dict(), trip.trip_id)
+            return None
+
+        if tool.name != "process_rejection":
+            return None
+
+        speculation = self._speculations.pop(session_id, None)
+        if not speculation:
+            return None
+        if (
+            speculation.fix_args is None
+            or trip_state(tool_context.state).trip_id != speculation.trip_id
+            or trip_state(tool_context.state).get("affected_sections") != [speculation.section]
+            or not feedback_matches(tool_args.get("feedback", ""), speculation.feedback)
+        ):
+            if speculation.task and not speculation.task.done():
+                speculation.task.cancel()
+            return None
+
+        proposal = self._serve(speculation, tool_context)
+        print(f"[Speculation] Served prepared {speculation.section} revision for {session_id}")
+        # present_revised_proposal set skip_summarization: this response is the reply
+        return {"result": proposal, "presented": True}
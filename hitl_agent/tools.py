@@ -1,7 +1,53 @@
 """HITL Tools - turn-based approval flow."""
 
+import os
+import re
+from typing import Optional
+
 from google.adk.tools import ToolContext
 
+from .candidates import choose_candidate
+from .legs import MAX_TRIP_LEGS, build_legs, leg_for_feedback, trip_legs, trip_path
+from .preferences import learn_from_approval, learn_from_rejection
+from .speculation import record_rejection
+from .trips import new_trip, other_trips_text, select_trip, trip_state
+
+
+# Tools whose result is shown to the user verbatim (see event_text)
+PRESENT_TOOLS = {"present_proposal", "present_revised_proposal"}
+
+# Proposal sections a rejection can revise, in proposal order
+SECTIONS = ("route", "accommodation", "activities")
+
+# Hand off to proposal_agent in capture_request's own response, saving the root
+# model call that would otherwise decide on the transfer. Generation still runs
+# inline in the turn; it is not started in the background.
+DIRECT_PROPOSAL_HANDOFF = os.getenv("DIRECT_PROPOSAL_HANDOFF", "FALSE").upper() == "TRUE"
+
+
+def missing_request_details(request: dict) -> list[str]:
+    """Details a request needs before proposal_agent can plan it."""
+    missing = []
+    if not str(request.get("start_location") or "").strip():
+        missing.append("origin")
+    if not str(request.get("destination") or "").strip():
+        missing.append("destination")
+    try:
+        days = int(request.get("duration_days") or 0)
+    except (TypeError, ValueError):
+        days = 0
+    if days < 1:
+        missing.append("number of days")
+    return missing
+
+
+def parse_sections(sections) -> list[str]:
+    """Known sections named in a list or comma-separated string, in proposal order."""
+    if isinstance(sections, str):
+        sections = re.split(r"[,/\s]+", sections)
+    names = {str(section).strip().lower() for section in sections or []}
+    return [section for section in SECTIONS if section in names]
+
 
 # ============================================================================
 # RECALL / SHOW PREVIOUS TRIPS
@@ -9,33 +55,50 @@ from google.adk.tools import ToolContext
 
 def show_final_plan(
     tool_context: ToolContext,
+    trip_id: str = "",
 ) -> str:
-    """Show the finalized trip plan from current session."""
-    final_plan = tool_context.state.get("final_proposal")
+    """
+    Show the finalized trip plan from current session.
+    
+    Args:
+        trip_id: The trip to show (its id or destination); defaults to the current trip
+    """
+    trip = select_trip(tool_context.state, trip_id)
+    others = other_trips_text(tool_context.state)
+    others = f"\n\n{others}" if others else ""
+    final_plan = trip.get("final_proposal")
     if final_plan:
-        return f"Here is your finalized trip plan:\n\n{final_plan}"
+        return f"Here is your finalized trip plan:\n\n{final_plan}{others}"
     
-    pending = tool_context.state.get("pending_proposal")
+    pending = trip.get("pending_proposal")
     if pending:
-        return f"You have a pending proposal (not yet approved):\n\n{pending}"
+        return f"You have a pending proposal (not yet approved):\n\n{pending}{others}"
     
     return "No trip plan found in current session. Would you like to plan a new trip?"
 
 
 def recall_trip_info(
     tool_context: ToolContext,
+    trip_id: str = "",
 ) -> str:
-    """Recall trip information from current session state."""
-    request = tool_context.state.get("request", {})
-    route = tool_context.state.get("route", "")
-    accommodation = tool_context.state.get("accommodation", "")
-    activities = tool_context.state.get("activities", "")
-    finalized = tool_context.state.get("trip_finalized", False)
+    """
+    Recall trip information from current session state.
+    
+    Args:
+        trip_id: The trip to recall (its id or destination); defaults to the current trip
+    """
+    trip = select_trip(tool_context.state, trip_id)
+    request = trip.get("request", {})
+    route = trip.get("route", "")
+    accommodation = trip.get("accommodation", "")
+    activities = trip.get("activities", "")
+    finalized = trip.get("trip_finalized", False)
     
     if not request:
         return "No trip information found. Would you like to plan a new trip?"
     
-    info = f"Trip to {request.get('destination', 'unknown')} from {request.get('start_location', 'unknown')}\n"
+    info = f"Trip to {request.get('destination', 'unknown')} from {request.get('start_location', 'unknown')}"
+    info += f" (trip {trip.trip_id})\n" if trip.trip_id else "\n"
     info += f"Duration: {request.get('duration_days', '?')} days\n"
     info += f"Status: {'Finalized' if finalized else 'In progress'}\n\n"
     
@@ -46,6 +109,10 @@ def recall_trip_info(
     if activities:
         info += f"{activities}\n"
     
+    others = other_trips_text(tool_context.state)
+    if others:
+        info += f"\n{others}\n"
+    
     return info
 
 
@@ -58,22 +125,49 @@ def capture_request(
     start_location: str,
     duration_days: int,
     tool_context: ToolContext,
+    stops: Optional[list[str]] = None,
+    days_per_city: Optional[list[int]] = None,
 ) -> str:
     """
     Capture user's travel request. Only requires source, destination, and days.
     
     Args:
-        destination: Where the user wants to go
+        destination: Where the user wants to go (the last city of a multi-city trip)
         start_location: Where the user is starting from
         duration_days: How many days for the trip
+        stops: For multi-city trips, the cities visited before destination, in order
+        days_per_city: Optional days at each of stops and then destination
     """
-    tool_context.state["request"] = {
+    request = {
         "destination": destination,
         "start_location": start_location,
         "duration_days": duration_days,
     }
-    tool_context.state["awaiting_approval"] = False
-    return f"Request captured: {duration_days} day trip to {destination} from {start_location}. Delegating to proposal_agent."
+    if stops:
+        # Multi-city: ordered legs through the stops to the destination (see legs.py)
+        legs = build_legs(start_location, [*stops, destination], duration_days, days_per_city)
+        if len(legs) > MAX_TRIP_LEGS:
+            return f"Request not captured: a trip can visit at most {MAX_TRIP_LEGS} cities."
+        request["legs"] = legs
+        request["duration_days"] = sum(leg["days"] for leg in legs)
+    # A new trip: earlier trips in the session keep their own state
+    trip = new_trip(tool_context.state, destination)
+    trip["request"] = request
+    trip["awaiting_approval"] = False
+    missing = missing_request_details(request)
+    if missing:
+        # Never hand off an incomplete request: the root agent confirms it first
+        return (
+            f"Request captured as trip {trip.trip_id}, but the {', '.join(missing)} "
+            "is missing. Ask the user for it before delegating to proposal_agent."
+        )
+    if DIRECT_PROPOSAL_HANDOFF:
+        # ADK runs the transfer right after this tool's response
+        tool_context.actions.transfer_to_agent = "proposal_agent"
+    return (
+        f"Request captured as trip {trip.trip_id}: {request['duration_days']} day trip "
+        f"{trip_path(request)}. Delegating to proposal_agent."
+    )
 
 
 # ============================================================================
@@ -87,8 +181,9 @@ def generate_route(
     tool_context: ToolContext,
 ) -> str:
     """Generate route plan and save to state."""
+    trip = trip_state(tool_context.state)
     route = f"ROUTE:\n{route_description}\nTransportation: {transportation}\nTime: {estimated_time}"
-    tool_context.state["route"] = route
+    trip["route"] = route
     return "Route saved."
 
 
@@ -99,21 +194,19 @@ def generate_accommodation(
     tool_context: ToolContext,
 ) -> str:
     """Generate accommodation plan and save to state."""
+    trip = trip_state(tool_context.state)
     accommodation = f"ACCOMMODATIONS:\n{hotels}\nPrice: {price_range}\nLocations: {locations}"
-    tool_context.state["accommodation"] = accommodation
+    trip["accommodation"] = accommodation
     return "Accommodation saved."
 
 
-def generate_activities(
+def format_activities(
     activities: str,
     highlights: str,
     schedule: str,
-    tool_context: ToolContext,
 ) -> str:
-    """Generate activity plan and save to state."""
-    activities_plan = f"ACTIVITIES:\n{activities}\nHighlights: {highlights}\nSchedule: {schedule}"
-    tool_context.state["activities"] = activities_plan
-    return "Activities saved."
+    """Activity plan text, merged from the day ranges of activity_agent."""
+    return f"ACTIVITIES:\n{activities}\nHighlights: {highlights}\nSchedule: {schedule}"
 
 
 def present_proposal(
@@ -124,14 +217,15 @@ def present_proposal(
     Combine all parts and present for human review.
     Sets awaiting_approval=True so next user message is treated as decision.
     """
-    request = tool_context.state.get("request", {})
-    route = tool_context.state.get("route", "No route")
-    accommodation = tool_context.state.get("accommodation", "No accommodation")
-    activities = tool_context.state.get("activities", "No activities")
+    trip = trip_state(tool_context.state)
+    request = trip.get("request", {})
+    route = trip.get("route", "No route")
+    accommodation = trip.get("accommodation", "No accommodation")
+    activities = trip.get("activities", "No activities")
     
     proposal = f"""
 ================================================================================
-TRIP PROPOSAL: {request.get('start_location')} → {request.get('destination')}
+TRIP PROPOSAL: {trip_path(request)}
 Duration: {request.get('duration_days')} days
 ================================================================================
 
@@ -149,8 +243,10 @@ Please review and reply with:
 - 'approve' to finalize this trip plan
 - 'reject: <your feedback>' to request changes (e.g., 'reject: need cheaper hotels')
 """
-    tool_context.state["pending_proposal"] = proposal
-    tool_context.state["awaiting_approval"] = True
+    trip["pending_proposal"] = proposal
+    trip["awaiting_approval"] = True
+    # The rendered proposal is the reply: end the turn without a model echo
+    tool_context.actions.skip_summarization = True
     
     return proposal
 
@@ -161,12 +257,28 @@ Please review and reply with:
 
 def process_approval(
     tool_context: ToolContext,
+    option: int = 0,
+    trip_id: str = "",
 ) -> str:
-    """Process approval and finalize the trip."""
-    proposal = tool_context.state.get("pending_proposal", "")
-    tool_context.state["final_proposal"] = proposal
-    tool_context.state["awaiting_approval"] = False
-    tool_context.state["trip_finalized"] = True
+    """
+    Process approval and finalize the trip.
+    
+    Args:
+        option: The 1-based option the user chose, if the proposal offers options
+        trip_id: The trip approved (its id or destination); defaults to the current trip
+    """
+    trip = select_trip(tool_context.state, trip_id)
+    candidates = trip.get("candidates")
+    if candidates and not choose_candidate(trip, option):
+        return (
+            f"Not finalized yet: please choose one of the {len(candidates['options'])} "
+            f"{candidates['section']} options ('approve <option number>')."
+        )
+    proposal = trip.get("pending_proposal", "")
+    learn_from_approval(tool_context.session.user_id, proposal)
+    trip["final_proposal"] = proposal
+    trip["awaiting_approval"] = False
+    trip["trip_finalized"] = True
     tool_context.state["approved"] = True  # Triggers memory save
     
     return "Trip plan approved and finalized! Have a great trip!"
@@ -174,21 +286,42 @@ def process_approval(
 
 def process_rejection(
     feedback: str,
-    affected_section: str,
+    affected_sections: list[str],
     tool_context: ToolContext,
+    affected_leg: int = 0,
+    trip_id: str = "",
 ) -> str:
     """
     Process rejection with feedback.
     
     Args:
         feedback: What the user wants changed
-        affected_section: Which section to fix (route/accommodation/activities)
+        affected_sections: Every section the feedback touches (route/accommodation/activities)
+        affected_leg: For multi-city trips, the 1-based leg the feedback is about (0 if none)
+        trip_id: The trip rejected (its id or destination); defaults to the current trip
     """
-    tool_context.state["feedback"] = feedback
-    tool_context.state["affected_section"] = affected_section
-    tool_context.state["awaiting_approval"] = False
+    # The trip to revise becomes the current one, which iterative_agent works on
+    trip = select_trip(tool_context.state, trip_id)
+    # Feedback that names no known section revises the whole plan
+    sections = parse_sections(affected_sections) or list(SECTIONS)
+    legs = trip_legs(trip)
+    if legs and not 0 < affected_leg <= len(legs):
+        # A leg whose city the feedback names, else 0: re-plan every leg
+        affected_leg = leg_for_feedback(legs, feedback)
+    trip["feedback"] = feedback
+    trip["affected_sections"] = sections
+    trip["affected_leg"] = affected_leg if legs else 0
+    trip["awaiting_approval"] = False
+    candidates = trip.get("candidates")
+    if candidates and candidates["section"] in sections:
+        # The options were all rejected: the fixer revises the section as usual
+        trip["candidates"] = None
+    for section in sections:
+        record_rejection(tool_context.state, section, feedback)
+    learn_from_rejection(tool_context.session.user_id, feedback)
     
-    return f"Feedback received: '{feedback}' for {affected_section}. Routing to fix."
+    target = f"leg {affected_leg}" if legs and affected_leg else ", ".join(sections)
+    return f"Feedback received: '{feedback}' for {target}. Routing to fix."
 
 
 # ============================================================================
@@ -202,9 +335,12 @@ def fix_route(
     tool_context: ToolContext,
 ) -> str:
     """Fix route based on feedback."""
-    feedback = tool_context.state.get("feedback", "")
+    trip = trip_state(tool_context.state)
+    feedback = trip.get("feedback", "")
     route = f"ROUTE (REVISED - {feedback}):\n{improved_route}\nTransportation: {transportation}\nTime: {estimated_time}"
-    tool_context.state["route"] = route
+    trip["route"] = route
+    # Each fixer revises one section; present_revised_proposal runs after all of them
+    tool_context.actions.skip_summarization = True
     return "Route updated."
 
 
@@ -215,9 +351,12 @@ def fix_accommodation(
     tool_context: ToolContext,
 ) -> str:
     """Fix accommodation based on feedback."""
-    feedback = tool_context.state.get("feedback", "")
+    trip = trip_state(tool_context.state)
+    feedback = trip.get("feedback", "")
     accommodation = f"ACCOMMODATIONS (REVISED - {feedback}):\n{improved_hotels}\nPrice: {price_range}\nLocations: {locations}"
-    tool_context.state["accommodation"] = accommodation
+    trip["accommodation"] = accommodation
+    # Each fixer revises one section; present_revised_proposal runs after all of them
+    tool_context.actions.skip_summarization = True
     return "Accommodation updated."
 
 
@@ -228,9 +367,12 @@ def fix_activities(
     tool_context: ToolContext,
 ) -> str:
     """Fix activities based on feedback."""
-    feedback = tool_context.state.get("feedback", "")
+    trip = trip_state(tool_context.state)
+    feedback = trip.get("feedback", "")
     activities = f"ACTIVITIES (REVISED - {feedback}):\n{improved_activities}\nHighlights: {highlights}\nSchedule: {schedule}"
-    tool_context.state["activities"] = activities
+    trip["activities"] = activities
+    # Each fixer revises one section; present_revised_proposal runs after all of them
+    tool_context.actions.skip_summarization = True
     return "Activities updated."
 
 
@@ -239,16 +381,17 @@ def present_revised_proposal(
     tool_context: ToolContext,
 ) -> str:
     """Present revised proposal for re-approval."""
-    request = tool_context.state.get("request", {})
-    route = tool_context.state.get("route", "No route")
-    accommodation = tool_context.state.get("accommodation", "No accommodation")
-    activities = tool_context.state.get("activities", "No activities")
-    feedback = tool_context.state.get("feedback", "")
+    trip = trip_state(tool_context.state)
+    request = trip.get("request", {})
+    route = trip.get("route", "No route")
+    accommodation = trip.get("accommodation", "No accommodation")
+    activities = trip.get("activities", "No activities")
+    feedback = trip.get("feedback", "")
     
     proposal = f"""
 ================================================================================
 REVISED TRIP PROPOSAL (based on your feedback: {feedback})
-{request.get('start_location')} → {request.get('destination')}
+{trip_path(request)}
 Duration: {request.get('duration_days')} days
 ================================================================================
 
@@ -266,7 +409,35 @@ Please review and reply with:
 - 'approve' to finalize this trip plan
 - 'reject: <your feedback>' to request more changes
 """
-    tool_context.state["pending_proposal"] = proposal
-    tool_context.state["awaiting_approval"] = True
+    trip["pending_proposal"] = proposal
+    trip["awaiting_approval"] = True
+    # The rendered proposal is the reply: end the turn without a model echo
+    tool_context.actions.skip_summarization = True
     
     return proposal
+
+
+# ============================================================================
+# PASSTHROUGH - presented proposals go to the client as the tool result
+# ============================================================================
+
+def event_text(event) -> str:
+    """User-facing text of an event: model text or a presented proposal.
+
+    The present tools end the model turn with skip_summarization, so their
+    rendered proposal arrives as a function response instead of being echoed
+    back by the model as text. A response marked "presented" (a speculative
+    revision served by process_rejection, see speculation.py) carries the
+    proposal the same way.
+    """
+    if not event.content or not event.content.parts:
+        return ""
+    text = ""
+    for part in event.content.parts:
+        if part.text:
+            text += part.text
+        elif part.function_response and event.actions.skip_summarization:
+            response = part.function_response.response or {}
+            if part.function_response.name in PRESENT_TOOLS or response.get("presented"):
+                text += str(response.get("result", ""))
+    return text
@@ -0,0 +1,167 @@
+"""Trip-scoped session state: several trips in one session.
+
+Every trip gets a unique id when capture_request records it ("goa-3f9a1c",
+"jaipur-b27e04", ...), and its fields are kept under trip:<id>:<field>:
+    trip:goa-3f9a1c:request, trip:goa-3f9a1c:route, ...
+so a new request no longer overwrites the trip before it. There is no
+session-wide list or pointer that concurrent turns could overwrite: the trips
+are found from their own keys, and every key a turn writes belongs to its own
+trip.
+
+The trip a turn works on is kept in temp:current_trip, which lives only for
+the invocation (ADK never persists temp: keys), so concurrent turns in one
+session each keep their own. capture_request sets it to the new trip and a
+tool given a trip_id sets it to that trip. A turn that names no trip works on
+the trip most recently captured or named (trip:<id>:selected_at).
+
+Code reads a trip through TripState, a view that maps the trip fields to the
+trip's keys and passes every other key (app:, user:, agent scratch keys)
+through unchanged:
+    trip = trip_state(tool_context.state)
+    trip["route"] = route  # -> trip:<current>:route
+Sessions from before trip ids (no trips) read the old flat keys.
+
+Several trips per session is a hitl_agent feature: the A2A orchestrator,
+proposal_agent and iterative_agent keep one trip per session in flat keys.
+"""
+
+import re
+import time
+import uuid
+from typing import Optional
+
+
+# Per-trip fields; everything else in state is shared by the session
+TRIP_FIELDS = {
+    "request", "route", "accommodation", "activities",
+    "pending_proposal", "awaiting_approval", "final_proposal", "trip_finalized",
+    "feedback", "affected_sections", "affected_leg", "candidates", "leg_plans",
+    "candidate_section", "candidate_1", "candidate_2", "candidate_3",
+    "created_at", "selected_at",
+}
+
+# The trip this invocation works on (temp: keys are never persisted)
+CURRENT_TRIP_KEY = "temp:current_trip"
+
+
+def trip_key(trip_id: str, field: str) -> str:
+    return f"trip:{trip_id}:{field}"
+
+
+class TripState:
+    """One trip's view of session state: trip fields live under trip:<id>:<field>."""
+
+    def __init__(self, state, trip_id: Optional[str]):
+        self.state = state
+        self.trip_id = trip_id
+
+    def _key(self, key: str) -> str:
+        if self.trip_id and key in TRIP_FIELDS:
+            return trip_key(self.trip_id, key)
+        return key
+
+    def get(self, key: str, default=None):
+        return self.state.get(self._key(key), default)
+
+    def __getitem__(self, key: str):
+        return self.state[self._key(key)]
+
+    def __setitem__(self, key: str, value) -> None:
+        self.state[self._key(key)] = value
+
+    def __contains__(self, key: str) -> bool:
+        return self._key(key) in self.state
+
+    def to_dict(self) -> dict:
+        """Plain dict of the session state with this trip's fields unprefixed."""
+        state = self.state.to_dict() if hasattr(self.state, "to_dict") else dict(self.state)
+        if self.trip_id:
+            for field in TRIP_FIELDS:
+                state[field] = state.get(trip_key(self.trip_id, field))
+        return state
+
+
+def trip_ids(state) -> list[str]:
+    """Ids of the session's trips, oldest first."""
+    keys = state.to_dict() if hasattr(state, "to_dict") else state
+    ids = [
+        key[len("trip:"):-len(":created_at")]
+        for key in keys
+        if key.startswith("trip:") and key.endswith(":created_at")
+    ]
+    return sorted(ids, key=lambda trip_id: state.get(trip_key(trip_id, "created_at")) or 0)
+
+
+def current_trip_id(state) -> Optional[str]:
+    """This invocation's trip, else the trip most recently captured or named."""
+    trip_id = state.get(CURRENT_TRIP_KEY)
+    if trip_id:
+        return trip_id
+    ids = trip_ids(state)
+    if not ids:
+        return None
+    return max(ids, key=lambda trip_id: state.get(trip_key(trip_id, "selected_at")) or 0)
+
+
+def trip_state(state, trip_id: Optional[str] = None) -> TripState:
+    """View of the given trip, or of the current trip."""
+    return TripState(state, trip_id or current_trip_id(state))
+
+
+def new_trip(state, destination: str) -> TripState:
+    """Register a new trip, make it this invocation's trip and return its view."""
+    slug = re.sub(r"[^a-z0-9]+", "-", (destination or "trip").lower()).strip("-") or "trip"
+    trip = TripState(state, f"{slug}-{uuid.uuid4().hex[:6]}")
+    now = time.time()
+    trip["created_at"] = now
+    trip["selected_at"] = now
+    state[CURRENT_TRIP_KEY] = trip.trip_id
+    return trip
+
+
+def find_trip(state, reference: str) -> Optional[str]:
+    """Trip id for an id or a destination name (the latest trip there)."""
+    text = (reference or "").strip().lower()
+    if not text:
+        return None
+    ids = trip_ids(state)
+    if text in ids:
+        return text
+    for trip_id in reversed(ids):
+        destination = (state.get(trip_key(trip_id, "request")) or {}).get("destination", "")
+        if destination and (destination.lower() in text or text in destination.lower()):
+            return trip_id
+    return None
+
+
+def select_trip(state, reference: str = "") -> TripState:
+    """View of the referenced trip, else the current one; pinned for this invocation.
+
+    A referenced trip also becomes the default for later turns that name none.
+    """
+    trip_id = find_trip(state, reference)
+    trip = trip_state(state, trip_id)
+    if trip_id:
+        trip["selected_at"] = time.time()
+    if trip.trip_id:
+        state[CURRENT_TRIP_KEY] = trip.trip_id
+    return trip
+
+
+def trip_status(trip: TripState) -> str:
+    if trip.get("trip_finalized"):
+        return "finalized"
+    if trip.get("awaiting_approval"):
+        return "awaiting approval"
+    return "in progress"
+
+
+def other_trips_text(state) -> str:
+    """One line listing the session's other trips and their status, or ""."""
+    current = current_trip_id(state)
+    others = [
+        f"{trip_id} ({trip_status(trip_state(state, trip_id))})"
+        for trip_id in trip_ids(state)
+        if trip_id != current
+    ]
+    return f"Other trips in this session: {', '.join(others)}" if others else ""
@@ -0,0 +1,282 @@
+"""Deterministic workflow-engine orchestrator (ORCHESTRATOR_MODE=workflow).
+
+The prompt-driven root agent asks a model every turn to re-read ROOT_PROMPT
+and decide what to do, although the capture -> propose -> await -> approve /
+revise loop is fully determined by the turn's intent and by awaiting_approval.
+WorkflowAgent runs that loop as a state machine in code:
+
+    intent      state                    action
+    plan_trip   -                        capture_request, run proposal_agent
+    approve     awaiting_approval        process_approval
+    reject      awaiting_approval        process_rejection, run iterative_agent
+    show_plan   -                        show_final_plan
+    recall      -                        recall_trip_info, else Memory Bank
+    other       -                        short help reply
+
+The model is only used to understand the message: a small structured-output
+call (intent_agent, no history, static prompt) extracts the intent,
+destination/origin/days or the feedback and its sections. Plain "approve",
+"show my plan" and "reject: cheaper hotels" are recognised without any model
+call. Tools run through the runner's plugin pipeline exactly as when the model
+calls them, so metrics, speculation and preference learning keep working.
+"""
+
+import re
+from typing import AsyncGenerator, Literal, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.tools import FunctionTool, ToolContext
+from google.genai import types
+from pydantic import BaseModel, ValidationError
+
+from .legs import trip_legs
+from .trips import CURRENT_TRIP_KEY, find_trip, trip_state
+from .prompts import INTENT_PROMPT
+from .tools import (
+    capture_request,
+    process_approval,
+    process_rejection,
+    recall_trip_info,
+    show_final_plan,
+)
+
+
+APPROVALS = {
+    "approve", "approved", "yes", "ok", "okay", "looks good", "confirm",
+    "confirmed", "accept", "accepted", "lgtm",
+}
+SECTION_KEYWORDS = {
+    "route": ["route", "flight", "fly", "train", "bus", "drive", "transport", "travel time"],
+    "accommodation": ["hotel", "stay", "room", "accommodation", "hostel", "resort", "lodging"],
+    "activities": ["activit", "sightseeing", "itinerary", "museum", "tour", "schedule", "things to do"],
+}
+
+_REJECT = re.compile(r"^\s*reject\s*:\s*(.+)$", re.IGNORECASE | re.DOTALL)
+_SHOW_PLAN = re.compile(r"^\s*(show|what'?s|what is)\b.*\b(plan|trip)\b", re.IGNORECASE)
+
+HELP_TEXT = (
+    "I can plan a trip for you, e.g. 'Plan a 3 day trip to Goa from Mumbai'. "
+    "Once you see a proposal, reply 'approve' or 'reject: <what to change>'."
+)
+
+
+class TurnIntent(BaseModel):
+    """What the user wants this turn (intent_agent's output schema)."""
+
+    intent: Literal["plan_trip", "approve", "reject", "show_plan", "recall", "other"]
+    destination: str = ""
+    start_location: str = ""
+    duration_days: int = 0
+    stops: list[str] = []
+    days_per_city: list[int] = []
+    feedback: str = ""
+    affected_sections: list[Literal["route", "accommodation", "activities"]] = []
+    affected_leg: int = 0
+    option: int = 0
+    trip: str = ""
+
+
+def _user_text(ctx: InvocationContext) -> str:
+    if not ctx.user_content or not ctx.user_content.parts:
+        return ""
+    return "".join(part.text or "" for part in ctx.user_content.parts).strip()
+
+
+def sections_for(feedback: str) -> list[str]:
+    """Every section the feedback mentions, in proposal order."""
+    text = feedback.lower()
+    return [
+        section for section, keywords in SECTION_KEYWORDS.items()
+        if any(keyword in text for keyword in keywords)
+    ]
+
+
+def fast_intent(text: str) -> Optional[TurnIntent]:
+    """Intents recognised without a model call, or None."""
+    if text.lower().rstrip(".! ") in APPROVALS:
+        return TurnIntent(intent="approve")
+    if _SHOW_PLAN.match(text):
+        return TurnIntent(intent="show_plan")
+    rejection = _REJECT.match(text)
+    if rejection:
+        feedback = rejection.group(1).strip()
+        sections = sections_for(feedback)
+        if sections:
+            return TurnIntent(intent="reject", feedback=feedback, affected_sections=sections)
+    return None
+
+
+class WorkflowAgent(BaseAgent):
+    """Root agent that drives the HITL loop in code (see module docstring)."""
+
+    intent_agent: LlmAgent
+    proposal_agent: BaseAgent
+    iterative_agent: BaseAgent
+
+    def _reply(self, ctx: InvocationContext, text: str = "", actions: Optional[EventActions] = None) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]) if text else None,
+            actions=actions or EventActions(),
+        )
+
+    async def _call_tool(self, ctx: InvocationContext, func, **args) -> tuple[str, ToolContext]:
+        """Run a tool through the plugin pipeline, as the LLM flow would."""
+        tool = FunctionTool(func=func)
+        tool_context = ToolContext(ctx)
+        result = await ctx.plugin_manager.run_before_tool_callback(
+            tool=tool, tool_args=args, tool_context=tool_context,
+        )
+        if result is None:
+            result = {"result": await tool.run_async(args=args, tool_context=tool_context)}
+        altered = await ctx.plugin_manager.run_after_tool_callback(
+            tool=tool, tool_args=args, tool_context=tool_context, result=result,
+        )
+        return str((altered or result).get("result", "")), tool_context
+
+    async def _understand(self, ctx: InvocationContext) -> TurnIntent:
+        """One structured-output model call; its events are not part of the chat."""
+        text = ""
+        async for event in self.intent_agent.run_async(ctx):
+            if event.is_final_response() and event.content:
+                text += "".join(part.text or "" for part in event.content.parts or [] if not part.thought)
+        try:
+            return TurnIntent.model_validate_json(text)
+        except ValidationError:
+            print(f"[Workflow] Could not parse intent: {text[:200]}")
+            return TurnIntent(intent="other")
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        text = _user_text(ctx)
+        intent = fast_intent(text) or await self._understand(ctx)
+        print(f"[Workflow] Session {ctx.session.id}: {intent.intent}")
+
+        handlers = {
+            "plan_trip": self._plan_trip,
+            "approve": self._approve,
+            "reject": self._reject,
+            "show_plan": self._show_plan,
+            "recall": self._recall,
+        }
+        handler = handlers.get(intent.intent)
+        if handler is None:
+            yield self._reply(ctx, HELP_TEXT)
+            return
+        async for event in handler(ctx, intent):
+            yield event
+
+    async def _plan_trip(self, ctx: InvocationContext, intent: TurnIntent):
+        if not (intent.destination and intent.start_location and intent.duration_days > 0):
+            yield self._reply(
+                ctx,
+                "To plan a trip I need the destination, starting point and number of days, "
+                "e.g. 'Plan a 3 day trip to Goa from Mumbai'.",
+            )
+            return
+        args = {}
+        if intent.stops:
+            args = {"stops": intent.stops, "days_per_city": intent.days_per_city}
+        result, tool_context = await self._call_tool(
+            ctx, capture_request,
+            destination=intent.destination,
+            start_location=intent.start_location,
+            duration_days=intent.duration_days,
+            **args,
+        )
+        if CURRENT_TRIP_KEY not in tool_context.actions.state_delta:
+            # Not captured (e.g. too many cities): say why instead of planning
+            yield self._reply(ctx, result, tool_context.actions)
+            return
+        yield self._reply(ctx, actions=tool_context.actions)
+        async for event in self.proposal_agent.run_async(ctx):
+            yield event
+
+    def _trip(self, ctx: InvocationContext, intent: TurnIntent):
+        """The trip the user refers to, else the current one."""
+        return trip_state(ctx.session.state, find_trip(ctx.session.state, intent.trip))
+
+    async def _approve(self, ctx: InvocationContext, intent: TurnIntent):
+        if not self._trip(ctx, intent).get("awaiting_approval"):
+            yield self._reply(ctx, "There is no proposal waiting for approval. " + HELP_TEXT)
+            return
+        result, tool_context = await self._call_tool(
+            ctx, process_approval, option=intent.option, trip_id=intent.trip,
+        )
+        yield self._reply(ctx, result, tool_context.actions)
+
+    async def _reject(self, ctx: InvocationContext, intent: TurnIntent):
+        trip = self._trip(ctx, intent)
+        if not trip.get("awaiting_approval"):
+            yield self._reply(ctx, "There is no proposal to revise yet. " + HELP_TEXT)
+            return
+        sections = intent.affected_sections or sections_for(intent.feedback)
+        legs = trip_legs(trip)
+        if not sections and not legs:
+            yield self._reply(ctx, "Which part should change: the route, the accommodation or the activities?")
+            return
+        args = {"affected_leg": intent.affected_leg} if legs else {}
+        _, tool_context = await self._call_tool(
+            ctx, process_rejection,
+            feedback=intent.feedback, affected_sections=sections, trip_id=intent.trip, **args,
+        )
+        trip = trip_state(tool_context.state)
+        if trip.get("awaiting_approval"):
+            # A speculative revision was ready and has already been presented
+            yield self._reply(ctx, trip.get("pending_proposal", ""), tool_context.actions)
+            return
+        yield self._reply(ctx, actions=tool_context.actions)
+        async for event in self.iterative_agent.run_async(ctx):
+            yield event
+
+    async def _show_plan(self, ctx: InvocationContext, intent: TurnIntent):
+        result, tool_context = await self._call_tool(ctx, show_final_plan, trip_id=intent.trip)
+        yield self._reply(ctx, result, tool_context.actions)
+
+    async def _recall(self, ctx: InvocationContext, intent: TurnIntent):
+        result, tool_context = await self._call_tool(ctx, recall_trip_info, trip_id=intent.trip)
+        if not trip_state(ctx.session.state).get("request") and ctx.memory_service:
+            response = await ctx.memory_service.search_memory(
+                app_name=ctx.app_name, user_id=ctx.user_id, query="previous trip plans",
+            )
+            memories = [
+                " ".join(part.text or "" for part in memory.content.parts or []).strip()
+                for memory in response.memories[:5]
+            ]
+            if any(memories):
+                result = "From your previous sessions:\n" + "\n".join(f"- {m}" for m in memories if m)
+        yield self._reply(ctx, result, tool_context.actions)
+
+
+def create_workflow_agent(
+    proposal_agent: BaseAgent,
+    iterative_agent: BaseAgent,
+    nlu_model: str,
+    after_agent_callback=None,
+) -> WorkflowAgent:
+    """Build a WorkflowAgent around copies of the generation agents.
+
+    The agents are cloned because an ADK agent can only have one parent and
+    the originals already belong to the prompt-driven root agent.
+    """
+    proposal_agent = proposal_agent.clone()
+    iterative_agent = iterative_agent.clone()
+    intent_agent = LlmAgent(
+        name="intent_agent",
+        model=nlu_model,
+        instruction=INTENT_PROMPT,
+        include_contents="none",
+        output_schema=TurnIntent,
+    )
+    return WorkflowAgent(
+        name="hitl_orchestrator",
+        description="Orchestrates trip planning with human approval as a state machine",
+        intent_agent=intent_agent,
+        proposal_agent=proposal_agent,
+        iterative_agent=iterative_agent,
+        sub_agents=[intent_agent, proposal_agent, iterative_agent],
+        after_agent_callback=after_agent_callback,
+    )
@@ -10,19 +10,23 @@ import uvicorn
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import (
     AgentCapabilities,
     AgentCard,
     AgentSkill,
 )
 from starlette.applications import Starlette
+from starlette.routing import Route
 
 from dotenv import load_dotenv
 load_dotenv()
 
 from agent import root_agent
 from agent_executor import ADKAgentExecutor
+from caching import context_cache
+from task_store import create_task_store
+from metrics import metrics_endpoint
+from tracing import setup_tracing, shutdown_tracing
 
 
 logging.basicConfig(level=logging.INFO)
@@ -49,11 +53,13 @@ def make_sync(f):
 async def main(host, port):
     """Start the Iterative Agent A2A server."""
     
+    setup_tracing("iterative_agent")
+    
     # Define agent skill
     skill = AgentSkill(
         id="ProposalRevision",
         name="Iterative_Agent",
-        description="Revises and fixes specific parts of a trip proposal based on user feedback. Can fix route, accommodation, or activities while keeping other parts unchanged.",
+        description="Revises and fixes specific parts of a trip proposal based on user feedback. Can fix any combination of route, accommodation and activities in one pass while keeping other parts unchanged.",
         tags=[
             "travel-planning",
             "proposal-revision",
@@ -65,7 +71,8 @@ async def main(host, port):
             "The hotels are too expensive, suggest budget options under $100/night.",
             "I want more outdoor activities and hiking trails.",
             "Change the route to avoid flying, prefer trains.",
-            "Need more restaurant recommendations in the itinerary."
+            "Need more restaurant recommendations in the itinerary.",
+            "Cheaper hotels, and take the train instead of flying."
         ]
     )
     
@@ -78,7 +85,7 @@ async def main(host, port):
     # Define agent card
     agent_card = AgentCard(
         name="ProposalRevision",
-        description="An LlmAgent that fixes and revises specific parts of trip proposals based on user feedback, with Memory Bank integration for personalized corrections.",
+        description="An agent that fixes and revises specific parts of trip proposals based on user feedback, with Memory Bank integration for personalized corrections.",
         url=service_url,
         version="1.0.0",
         defaultInputModes=["text/plain"],
@@ -88,8 +95,8 @@ async def main(host, port):
         supportsAuthenticatedExtendedCard=True,
     )
     
-    # Create task store
-    task_store = InMemoryTaskStore()
+    # Create durable task store (see TASK_STORE_BACKEND)
+    task_store = create_task_store()
     
     # Create request handler with our executor
     request_handler = DefaultRequestHandler(
@@ -108,6 +115,7 @@ async def main(host, port):
     )
     
     routes = a2a_app.routes()
+    routes.append(Route("/metrics", metrics_endpoint))
     app = Starlette(
         routes=routes,
         middleware=[],
@@ -121,15 +129,20 @@ async def main(host, port):
     print(f"Port: {port}")
     print(f"Service URL: {service_url}")
     print(f"Agent Engine ID: {os.getenv('AGENT_ENGINE_ID', 'NOT SET')}")
+    if os.getenv("A2A_LOCAL_MODE", "FALSE").upper() == "TRUE":
+        print(f"Local mode: in-memory services, model {os.getenv('MODEL_ID', 'gemini-2.5-pro')}")
     print("="*60)
     print("\nEndpoints:")
     print(f"  GET  {service_url}/.well-known/agent.json")
     print(f"  POST {service_url}/")
+    print(f"  GET  {service_url}/metrics")
     print("="*60 + "\n")
     
     config = uvicorn.Config(app, host=host, port=port, log_level='info')
     server = uvicorn.Server(config)
     await server.serve()
+    await context_cache.close()
+    shutdown_tracing()
 
 
 if __name__ == '__main__':
@@ -1,4 +1,4 @@
-"""Iterative Agent - LlmAgent that fixes proposals based on feedback."""
+"""Iterative Agent - fixes every affected section in parallel, then presents."""
 
 import os
 import sys
@@ -12,7 +12,7 @@ if script_dir not in sys.path:
 from dotenv import load_dotenv
 load_dotenv()
 
-from google.adk.agents import LlmAgent
+from google.adk.agents import LlmAgent, ParallelAgent, SequentialAgent
 from google.adk.tools import FunctionTool
 from google.genai import types
 
@@ -22,16 +22,21 @@ from tools import (
     fix_activities,
     present_revised_proposal,
 )
-from prompts import ITERATIVE_PROMPT
+from prompts import SECTION_FIXER_PROMPT, REVISION_PRESENTER_PROMPT
 
 
 MODEL_ID = os.getenv("MODEL_ID", "gemini-2.5-pro")
 
+if MODEL_ID.startswith("stub"):
+    # Offline stand-in model for local benchmarking (see stub_model.py)
+    from stub_model import register_stub_model
+    register_stub_model()
+
 
 # ============================================================================
 # ITERATIVE AGENT
-# Has all fix tools directly (no sub-agents) to ensure it can fix AND present
-# revised proposal in the same turn
+# One fixer per section runs in parallel (only the sections the rejection
+# names), then one presenter shows the revised proposal in the same turn
 # ============================================================================
 
 # Configure to prefer tool usage
@@ -43,19 +48,52 @@ generate_config = types.GenerateContentConfig(
     )
 )
 
-iterative_agent = LlmAgent(
-    name="iterative_agent",
-    model=MODEL_ID,
-    description="Fixes specific parts of trip proposal based on user feedback and presents revised version",
-    instruction=ITERATIVE_PROMPT,
-    tools=[
-        FunctionTool(func=fix_route),
-        FunctionTool(func=fix_accommodation),
-        FunctionTool(func=fix_activities),
-        FunctionTool(func=present_revised_proposal),
+
+def _section_fixer(section: str, fix_tool) -> LlmAgent:
+    """LlmAgent that fixes one section, or ends at once if it is not affected."""
+
+    async def skip_unaffected_section(callback_context):
+        if section in callback_context.state.get("affected_sections", []):
+            return None
+        # Returning content ends the agent without a model call
+        return types.Content(role="model", parts=[])
+
+    return LlmAgent(
+        name=f"{section}_fixer",
+        model=MODEL_ID,
+        instruction=SECTION_FIXER_PROMPT.format(section=section, tool=fix_tool.__name__),
+        tools=[FunctionTool(func=fix_tool)],
+        generate_content_config=generate_config,
+        before_agent_callback=skip_unaffected_section,
+    )
+
+
+section_fixers = ParallelAgent(
+    name="section_fixers",
+    description="Fixes every affected section concurrently",
+    sub_agents=[
+        _section_fixer("route", fix_route),
+        _section_fixer("accommodation", fix_accommodation),
+        _section_fixer("activities", fix_activities),
     ],
+)
+
+revision_presenter = LlmAgent(
+    name="revision_presenter",
+    model=MODEL_ID,
+    instruction=REVISION_PRESENTER_PROMPT,
+    tools=[FunctionTool(func=present_revised_proposal)],
     generate_content_config=generate_config,
 )
 
+iterative_agent = SequentialAgent(
+    name="iterative_agent",
+    description="Fixes the affected parts of a trip proposal in parallel based on user feedback and presents revised version",
+    sub_agents=[
+        section_fixers,
+        revision_presenter,
+    ],
+)
+
 # Export as root_agent for the executor
 root_agent = iterative_agent
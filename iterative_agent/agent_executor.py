@@ -1,6 +1,9 @@
 """A2A Agent Executor for Iterative Agent with Memory Bank support."""
 
+import hashlib
+import json
 import os
+import time
 import uuid
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
@@ -9,21 +12,51 @@ from a2a.server.tasks import TaskUpdater
 from a2a.types import Part, TaskState, TextPart
 from a2a.utils import new_agent_text_message, new_task
 
+from google.adk.events import Event, EventActions
 from google.adk.runners import Runner
 from google.genai import types
-from google.adk.memory import VertexAiMemoryBankService
-from google.adk.sessions import VertexAiSessionService
+from google.adk.memory import InMemoryMemoryService, VertexAiMemoryBankService
+from google.adk.sessions import InMemorySessionService, VertexAiSessionService
 
 from agent import root_agent
+from caching import context_cache
+from metrics import MetricsPlugin, STATE_BYTES, observe_services, track_turn
+from tools import SECTIONS, event_text, parse_sections
+from tracing import trace_context, turn_span
 
 
 # Get Agent Engine ID from environment
 ENGINE_ID = os.getenv("AGENT_ENGINE_ID")
 
-if not ENGINE_ID:
+# Local stand-in mode: in-memory sessions and memory, no Agent Engine needed
+A2A_LOCAL_MODE = os.getenv("A2A_LOCAL_MODE", "FALSE").upper() == "TRUE"
+
+if not ENGINE_ID and not A2A_LOCAL_MODE:
     raise ValueError("AGENT_ENGINE_ID environment variable is required")
 
 
+# Keep at most this many compact records in state["conversation_history"]
+HISTORY_MAX_ENTRIES = int(os.getenv("HISTORY_MAX_ENTRIES", "10"))
+
+# Proposal sections fingerprinted in each history record
+SECTION_KEYS = ["route", "accommodation", "activities"]
+
+
+def _digest(text: str) -> str:
+    """Short content hash used to reference full text stored elsewhere."""
+    return hashlib.sha256((text or "").encode()).hexdigest()[:12]
+
+
+def _summarize(text: str, limit: int = 160) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _state_size(state: dict) -> int:
+    """Serialized size of session state in bytes."""
+    return len(json.dumps(state, default=str).encode())
+
+
 class ADKAgentExecutor(AgentExecutor):
     """A2A Executor that integrates ADK agents with VertexAI Memory Bank."""
     
@@ -39,8 +72,13 @@ class ADKAgentExecutor(AgentExecutor):
         self.artifact_name = artifact_name
         
         # Initialize VertexAI services for persistence
-        self.session_service = VertexAiSessionService(agent_engine_id=ENGINE_ID)
-        self.memory_service = VertexAiMemoryBankService(agent_engine_id=ENGINE_ID)
+        if A2A_LOCAL_MODE:
+            self.session_service = InMemorySessionService()
+            self.memory_service = InMemoryMemoryService()
+        else:
+            self.session_service = VertexAiSessionService(agent_engine_id=ENGINE_ID)
+            self.memory_service = VertexAiMemoryBankService(agent_engine_id=ENGINE_ID)
+        observe_services(self.session_service, self.memory_service)
         
         # CRITICAL: Use the SAME app_name across ALL agents for shared memory!
         # This must match orchestrator and proposal_agent
@@ -52,10 +90,18 @@ class ADKAgentExecutor(AgentExecutor):
             agent=agent,
             session_service=self.session_service,
             memory_service=self.memory_service,
+            plugins=[MetricsPlugin(), context_cache],
         )
 
     def _get_task_info(self, context: RequestContext):
-        """Safely extract task_id, context_id, and session_id from RequestContext."""
+        """Extract task_id, context_id, user_id, shared session_id and metadata.
+
+        The orchestrator sends its session id, user id, trace context and the
+        user's preference profile as message metadata (see the orchestrator's
+        delegation.py); other callers fall back to the A2A context id as user.
+        """
+        metadata = (context.message.metadata if context.message else None) or {}
+
         # Try different attribute patterns based on A2A SDK version
         task_id = (
             getattr(context, 'task_id', None) or
@@ -71,22 +117,17 @@ class ADKAgentExecutor(AgentExecutor):
             "default_user"
         )
         
-        # Try to extract session_id from context for session sharing
+        user_id = metadata.get("user_id") or context_id
+        
+        # Orchestrator session to share, if the caller sent one
         session_id = (
+            metadata.get("session_id") or
             getattr(context, 'session_id', None) or
             getattr(getattr(context, 'task', None), 'session_id', None) or
             None
         )
         
-        return task_id, context_id, session_id
-    
-    def _extract_session_from_message(self, message: str) -> str | None:
-        """Extract session_id from message if passed in format [SESSION:xxx]."""
-        import re
-        match = re.search(r'\[SESSION:([^\]]+)\]', message)
-        if match:
-            return match.group(1)
-        return None
+        return task_id, context_id, user_id, session_id, metadata
     
     def _parse_revision_request(self, message: str) -> dict:
         """
@@ -96,7 +137,7 @@ class ADKAgentExecutor(AgentExecutor):
         import re
         result = {
             "feedback": "",
-            "affected_section": "",
+            "affected_sections": [],
             "request": {},
             "route": "",
             "accommodation": "",
@@ -112,10 +153,10 @@ class ADKAgentExecutor(AgentExecutor):
         if feedback_match:
             result["feedback"] = feedback_match.group(1).strip()
         
-        # Extract SECTION
-        section_match = re.search(r'SECTION:\s*(\w+)', message)
+        # Extract SECTIONS (one or several, comma-separated)
+        section_match = re.search(r'SECTIONS?:\s*([^\n]+)', message)
         if section_match:
-            result["affected_section"] = section_match.group(1).strip().lower()
+            result["affected_sections"] = parse_sections(section_match.group(1))
         
         # Extract REQUEST info - try multiple patterns
         request_match = re.search(r'REQUEST:\s*destination=([^,]+),\s*start=([^,]+),\s*days=(\d+)', message)
@@ -143,9 +184,10 @@ class ADKAgentExecutor(AgentExecutor):
             proposal = proposal_match.group(1).strip()
             result["full_proposal"] = proposal
             
-            # Try structured format first (ROUTE PLAN:, ACCOMMODATION:, ACTIVITIES:)
+            # Try structured format first (ROUTE PLAN:, ACCOMMODATION:, ACTIVITIES:,
+            # or "ROUTE PLAN (REVISED based on: ...):" once a revision was merged in)
             route_patterns = [
-                r'(ROUTE\s*PLAN:.*?)(?=ACCOMMODATION|ACTIVITIES|\*\*Hotels|\*\*Schedule|={10,}|-{10,}|$)',
+                r'(ROUTE\s*PLAN(?:\s*\([^)\n]*\))?:.*?)(?=ACCOMMODATION|ACTIVITIES|\*\*Hotels|\*\*Schedule|={10,}|-{10,}|$)',
                 r'(\*\*Route\s*Description:?\*\*.*?)(?=\*\*Hotels|\*\*Accommodation|\*\*Schedule|\*\*Activities|$)',
                 r'(Route:.*?)(?=Accommodation|Hotels|Activities|Schedule|$)',
             ]
@@ -156,7 +198,7 @@ class ADKAgentExecutor(AgentExecutor):
                     break
             
             accom_patterns = [
-                r'(ACCOMMODATION:.*?)(?=ROUTE|ACTIVITIES|\*\*Schedule|={10,}|-{10,}|$)',
+                r'(ACCOMMODATION(?:\s*\([^)\n]*\))?:.*?)(?=ROUTE|ACTIVITIES|\*\*Schedule|={10,}|-{10,}|$)',
                 r'(\*\*Hotels:?\*\*.*?)(?=\*\*Route|\*\*Schedule|\*\*Activities|$)',
                 r'(Hotels:.*?)(?=Route|Activities|Schedule|$)',
                 r'(Accommodation:.*?)(?=Route|Activities|Schedule|$)',
@@ -168,7 +210,7 @@ class ADKAgentExecutor(AgentExecutor):
                     break
             
             activities_patterns = [
-                r'(ACTIVITIES\s*(&\s*ITINERARY)?:.*?)(?=ROUTE|ACCOMMODATION|SUMMARY|={10,}|-{10,}|$)',
+                r'(ACTIVITIES\s*(&\s*ITINERARY)?(?:\s*\([^)\n]*\))?:.*?)(?=ROUTE|ACCOMMODATION|SUMMARY|={10,}|-{10,}|$)',
                 r'(\*\*Schedule:?\*\*.*?)(?=\*\*Route|\*\*Hotels|\*\*Accommodation|$)',
                 r'(\*\*Activities:?\*\*.*?)(?=\*\*Route|\*\*Hotels|$)',
                 r'(Schedule:.*?)(?=Route|Hotels|Accommodation|$)',
@@ -179,13 +221,21 @@ class ADKAgentExecutor(AgentExecutor):
                     result["activities"] = match.group(1).strip()
                     break
         
-        print(f"[Parser] Feedback: {result['feedback']}, Section: {result['affected_section']}")
+        print(f"[Parser] Feedback: {result['feedback']}, Sections: {result['affected_sections']}")
         print(f"[Parser] Request: {result['request']}")
         print(f"[Parser] Route len: {len(result['route'])}, Accom len: {len(result['accommodation'])}, Activities len: {len(result['activities'])}")
         print(f"[Parser] Full proposal len: {len(result['full_proposal'])}")
         
         return result
 
+    def _record_state_size(self, session_id: str, state: dict) -> int:
+        """Track and log the serialized state size of a session."""
+        size = _state_size(state)
+        STATE_BYTES.labels("iterative_agent").observe(size)
+        history = state.get("conversation_history", [])
+        print(f"[Iterative Agent] Session {session_id} state: {size} bytes, {len(history)} history entries")
+        return size
+
     async def cancel(
         self,
         context: RequestContext,
@@ -201,22 +251,29 @@ class ADKAgentExecutor(AgentExecutor):
         context: RequestContext,
         event_queue: EventQueue,
     ) -> None:
-        """Execute the agent and handle Memory Bank operations."""
+        """Execute the request in a span joined to the orchestrator's trace."""
         if not context.message:
             raise ValueError('Message should be present in request context')
 
-        query = context.get_user_input()
-        
+        # Continue the caller's trace, if it sent one
+        metadata = context.message.metadata or {}
+        trace_parent = trace_context(metadata.get("traceparent"))
+        with turn_span("a2a_execute iterative_agent", context=trace_parent), track_turn("a2a"):
+            await self._execute(context, event_queue, context.get_user_input())
+
+    async def _execute(
+        self,
+        context: RequestContext,
+        event_queue: EventQueue,
+        query: str,
+    ) -> None:
+        """Execute the agent and handle Memory Bank operations."""
         # Safely extract task info from context
-        task_id, context_id, shared_session_id = self._get_task_info(context)
-        user_id = context_id
+        task_id, context_id, user_id, shared_session_id, metadata = self._get_task_info(context)
         
-        # Also check if session_id is embedded in the message
-        if not shared_session_id:
-            shared_session_id = self._extract_session_from_message(query)
-            if shared_session_id:
-                # Remove the session marker from query
-                query = query.replace(f'[SESSION:{shared_session_id}]', '').strip()
+        # Learned preferences travel as metadata; the agents read them as text
+        if metadata.get("preferences"):
+            query = f"{query}\n\n{metadata['preferences']}"
         
         updater = TaskUpdater(event_queue, task_id, context_id)
         
@@ -251,29 +308,43 @@ class ADKAgentExecutor(AgentExecutor):
             # Parse REVISION_REQUEST and pre-populate state
             if "REVISION_REQUEST:" in query or "FEEDBACK:" in query:
                 parsed = self._parse_revision_request(query)
-                session.state["feedback"] = parsed["feedback"]
-                session.state["affected_section"] = parsed["affected_section"]
-                session.state["request"] = parsed["request"]
+                revision_state = {
+                    "feedback": parsed["feedback"],
+                    # A request that names no known section revises the whole plan
+                    "affected_sections": parsed["affected_sections"] or list(SECTIONS),
+                    "request": parsed["request"],
+                }
                 
                 # Store original sections so fix tools and present_revised_proposal can use them
                 if parsed["route"]:
-                    session.state["route"] = parsed["route"]
+                    revision_state["route"] = parsed["route"]
                 if parsed["accommodation"]:
-                    session.state["accommodation"] = parsed["accommodation"]
+                    revision_state["accommodation"] = parsed["accommodation"]
                 if parsed["activities"]:
-                    session.state["activities"] = parsed["activities"]
+                    revision_state["activities"] = parsed["activities"]
                 
                 # Store full proposal as fallback
                 if parsed["full_proposal"]:
-                    session.state["full_proposal"] = parsed["full_proposal"]
+                    revision_state["full_proposal"] = parsed["full_proposal"]
                     
                     # If individual sections weren't parsed, use full proposal with markers
                     if not parsed["route"]:
-                        session.state["route"] = "[See full proposal for route details]"
+                        revision_state["route"] = "[See full proposal for route details]"
                     if not parsed["activities"]:
-                        session.state["activities"] = "[See full proposal for activities]"
+                        revision_state["activities"] = "[See full proposal for activities]"
                 
-                print(f"[Iterative Agent] Parsed: section={parsed['affected_section']}, feedback={parsed['feedback']}")
+                # Apply as a state delta: the fixers read affected_sections before
+                # any tool runs, and direct session.state writes are not persisted
+                await self.session_service.append_event(
+                    session,
+                    Event(
+                        author="iterative_agent",
+                        invocation_id=f"revision-{task_id}",
+                        actions=EventActions(state_delta=revision_state),
+                    ),
+                )
+                
+                print(f"[Iterative Agent] Parsed: sections={revision_state['affected_sections']}, feedback={parsed['feedback']}")
                 print(f"[Iterative Agent] Sections found - Route: {bool(parsed['route'])}, Accom: {bool(parsed['accommodation'])}, Activities: {bool(parsed['activities'])}")
             
             # Build the content message
@@ -290,17 +361,11 @@ class ADKAgentExecutor(AgentExecutor):
                 session_id=session.id, 
                 new_message=content
             ):
-                if (
-                    event.is_final_response()
-                    and event.content
-                    and event.content.parts
-                ):
-                    for part in event.content.parts:
-                        if hasattr(part, 'text') and part.text:
-                            response_text += part.text + '\n'
-                        elif hasattr(part, 'function_call'):
-                            # Function calls are handled internally by ADK
-                            pass
+                if event.is_final_response():
+                    # Includes the proposal passed through by the present tool
+                    text = event_text(event)
+                    if text:
+                        response_text += text + '\n'
 
             # Get updated session with state after execution
             session = await self.session_service.get_session(
@@ -309,16 +374,32 @@ class ADKAgentExecutor(AgentExecutor):
                 session_id=session.id,
             )
             
-            # Store conversation content in state for memory extraction
+            # Record a compact history entry; the full text lives once in
+            # pending_proposal (written by the tools) and in the task artifact
             state = session.state or {}
             conversation_history = state.get("conversation_history", [])
             conversation_history.append({
-                "user_feedback": query,
-                "agent_response": response_text,
                 "agent": "iterative_agent",
+                "task_id": task_id,
+                "at": int(time.time()),
+                "request_hash": _digest(query),
+                "request_summary": _summarize(query),
+                "response_hash": _digest(response_text),
+                "response_summary": _summarize(response_text),
+                "section_hashes": {
+                    key: _digest(state[key]) for key in SECTION_KEYS if state.get(key)
+                },
             })
-            session.state["conversation_history"] = conversation_history[-10:]
-            session.state["last_revision"] = response_text
+            history_event = Event(
+                author="iterative_agent",
+                invocation_id=f"history-{task_id}",
+                actions=EventActions(state_delta={
+                    "conversation_history": conversation_history[-HISTORY_MAX_ENTRIES:],
+                }),
+            )
+            await self.session_service.append_event(session, history_event)
+            # The stored state after this turn, history entry included
+            self._record_state_size(session.id, {**state, **history_event.actions.state_delta})
             
             # ALWAYS save to Memory Bank after every execution
             try:
@@ -0,0 +1,197 @@
+"""Gemini context caching for the static instruction and tool-schema prefix.
+
+Every model call re-sends the agent's instruction and tool declarations. The
+ContextCachePlugin moves that static prefix into a Gemini CachedContent once it
+has been seen a few times in this process, and points later requests at it.
+
+Request-time additions to the system instruction (e.g. the memories injected by
+PreloadMemoryTool) are moved into the request contents so the cached prefix
+stays identical between turns. When caching is disabled, the model does not
+support it, or cache creation fails (prefix too small, API unavailable), the
+request is simply sent uncached, and creation is retried for that prefix after
+CONTEXT_CACHE_RETRY_SECONDS.
+
+ADK's own App(context_cache_config=...) is not used: it keys the cache on the
+whole system instruction and finds it again through the cache metadata stored
+in the session's events. Each session therefore builds its own cache, and a
+per-user tail (memories, preference profile, day range) changes the key on
+every turn. This plugin shares one cache per agent prefix across all sessions
+and users of the process.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "TRUE").upper() == "TRUE"
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+
+# A prefix must be seen this many times before a cache is created for it,
+# so one-off instructions never pay the cache-creation cost.
+CONTEXT_CACHE_MIN_SIGHTINGS = int(os.getenv("CONTEXT_CACHE_MIN_SIGHTINGS", "2"))
+
+# After a failed cache creation (quota, 5xx, prefix too small), send that
+# prefix uncached for this long before trying again
+CONTEXT_CACHE_RETRY_SECONDS = int(os.getenv("CONTEXT_CACHE_RETRY_SECONDS", "300"))
+
+# Text that starts a request-time (non-static) part of the system instruction.
+DYNAMIC_INSTRUCTION_MARKERS = [
+    "The following content is from your previous conversations with the user.",
+    "Known travel preferences of this user",
+    "Day range to plan",
+    "Leg to plan",
+    "Option to plan",
+]
+
+
+def split_system_instruction(system_instruction: str) -> tuple[str, str]:
+    """Split a system instruction into its static prefix and dynamic tail."""
+    positions = [
+        system_instruction.find(marker)
+        for marker in DYNAMIC_INSTRUCTION_MARKERS
+        if marker in system_instruction
+    ]
+    if not positions:
+        return system_instruction, ""
+    cut = min(positions)
+    return system_instruction[:cut].rstrip(), system_instruction[cut:]
+
+
+class ContextCachePlugin(BasePlugin):
+    """Serves each agent's static prefix from a per-process Gemini context cache."""
+
+    def __init__(
+        self,
+        ttl_seconds: int = CONTEXT_CACHE_TTL_SECONDS,
+        min_sightings: int = CONTEXT_CACHE_MIN_SIGHTINGS,
+        enabled: bool = CONTEXT_CACHE_ENABLED,
+        retry_seconds: int = CONTEXT_CACHE_RETRY_SECONDS,
+    ):
+        super().__init__(name="context_cache")
+        self.ttl_seconds = ttl_seconds
+        self.min_sightings = min_sightings
+        self.enabled = enabled
+        self.retry_seconds = retry_seconds
+
+        self._client = None
+        self._sightings: dict[str, int] = {}
+        self._caches: dict[str, tuple[str, float]] = {}  # fingerprint -> (name, expires_at)
+        self._unavailable: dict[str, float] = {}  # fingerprint -> retry after
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _get_client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client()
+        return self._client
+
+    def _fingerprint(self, llm_request: LlmRequest, static_instruction: str) -> str:
+        config = llm_request.config
+        digest = hashlib.sha256()
+        digest.update((llm_request.model or "").encode())
+        digest.update(static_instruction.encode())
+        for tool in config.tools or []:
+            digest.update(tool.model_dump_json(exclude_none=True).encode())
+        if config.tool_config:
+            digest.update(config.tool_config.model_dump_json(exclude_none=True).encode())
+        return digest.hexdigest()
+
+    async def _get_or_create_cache(
+        self,
+        fingerprint: str,
+        llm_request: LlmRequest,
+        static_instruction: str,
+        agent_name: str,
+    ) -> str:
+        lock = self._locks.setdefault(fingerprint, asyncio.Lock())
+        async with lock:
+            cached = self._caches.get(fingerprint)
+            # Refresh a minute early so an in-flight request never hits an expired cache
+            if cached and cached[1] - 60 > time.time():
+                return cached[0]
+
+            config = llm_request.config
+            cache = await self._get_client().aio.caches.create(
+                model=llm_request.model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"hitl-{agent_name}",
+                    system_instruction=static_instruction,
+                    tools=config.tools or None,
+                    tool_config=config.tool_config,
+                    ttl=f"{self.ttl_seconds}s",
+                ),
+            )
+            self._caches[fingerprint] = (cache.name, time.time() + self.ttl_seconds)
+            print(f"[Context Cache] Created {cache.name} for {agent_name}")
+            return cache.name
+
+    async def before_model_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+    ) -> Optional[LlmResponse]:
+        """Replace the static prefix of the request with a cache reference."""
+        if not self.enabled or not (llm_request.model or "").startswith("gemini"):
+            return None
+
+        config = llm_request.config
+        if not config or not isinstance(config.system_instruction, str):
+            return None
+
+        static_instruction, dynamic_instruction = split_system_instruction(
+            config.system_instruction
+        )
+        fingerprint = self._fingerprint(llm_request, static_instruction)
+        if self._unavailable.get(fingerprint, 0) > time.time():
+            return None
+
+        self._sightings[fingerprint] = self._sightings.get(fingerprint, 0) + 1
+        if self._sightings[fingerprint] < self.min_sightings:
+            return None
+
+        agent_name = callback_context.agent_name
+        try:
+            cache_name = await self._get_or_create_cache(
+                fingerprint, llm_request, static_instruction, agent_name
+            )
+        except Exception as e:
+            # Too small to cache, unsupported model/backend, quota, ... - back off
+            self._unavailable[fingerprint] = time.time() + self.retry_seconds
+            print(
+                f"[Context Cache] Caching unavailable for {agent_name}, sending uncached "
+                f"for {self.retry_seconds}s: {e}"
+            )
+            return None
+
+        config.system_instruction = None
+        config.tools = None
+        config.tool_config = None
+        config.cached_content = cache_name
+        if dynamic_instruction:
+            llm_request.contents.insert(
+                0, types.Content(role="user", parts=[types.Part(text=dynamic_instruction)])
+            )
+        return None
+
+    async def close(self) -> None:
+        """Delete the caches created by this process."""
+        caches, self._caches = self._caches, {}
+        for cache_name, _ in caches.values():
+            try:
+                await self._get_client().aio.caches.delete(name=cache_name)
+                print(f"[Context Cache] Deleted {cache_name}")
+            except Exception as e:
+                print(f"[Context Cache] Could not delete {cache_name}: {e}")
+
+
+# One cache manager per process, shared by every runner in it
+context_cache = ContextCachePlugin()
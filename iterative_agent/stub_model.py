@@ -0,0 +1,109 @@
+"""Offline stand-in model for local A2A benchmarking.
+
+With MODEL_ID=stub (or any name starting with "stub"), every agent is answered
+by StubLlm instead of Gemini: within a turn it calls each of the agent's tools
+once, in declaration order, with placeholder arguments built from the tool
+schema, then replies with the last tool result as text (agents with an output
+schema get placeholder JSON instead). Tools, state changes, A2A serialisation
+and the executor run for real; only the model is replaced, so the servers can
+be benchmarked with no network and no token spend.
+
+STUB_MODEL_LATENCY_MS adds a fixed delay per call to mimic model latency.
+"""
+
+import asyncio
+import json
+import os
+from typing import AsyncGenerator
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+
+
+STUB_MODEL_LATENCY_MS = int(os.getenv("STUB_MODEL_LATENCY_MS", "0"))
+
+# Memory tools would only add lookups; agent transfers are not stubbed
+SKIPPED_TOOLS = {"load_memory", "preload_memory", "transfer_to_agent"}
+
+_PLACEHOLDERS = {
+    "STRING": lambda name: f"stub {name.replace('_', ' ')}",
+    "INTEGER": lambda name: 1,
+    "NUMBER": lambda name: 1.0,
+    "BOOLEAN": lambda name: True,
+    "ARRAY": lambda name: [],
+    "OBJECT": lambda name: {},
+}
+
+
+def _placeholder_args(tool) -> dict:
+    declaration = tool._get_declaration()
+    if declaration is None or declaration.parameters is None:
+        return {}
+    args = {}
+    for name, schema in (declaration.parameters.properties or {}).items():
+        kind = schema.type.name if schema.type else "STRING"
+        args[name] = _PLACEHOLDERS.get(kind, _PLACEHOLDERS["STRING"])(name)
+    return args
+
+
+def _this_turn_responses(contents: list[types.Content]) -> list[types.FunctionResponse]:
+    """Function responses since the last text handed to the agent."""
+    responses = []
+    for content in reversed(contents):
+        parts = content.parts or []
+        if content.role == "user" and any(part.text for part in parts):
+            break
+        responses += [part.function_response for part in parts if part.function_response]
+    return list(reversed(responses))
+
+
+class StubLlm(BaseLlm):
+    """Deterministic model: call every tool once, then echo the last result."""
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"stub.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if STUB_MODEL_LATENCY_MS:
+            await asyncio.sleep(STUB_MODEL_LATENCY_MS / 1000)
+
+        responses = _this_turn_responses(llm_request.contents)
+        called = {response.name for response in responses}
+        pending = [
+            tool for name, tool in llm_request.tools_dict.items()
+            if name not in called and name not in SKIPPED_TOOLS
+        ]
+
+        schema = llm_request.config.response_schema if llm_request.config else None
+        if schema is not None and not pending:
+            fields = getattr(schema, "model_fields", {})
+            part = types.Part(text=json.dumps({name: _PLACEHOLDERS["STRING"](name) for name in fields}))
+        elif pending:
+            tool = pending[0]
+            part = types.Part(function_call=types.FunctionCall(
+                name=tool.name, args=_placeholder_args(tool),
+            ))
+        else:
+            result = (responses[-1].response or {}).get("result") if responses else None
+            part = types.Part(text=str(result) if result else "Done.")
+
+        prompt_chars = sum(
+            len(part.text or "") for content in llm_request.contents for part in content.parts or []
+        )
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4,
+                candidates_token_count=len(part.text or "") // 4,
+            ),
+        )
+
+
+def register_stub_model() -> None:
+    """Resolve model names starting with "stub" to StubLlm."""
+    LLMRegistry.register(StubLlm)
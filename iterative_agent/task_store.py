@@ -0,0 +1,186 @@
+"""Durable A2A task stores with TTL-based garbage collection.
+
+TASK_STORE_BACKEND selects where tasks live:
+- sqlite (default locally): a local SQLite file at TASK_STORE_PATH
+- redis: any Redis-compatible key-value server at TASK_STORE_URL, shared by
+  every instance so task polling works behind a load balancer
+- memory: the SDK's InMemoryTaskStore (single process, never expires)
+
+On Cloud Run (K_SERVICE is set) there is no default: the local file is
+neither shared between instances nor kept across restarts, so startup fails
+unless TASK_STORE_BACKEND is set, normally to redis. Setting sqlite or
+memory explicitly accepts that for a single instance.
+
+Finished tasks are dropped TASK_STORE_TTL_SECONDS after their last update.
+Unfinished tasks expire after TASK_STORE_MAX_AGE_SECONDS so tasks orphaned by
+a crashed instance do not accumulate.
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+from typing import Optional
+
+from a2a.server.context import ServerCallContext
+from a2a.server.tasks import InMemoryTaskStore, TaskStore
+from a2a.types import Task, TaskState
+
+
+TASK_STORE_BACKEND = os.getenv("TASK_STORE_BACKEND", "").lower()
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", "a2a_tasks.db")
+TASK_STORE_URL = os.getenv("TASK_STORE_URL", "redis://localhost:6379/0")
+TASK_STORE_TTL_SECONDS = int(os.getenv("TASK_STORE_TTL_SECONDS", "3600"))
+TASK_STORE_MAX_AGE_SECONDS = int(os.getenv("TASK_STORE_MAX_AGE_SECONDS", "86400"))
+
+FINISHED_STATES = {
+    TaskState.completed,
+    TaskState.canceled,
+    TaskState.failed,
+    TaskState.rejected,
+}
+
+
+# ============================================================================
+# KEY-VALUE BACKENDS
+# ============================================================================
+
+class SQLiteBackend:
+    """Key-value table in a local SQLite file with per-key expiry."""
+
+    def __init__(self, path: str = TASK_STORE_PATH, gc_interval: int = 60):
+        self.path = path
+        self.gc_interval = gc_interval
+        self._last_gc = 0.0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _connect(self):
+        # A connection per call keeps this safe across threads and worker processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl: Optional[int]) -> None:
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            if now - self._last_gc > self.gc_interval:
+                self._last_gc = now
+                deleted = conn.execute(
+                    "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+                ).rowcount
+                if deleted:
+                    print(f"[Task Store] Garbage-collected {deleted} expired tasks")
+
+    def _delete(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+
+class RedisBackend:
+    """Redis-compatible key-value server; expiry is handled by the server."""
+
+    def __init__(self, url: str = TASK_STORE_URL):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "TASK_STORE_BACKEND=redis requires the redis package. "
+                "Run: pip install redis"
+            ) from e
+        self.client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+
+# ============================================================================
+# TASK STORE
+# ============================================================================
+
+class KeyValueTaskStore(TaskStore):
+    """A2A TaskStore that keeps each task as JSON under a key with a TTL."""
+
+    def __init__(
+        self,
+        backend,
+        ttl_seconds: int = TASK_STORE_TTL_SECONDS,
+        max_age_seconds: int = TASK_STORE_MAX_AGE_SECONDS,
+        prefix: str = "a2a:task:",
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max_age_seconds
+        self.prefix = prefix
+
+    async def save(self, task: Task, context: ServerCallContext | None = None) -> None:
+        finished = task.status.state in FINISHED_STATES
+        ttl = self.ttl_seconds if finished else self.max_age_seconds
+        await self.backend.set(self.prefix + task.id, task.model_dump_json(), ttl=ttl)
+
+    async def get(self, task_id: str, context: ServerCallContext | None = None) -> Task | None:
+        value = await self.backend.get(self.prefix + task_id)
+        return Task.model_validate_json(value) if value else None
+
+    async def delete(self, task_id: str, context: ServerCallContext | None = None) -> None:
+        await self.backend.delete(self.prefix + task_id)
+
+
+def create_task_store() -> TaskStore:
+    """Create the task store selected by TASK_STORE_BACKEND."""
+    backend = TASK_STORE_BACKEND
+    if not backend:
+        if os.getenv("K_SERVICE"):
+            raise RuntimeError(
+                "TASK_STORE_BACKEND is not set. On Cloud Run the default SQLite file "
+                "is local to one instance and lost on restart; set "
+                "TASK_STORE_BACKEND=redis with TASK_STORE_URL (or sqlite/memory "
+                "explicitly for a single instance)."
+            )
+        backend = "sqlite"
+
+    if backend == "memory":
+        print("[Task Store] Using InMemoryTaskStore (single process, no expiry)")
+        return InMemoryTaskStore()
+
+    if backend == "redis":
+        print(f"[Task Store] Using Redis task store at {TASK_STORE_URL}")
+        return KeyValueTaskStore(RedisBackend(TASK_STORE_URL))
+
+    if backend != "sqlite":
+        raise ValueError(
+            f"Unknown TASK_STORE_BACKEND '{backend}'. "
+            "Use sqlite, redis or memory."
+        )
+    print(f"[Task Store] Using SQLite task store at {TASK_STORE_PATH}")
+    return KeyValueTaskStore(SQLiteBackend(TASK_STORE_PATH))
@@ -1,8 +1,25 @@
 """Tools for Iterative Agent - fixing and revising proposals."""
 
+import re
+
 from google.adk.tools import ToolContext
 
 
+# Tools whose result is shown to the user verbatim (see event_text)
+PRESENT_TOOLS = {"present_revised_proposal"}
+
+# Proposal sections a rejection can revise, in proposal order
+SECTIONS = ("route", "accommodation", "activities")
+
+
+def parse_sections(sections) -> list[str]:
+    """Known sections named in a list or comma-separated string, in proposal order."""
+    if isinstance(sections, str):
+        sections = re.split(r"[,/\s]+", sections)
+    names = {str(section).strip().lower() for section in sections or []}
+    return [section for section in SECTIONS if section in names]
+
+
 def fix_route(
     improved_route: str,
     transportation: str,
@@ -19,6 +36,8 @@ Transportation: {transportation}
 Estimated Travel Time: {estimated_time}"""
     
     tool_context.state["route"] = route
+    # Each fixer revises one section; present_revised_proposal runs after all of them
+    tool_context.actions.skip_summarization = True
     return f"Route updated based on feedback: {feedback}"
 
 
@@ -38,6 +57,8 @@ Price Range: {price_range}
 Locations: {locations}"""
     
     tool_context.state["accommodation"] = accommodation
+    # Each fixer revises one section; present_revised_proposal runs after all of them
+    tool_context.actions.skip_summarization = True
     return f"Accommodation updated based on feedback: {feedback}"
 
 
@@ -59,6 +80,8 @@ Schedule:
 {schedule}"""
     
     tool_context.state["activities"] = activities
+    # Each fixer revises one section; present_revised_proposal runs after all of them
+    tool_context.actions.skip_summarization = True
     return f"Activities updated based on feedback: {feedback}"
 
 
@@ -68,25 +91,28 @@ def present_revised_proposal(
 ) -> str:
     """
     Present the revised proposal for re-approval.
-    Shows the updated section clearly and references the original proposal for unchanged parts.
+    Shows every updated section clearly and references the original proposal for unchanged parts.
     
     Args:
         summary: Summary of changes made
     """
     feedback = tool_context.state.get("feedback", "your feedback")
-    affected_section = tool_context.state.get("affected_section", "accommodation")
-    full_proposal = tool_context.state.get("full_proposal", "")
+    affected_sections = tool_context.state.get("affected_sections") or ["accommodation"]
     
-    # Get the UPDATED section (whichever was fixed)
-    updated_content = ""
-    if affected_section == "route":
-        updated_content = tool_context.state.get("route", "Updated route options")
-    elif affected_section == "accommodation":
-        updated_content = tool_context.state.get("accommodation", "Updated accommodation options")
-    elif affected_section == "activities":
-        updated_content = tool_context.state.get("activities", "Updated activities")
+    # The UPDATED sections (whichever were fixed), in proposal order
+    changed = "\n\n".join(
+        f"**WHAT CHANGED - {section.upper()}:**\n\n"
+        f"{tool_context.state.get(section, f'Updated {section}')}"
+        for section in affected_sections
+    )
+    unchanged = [section for section in SECTIONS if section not in affected_sections]
+    if unchanged:
+        unchanged_text = (
+            f"All other parts of your trip plan ({', '.join(unchanged)})\n"
+            "remain exactly as shown in the original proposal."
+        )
     else:
-        updated_content = tool_context.state.get("accommodation", "Updated options")
+        unchanged_text = "Every part of your trip plan was revised."
     
     # Simple, clear format showing what changed
     proposal = f"""
@@ -96,16 +122,13 @@ def present_revised_proposal(
 
 Based on your feedback: "{feedback}"
 
-**WHAT CHANGED - {affected_section.upper()}:**
-
-{updated_content}
+{changed}
 
 --------------------------------------------------------------------------------
 
 **UNCHANGED SECTIONS:**
 
-All other parts of your trip plan (route, {'activities' if affected_section != 'activities' else 'accommodation'}, etc.) 
-remain exactly as shown in the original proposal.
+{unchanged_text}
 
 ================================================================================
 {summary}
@@ -118,13 +141,33 @@ Please reply:
     
     tool_context.state["pending_proposal"] = proposal
     tool_context.state["awaiting_approval"] = True
-    tool_context.state["last_revision"] = proposal
-    
-    return proposal
-    
-    tool_context.state["pending_proposal"] = proposal
-    tool_context.state["awaiting_approval"] = True
-    tool_context.state["last_revision"] = proposal
+    # The rendered proposal is the reply: end the turn without a model echo
+    tool_context.actions.skip_summarization = True
     
     return proposal
 
+
+# ============================================================================
+# PASSTHROUGH - presented proposals go to the client as the tool result
+# ============================================================================
+
+def event_text(event) -> str:
+    """User-facing text of an event: model text or a presented proposal.
+
+    The present tools end the model turn with skip_summarization, so their
+    rendered proposal arrives as a function response instead of being echoed
+    back by the model as text.
+    """
+    if not event.content or not event.content.parts:
+        return ""
+    text = ""
+    for part in event.content.parts:
+        if part.text:
+            text += part.text
+        elif (
+            part.function_response
+            and part.function_response.name in PRESENT_TOOLS
+            and event.actions.skip_summarization
+        ):
+            text += str((part.function_response.response or {}).get("result", ""))
+    return text
@@ -0,0 +1,122 @@
+"""OpenTelemetry tracing for turns, model calls, tools, services and A2A hops.
+
+ADK already opens spans for each invocation, agent run, model call
+(`call_llm`) and tool call (`execute_tool <name>`), but they are only recorded
+once a tracer provider is installed. setup_tracing() installs one, with the
+exporter selected by TRACE_EXPORTER:
+- otlp: send to a collector at OTEL_EXPORTER_OTLP_ENDPOINT
+  (default http://localhost:4318)
+- json: append one JSON span per line to TRACE_FILE for offline analysis
+- console: print spans to stdout
+- none (default): tracing off
+
+On top of the ADK spans this module adds a span per turn and carries the
+trace across A2A hops as a traceparent entry in the A2A message metadata.
+Session- and memory-service calls get their spans from
+metrics.observe_services, which times them in the same wrapper.
+"""
+
+import os
+import threading
+from typing import Optional
+
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACING_ENABLED = TRACE_EXPORTER not in ("", "none")
+
+# Resolves to the real tracer once setup_tracing() has installed a provider
+tracer = trace.get_tracer("hitl_trip_planner")
+
+_provider: Optional[TracerProvider] = None
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self._lock, open(self.path, "a") as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def setup_tracing(service_name: str) -> None:
+    """Install a tracer provider for this process (no-op when tracing is off)."""
+    global _provider
+    if not TRACING_ENABLED or _provider is not None:
+        return
+
+    if TRACE_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+    elif TRACE_EXPORTER == "json":
+        exporter = JsonFileSpanExporter(TRACE_FILE)
+    elif TRACE_EXPORTER == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        raise ValueError(
+            f"Unknown TRACE_EXPORTER '{TRACE_EXPORTER}'. Use otlp, json, console or none."
+        )
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    print(f"[Tracing] Exporting {service_name} spans via {TRACE_EXPORTER}")
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def turn_span(
+    name: str,
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    context: Optional[otel_context.Context] = None,
+):
+    """Span covering one user turn, from session lookup to the final response."""
+    attributes = {}
+    if user_id:
+        attributes["hitl.user_id"] = user_id
+    if session_id:
+        attributes["hitl.session_id"] = session_id
+    return tracer.start_as_current_span(name, context=context, attributes=attributes)
+
+
+# ============================================================================
+# A2A PROPAGATION
+# ============================================================================
+
+def current_traceparent() -> Optional[str]:
+    """W3C traceparent of the current span, or None when tracing is off."""
+    carrier = {}
+    propagate.inject(carrier)
+    return carrier.get("traceparent")
+
+
+def trace_context(traceparent: Optional[str]) -> Optional[otel_context.Context]:
+    """Trace context to continue from a caller's traceparent, if any."""
+    if not traceparent:
+        return None
+    return propagate.extract({"traceparent": traceparent})
@@ -1,6 +1,7 @@
 """Orchestrator Agent - A2A Client that coordinates Proposal and Iterative agents."""
 
 import os
+import re
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,28 +12,24 @@ from google.adk.tools import FunctionTool, load_memory
 from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 
 from .tools import (
+    SECTIONS,
     capture_request,
-    get_delegation_message,
     process_approval,
     process_rejection,
     show_final_plan,
     recall_trip_info,
-    store_proposal_response,
 )
 from .prompts import ROOT_PROMPT
+from .delegation import attach_delegation_metadata_callback, create_client_factory
 
 
 MODEL_ID = os.getenv("MODEL_ID", "gemini-2.5-pro")
 
-# Remote A2A Agent URLs (Cloud Run deployments)
-PROPOSAL_AGENT_URL = os.getenv(
-    "PROPOSAL_AGENT_URL",
-    "https://proposal-agent-service.us-east1.run.app/.well-known/agent.json"
-)
-ITERATIVE_AGENT_URL = os.getenv(
-    "ITERATIVE_AGENT_URL", 
-    "https://iterative-agent-service.us-east1.run.app/.well-known/agent.json"
-)
+# Default remote A2A Agent URLs (Cloud Run deployments). PROPOSAL_AGENT_URL /
+# ITERATIVE_AGENT_URL are read when the agents are created, so local_a2a can
+# set them at startup.
+DEFAULT_PROPOSAL_AGENT_URL = "https://proposal-agent-service.us-east1.run.app/.well-known/agent.json"
+DEFAULT_ITERATIVE_AGENT_URL = "https://iterative-agent-service.us-east1.run.app/.well-known/agent.json"
 
 
 # ============================================================================
@@ -58,6 +55,89 @@ async def auto_save_to_memory_callback(callback_context):
         print(f"[Memory Callback] Error saving to memory: {e}")
 
 
+# ============================================================================
+# CALLBACK: Capture the remote agent's proposal into orchestrator state
+# The proposal arrives as a named A2A artifact; copying it here avoids having
+# the orchestrator model re-emit the whole proposal as a tool argument
+# ============================================================================
+
+# Artifact names set by the proposal_agent and iterative_agent servers
+PROPOSAL_ARTIFACT = "proposal_response"
+REVISION_ARTIFACT = "revision_response"
+
+# A revision lists only the sections it changed, each under this heading
+# (iterative_agent present_revised_proposal)
+REVISED_SECTION = re.compile(
+    r"\*\*WHAT CHANGED - ([A-Z]+):\*\*\n\n(.*?)(?=\n\n\*\*WHAT CHANGED - |\n-{80}|\Z)",
+    re.DOTALL,
+)
+
+# Lines between the blocks of a proposal (proposal_agent present_proposal)
+PROPOSAL_DIVIDER = re.compile(r"(\n[-=]{80}\n)")
+
+
+def _proposal_artifact(event) -> tuple[str, str]:
+    """(name, text) of the proposal artifact in a RemoteA2aAgent event, or ("", "")."""
+    task = (event.custom_metadata or {}).get("a2a:response") or {}
+    for artifact in reversed(task.get("artifacts") or []):
+        if artifact.get("name") in (PROPOSAL_ARTIFACT, REVISION_ARTIFACT):
+            text = "".join(part.get("text", "") for part in artifact.get("parts", [])).strip()
+            return artifact["name"], text
+    return "", ""
+
+
+def merge_revision(proposal: str, revision: str) -> str:
+    """The full proposal with the sections a revision changed replaced.
+
+    Returns "" if a changed section has no block of its own in the proposal.
+    """
+    blocks = PROPOSAL_DIVIDER.split(proposal)
+    for name, text in REVISED_SECTION.findall(revision):
+        section = name.lower()
+        if section not in SECTIONS:
+            continue
+        for i, block in enumerate(blocks):
+            if block.strip().upper().startswith(section.upper()):
+                blocks[i] = f"\n{text.strip()}\n"
+                break
+        else:
+            return ""
+    return "".join(blocks)
+
+
+async def capture_proposal_callback(callback_context):
+    """
+    Store the proposal returned by a remote agent as the pending proposal.
+    Runs after proposal_agent/iterative_agent; no model involvement.
+
+    iterative_agent returns only the sections it changed; they replace their
+    sections in the stored proposal, so pending_proposal (and the
+    final_proposal approval stores) is always the whole trip.
+    """
+    session = callback_context._invocation_context.session
+    for event in reversed(session.events):
+        if event.invocation_id != callback_context.invocation_id:
+            break
+        if event.author != callback_context.agent_name:
+            continue
+        name, proposal = _proposal_artifact(event)
+        if proposal and name == REVISION_ARTIFACT:
+            merged = merge_revision(callback_context.state.get("pending_proposal") or "", proposal)
+            if merged:
+                proposal = merged
+            else:
+                print("[Proposal Callback] Could not place the revised sections, storing the revision")
+        if proposal:
+            request = callback_context.state.get("request") or {}
+            callback_context.state["pending_proposal"] = proposal
+            callback_context.state["trip_destination"] = request.get("destination", "")
+            callback_context.state["awaiting_approval"] = True
+            print(f"[Proposal Callback] Stored {len(proposal)} chars from {event.author}")
+            return None
+    print(f"[Proposal Callback] No proposal artifact from {callback_context.agent_name}")
+    return None
+
+
 # ============================================================================
 # FACTORY FUNCTION - Creates agents at runtime to avoid client closure issues
 # ============================================================================
@@ -70,15 +150,21 @@ def create_remote_agents():
     proposal_agent = RemoteA2aAgent(
         name="proposal_agent",
         description="Generates complete trip proposal sequentially (route, accommodation, activities)",
-        agent_card=PROPOSAL_AGENT_URL,
+        agent_card=os.getenv("PROPOSAL_AGENT_URL", DEFAULT_PROPOSAL_AGENT_URL),
         timeout=3600,
+        a2a_client_factory=create_client_factory(timeout=3600),
+        before_agent_callback=attach_delegation_metadata_callback,
+        after_agent_callback=capture_proposal_callback,
     )
 
     iterative_agent = RemoteA2aAgent(
         name="iterative_agent",
         description="Fixes specific parts of proposal based on user feedback and presents revised version",
-        agent_card=ITERATIVE_AGENT_URL,
+        agent_card=os.getenv("ITERATIVE_AGENT_URL", DEFAULT_ITERATIVE_AGENT_URL),
         timeout=3600,
+        a2a_client_factory=create_client_factory(timeout=3600),
+        before_agent_callback=attach_delegation_metadata_callback,
+        after_agent_callback=capture_proposal_callback,
     )
     
     return proposal_agent, iterative_agent
@@ -100,8 +186,6 @@ def create_root_agent():
         tools=[
             PreloadMemoryTool(),  # Auto-loads memory at start of each turn
             FunctionTool(func=capture_request),
-            FunctionTool(func=get_delegation_message),
-            FunctionTool(func=store_proposal_response),
             FunctionTool(func=process_approval),
             FunctionTool(func=process_rejection),
             FunctionTool(func=show_final_plan),
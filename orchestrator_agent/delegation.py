@@ -0,0 +1,92 @@
+"""Session, user, trace and preference metadata on every A2A delegation.
+
+The remote agents need the orchestrator's session id (to share the session),
+the user id (to scope Memory Bank), the current trace context, the user's
+preference profile and the captured trip request. The orchestrator model used to add these as text markers
+through a get_delegation_message tool call, which cost a model round trip per
+delegation and had to be scanned back out of the text by the executors.
+
+Now a before_agent_callback on each RemoteA2aAgent collects them and a client
+interceptor attaches them to the outgoing A2A message as metadata:
+    {"session_id", "user_id", "traceparent"?, "preferences"?, "request"?}
+which ADKAgentExecutor reads in _get_task_info.
+"""
+
+import asyncio
+import contextvars
+from typing import Any, Optional
+
+import httpx
+from a2a.client import ClientCallContext, ClientCallInterceptor, ClientConfig, ClientFactory
+from a2a.types import AgentCard, TransportProtocol
+
+from .preferences import profile_text
+from .tracing import current_traceparent
+
+
+# Metadata for the delegation running in this task, set by the callback
+_delegation_metadata: contextvars.ContextVar[dict] = contextvars.ContextVar(
+    "delegation_metadata", default={}
+)
+
+
+async def attach_delegation_metadata_callback(callback_context):
+    """Collect the metadata to send with this remote agent's request."""
+    session = callback_context.session
+    metadata = {"session_id": session.id, "user_id": session.user_id}
+
+    traceparent = current_traceparent()
+    if traceparent:
+        metadata["traceparent"] = traceparent
+
+    # Remote agents cannot see the local preference store, so send the profile along
+    profile = await asyncio.to_thread(profile_text, session.user_id)
+    if profile:
+        metadata["preferences"] = profile
+
+    # Destination, origin and days, e.g. for splitting long itineraries
+    if callback_context.state.get("request"):
+        metadata["request"] = dict(callback_context.state.get("request"))
+
+    _delegation_metadata.set(metadata)
+    return None
+
+
+class DelegationMetadataInterceptor(ClientCallInterceptor):
+    """Adds the current delegation metadata to outgoing A2A messages."""
+
+    async def intercept(
+        self,
+        method_name: str,
+        request_payload: dict[str, Any],
+        http_kwargs: dict[str, Any],
+        agent_card: Optional[AgentCard],
+        context: Optional[ClientCallContext],
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        metadata = _delegation_metadata.get()
+        message = request_payload.get("params", {}).get("message")
+        if metadata and message is not None:
+            message["metadata"] = {**(message.get("metadata") or {}), **metadata}
+        return request_payload, http_kwargs
+
+
+class DelegationClientFactory(ClientFactory):
+    """ClientFactory whose clients always carry DelegationMetadataInterceptor."""
+
+    def create(self, card, consumers=None, interceptors=None, extensions=None):
+        interceptors = [*(interceptors or []), DelegationMetadataInterceptor()]
+        return super().create(card, consumers, interceptors, extensions)
+
+
+def create_client_factory(timeout: float) -> ClientFactory:
+    """A2A client factory for a RemoteA2aAgent that sends delegation metadata.
+
+    The config includes its own httpx client: RemoteA2aAgent replaces a factory
+    without one by a plain ClientFactory, which would drop the interceptor.
+    """
+    return DelegationClientFactory(ClientConfig(
+        httpx_client=httpx.AsyncClient(timeout=httpx.Timeout(timeout=timeout)),
+        streaming=False,
+        polling=False,
+        supported_transports=[TransportProtocol.jsonrpc],
+    ))
@@ -0,0 +1,166 @@
+"""Request-id deduplication for the REST chat endpoints.
+
+Clients retry /chat on timeouts; without deduplication every retry reruns the
+whole multi-agent pipeline and appends its events to the session again. A
+request that carries a request_id runs at most once per user:
+- a duplicate that arrives while the original is running waits for it and
+  gets the same result (in the same worker it attaches to the run directly;
+  in another worker it polls the shared record)
+- a duplicate that arrives after completion gets the stored response, for
+  IDEMPOTENCY_TTL_SECONDS
+- a failed run stores nothing, so the next retry runs again
+- the run is its own task: a caller that disconnects or is cancelled stops
+  waiting, but the turn still finishes and its result is stored for the
+  retry and for duplicates attached to it
+
+Records live in a local SQLite file (IDEMPOTENCY_STORE_PATH) shared by the
+uvicorn workers on the host. A running record is a lease of
+IDEMPOTENCY_LEASE_SECONDS that the running worker renews every third of the
+lease for as long as the turn runs (turns may run far longer than the lease),
+so a crashed worker blocks retries for at most one lease.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Awaitable, Callable, Optional
+
+
+IDEMPOTENCY_STORE_PATH = os.getenv("IDEMPOTENCY_STORE_PATH", "idempotency.db")
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "600"))
+
+# Record statuses
+RUNNING = "running"
+DONE = "done"
+
+POLL_SECONDS = 0.5
+
+
+class IdempotencyConflict(Exception):
+    """The request_id was already used for a different request."""
+
+
+def request_fingerprint(*parts) -> str:
+    """Stable hash of the request fields that must match for a duplicate."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Runs each request key once and replays its result to duplicates."""
+
+    def __init__(
+        self,
+        path: str = IDEMPOTENCY_STORE_PATH,
+        ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS,
+        lease_seconds: int = IDEMPOTENCY_LEASE_SECONDS,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._inflight: dict[str, tuple[str, asyncio.Task]] = {}  # key -> (fingerprint, run)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS requests ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status TEXT NOT NULL, "
+                "result TEXT, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # A connection per call keeps this safe across threads and worker processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _claim(self, key: str, fingerprint: str) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM requests WHERE expires_at <= ?", (now,))
+            return conn.execute(
+                "INSERT OR IGNORE INTO requests (key, fingerprint, status, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, fingerprint, RUNNING, now + self.lease_seconds),
+            ).rowcount == 1
+
+    def _get(self, key: str) -> Optional[tuple[str, str, Optional[str]]]:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT fingerprint, status, result FROM requests WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+
+    def _finish(self, key: str, result: dict) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE requests SET status = ?, result = ?, expires_at = ? WHERE key = ?",
+                (DONE, json.dumps(result), time.time() + self.ttl_seconds, key),
+            )
+
+    def _renew(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE requests SET expires_at = ? WHERE key = ? AND status = ?",
+                (time.time() + self.lease_seconds, key, RUNNING),
+            )
+
+    async def _heartbeat(self, key: str) -> None:
+        """Keep the lease on key alive until cancelled."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await asyncio.to_thread(self._renew, key)
+
+    def _release(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM requests WHERE key = ? AND status = ?", (key, RUNNING))
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Awaitable[dict]],
+    ) -> dict:
+        """Return func()'s result, running it only if no run for key exists.
+
+        Raises IdempotencyConflict if key was used with another fingerprint.
+        """
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight:
+                if inflight[0] != fingerprint:
+                    raise IdempotencyConflict(f"Request id {key} was used for a different request")
+                print(f"[Idempotency] Attached duplicate of {key} to the running request")
+                return await asyncio.shield(inflight[1])
+
+            if await asyncio.to_thread(self._claim, key, fingerprint):
+                task = asyncio.create_task(self._run_claimed(key, func))
+                # Nobody may be waiting on it; do not warn about an unretrieved exception
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self._inflight[key] = (fingerprint, task)
+                return await asyncio.shield(task)
+
+            record = await asyncio.to_thread(self._get, key)
+            if record is None:
+                continue  # Released or expired meanwhile: try to claim it again
+            if record[0] != fingerprint:
+                raise IdempotencyConflict(f"Request id {key} was used for a different request")
+            if record[1] == DONE:
+                print(f"[Idempotency] Replayed stored response for {key}")
+                return json.loads(record[2])
+            # Running in another worker
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def _run_claimed(self, key: str, func: Callable[[], Awaitable[dict]]) -> dict:
+        heartbeat = asyncio.create_task(self._heartbeat(key))
+        try:
+            result = await func()
+        except BaseException:
+            await asyncio.to_thread(self._release, key)
+            raise
+        else:
+            await asyncio.to_thread(self._finish, key, result)
+            return result
+        finally:
+            heartbeat.cancel()
+            self._inflight.pop(key, None)
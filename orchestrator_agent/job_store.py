@@ -0,0 +1,82 @@
+"""Job records for the asynchronous /jobs API.
+
+A job is a JSON record in a local SQLite file (JOB_STORE_PATH) that every
+uvicorn worker on the host can read, so GET /jobs/{id} works whichever worker
+ran the job. Records expire JOB_TTL_SECONDS after their last update.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Optional
+
+
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "orchestrator_jobs.db")
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "86400"))
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobStore:
+    """SQLite-backed job records with per-record expiry."""
+
+    def __init__(self, path: str = JOB_STORE_PATH, ttl_seconds: int = JOB_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, record TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # A connection per call keeps this safe across threads and worker processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _put(self, job: dict) -> None:
+        now = time.time()
+        job["updated_at"] = now
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, record, expires_at) VALUES (?, ?, ?)",
+                (job["job_id"], json.dumps(job), now + self.ttl_seconds),
+            )
+            conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,))
+
+    def _get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT record FROM jobs WHERE id = ? AND expires_at > ?",
+                (job_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def create(self, **fields) -> dict:
+        """Create a queued job with the given fields."""
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "created_at": time.time(),
+            "result": None,
+            "error": None,
+            **fields,
+        }
+        await asyncio.to_thread(self._put, job)
+        return job
+
+    async def update(self, job: dict, **fields) -> dict:
+        """Apply fields to a job and save it."""
+        job.update(fields)
+        await asyncio.to_thread(self._put, job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, job_id)
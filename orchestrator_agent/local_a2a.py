@@ -0,0 +1,198 @@
+"""Local stand-ins for the remote A2A agents.
+
+With A2A_LOCAL_MODE=TRUE the orchestrator runners start proposal_agent and
+iterative_agent as local subprocesses and point PROPOSAL_AGENT_URL /
+ITERATIVE_AGENT_URL at them. The stand-ins use in-memory sessions, memory and
+task stores and, by default, the offline stub model (LOCAL_A2A_MODEL=stub),
+so the whole A2A path runs without Cloud Run, Agent Engine or Gemini.
+
+The agents run as subprocesses rather than in-process: both use flat imports
+with the same module names (agent, tools, metrics, ...), so they cannot share
+one interpreter. A stand-in that is already listening on its port is reused,
+so several orchestrator workers share one pair.
+
+Benchmark the A2A hop on its own (latency, payload sizes, concurrency):
+    python local_a2a.py bench --requests 50 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import atexit
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+
+A2A_LOCAL_MODE = os.getenv("A2A_LOCAL_MODE", "FALSE").upper() == "TRUE"
+LOCAL_A2A_HOST = os.getenv("LOCAL_A2A_HOST", "127.0.0.1")
+LOCAL_A2A_MODEL = os.getenv("LOCAL_A2A_MODEL", "stub")
+LOCAL_A2A_STARTUP_TIMEOUT = int(os.getenv("LOCAL_A2A_STARTUP_TIMEOUT", "120"))
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Agent -> (orchestrator URL variable, local port)
+LOCAL_AGENTS = {
+    "proposal_agent": ("PROPOSAL_AGENT_URL", int(os.getenv("LOCAL_PROPOSAL_PORT", "8101"))),
+    "iterative_agent": ("ITERATIVE_AGENT_URL", int(os.getenv("LOCAL_ITERATIVE_PORT", "8102"))),
+}
+
+_processes: list[subprocess.Popen] = []
+
+
+def _base_url(port: int) -> str:
+    return f"http://{LOCAL_A2A_HOST}:{port}"
+
+
+def _is_up(port: int) -> bool:
+    try:
+        return httpx.get(f"{_base_url(port)}/.well-known/agent.json", timeout=1).status_code == 200
+    except httpx.HTTPError:
+        return False
+
+
+def start_local_agents() -> dict[str, str]:
+    """Start (or reuse) the local agents and point the orchestrator at them.
+
+    Must run before the root agent is created, since that reads the URLs.
+    """
+    urls = {}
+    for name, (url_variable, port) in LOCAL_AGENTS.items():
+        if not _is_up(port):
+            env = {
+                **os.environ,
+                "A2A_LOCAL_MODE": "TRUE",
+                "MODEL_ID": LOCAL_A2A_MODEL,
+                "TASK_STORE_BACKEND": "memory",
+                "SERVICE_URL": _base_url(port),
+            }
+            process = subprocess.Popen(
+                [sys.executable, "__main__.py", "--host", LOCAL_A2A_HOST, "--port", str(port)],
+                cwd=ROOT_DIR / name,
+                env=env,
+            )
+            _processes.append(process)
+            print(f"[Local A2A] Starting {name} on port {port} (pid {process.pid})")
+        urls[name] = f"{_base_url(port)}/.well-known/agent.json"
+        os.environ[url_variable] = urls[name]
+
+    atexit.register(stop_local_agents)
+    deadline = time.monotonic() + LOCAL_A2A_STARTUP_TIMEOUT
+    for name, (_, port) in LOCAL_AGENTS.items():
+        while not _is_up(port):
+            if time.monotonic() > deadline:
+                raise RuntimeError(
+                    f"Local {name} did not start on port {port} within "
+                    f"{LOCAL_A2A_STARTUP_TIMEOUT}s; see its output above"
+                )
+            time.sleep(0.5)
+    print(f"[Local A2A] Using local agents: {urls}")
+    return urls
+
+
+def start_local_agents_if_enabled() -> None:
+    if A2A_LOCAL_MODE:
+        start_local_agents()
+
+
+def stop_local_agents() -> None:
+    """Stop the stand-ins this process started."""
+    while _processes:
+        process = _processes.pop()
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+async def benchmark(agent: str, requests: int, concurrency: int, message: str) -> dict:
+    """Send message/send requests straight to a stand-in and time each one."""
+    port = LOCAL_AGENTS[agent][1]
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def send(client: httpx.AsyncClient, index: int) -> None:
+        payload = {
+            "jsonrpc": "2.0",
+            "id": index,
+            "method": "message/send",
+            "params": {"message": {
+                "role": "user",
+                "messageId": uuid.uuid4().hex,
+                "parts": [{"kind": "text", "text": message}],
+                "metadata": {"session_id": f"bench-{index}", "user_id": "bench"},
+            }},
+        }
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(f"{_base_url(port)}/", json=payload)
+            latency = time.perf_counter() - start
+        body = response.json()
+        samples.append({
+            "latency": latency,
+            "request_bytes": len(response.request.content),
+            "response_bytes": len(response.content),
+            "ok": response.status_code == 200 and "error" not in body,
+        })
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=600) as client:
+        await asyncio.gather(*(send(client, index) for index in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(sample["latency"] for sample in samples)
+    return {
+        "agent": agent,
+        "requests": requests,
+        "concurrency": concurrency,
+        "failed": sum(1 for sample in samples if not sample["ok"]),
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_ms_p50": round(latencies[len(latencies) // 2] * 1000, 1),
+        "latency_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+        "latency_ms_max": round(latencies[-1] * 1000, 1),
+        "request_bytes_mean": sum(s["request_bytes"] for s in samples) // len(samples),
+        "response_bytes_mean": sum(s["response_bytes"] for s in samples) // len(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local A2A stand-in agents")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("serve", help="Start the stand-ins and keep them running")
+
+    bench_parser = commands.add_parser("bench", help="Benchmark a stand-in over A2A")
+    bench_parser.add_argument("--agent", choices=list(LOCAL_AGENTS), default="proposal_agent")
+    bench_parser.add_argument("--requests", type=int, default=20)
+    bench_parser.add_argument("--concurrency", type=int, default=4)
+    bench_parser.add_argument("--message", default="Plan a 3 day trip to Goa from Mumbai")
+
+    args = parser.parse_args()
+    start_local_agents()
+    try:
+        if args.command == "serve":
+            print("[Local A2A] Press Ctrl+C to stop")
+            while True:
+                time.sleep(3600)
+        else:
+            result = asyncio.run(benchmark(args.agent, args.requests, args.concurrency, args.message))
+            for key, value in result.items():
+                print(f"{key:<22} {value}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_local_agents()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""Runner plugins shared by every orchestrator runner.
+
+Order matters: metrics run first so their timings include the other plugins,
+plugins that rewrite the model request come next, and the context cache runs
+last so it caches the final static prefix.
+"""
+
+from caching import context_cache
+from compaction import HistoryCompactionPlugin
+from metrics import MetricsPlugin
+
+
+def get_plugins():
+    """Build the plugin list for a Runner."""
+    return [
+        MetricsPlugin(),
+        HistoryCompactionPlugin(),
+        context_cache,
+    ]
@@ -0,0 +1,284 @@
+"""Per-user travel preference profiles learned from approvals and rejections.
+
+Every rejection feedback ("need hotels under $150 a night", "no flights") and
+every approved proposal updates a compact profile for the user: budget
+ceiling, price level, preferred/avoided transport and liked/avoided activity
+types. The profile is a key-value table in a local SQLite file
+(PREFERENCE_STORE_PATH), one row per (user, preference).
+
+The profile is then given to the generation agents up front, so a first
+proposal already honours what the user asked for last time instead of
+needing another revision round:
+- in-process agents get it appended to their system instruction by
+  PreferenceProfilePlugin
+- remote A2A agents get it in the delegation message
+"""
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+
+
+PREFERENCES_ENABLED = os.getenv("PREFERENCES_ENABLED", "TRUE").upper() == "TRUE"
+PREFERENCE_STORE_PATH = os.getenv("PREFERENCE_STORE_PATH", "preferences.db")
+
+# Starts the profile text; listed in caching.DYNAMIC_INSTRUCTION_MARKERS
+PROFILE_MARKER = "Known travel preferences of this user"
+
+# Agents that generate or revise proposal sections; numbered parallel parts
+# of an agent (activity_agent_1, activity_agent_2, ...) count as that agent
+PROFILE_AGENTS = {
+    "route_agent", "accommodation_agent", "activity_agent",
+    "route_fixer", "accommodation_fixer", "activities_fixer",
+    "leg_planner", "leg_replanner", "candidate_planner",
+}
+
+# Explicit feedback counts more than a preference implied by an approval
+FEEDBACK_WEIGHT = 2
+APPROVAL_WEIGHT = 1
+
+TRANSPORT_MODES = {
+    "train": ["train", "rail"],
+    "flight": ["flight", "fly", "plane", "airport"],
+    "bus": ["bus", "coach"],
+    "car": ["car", "drive", "driving", "road trip", "taxi"],
+    "ferry": ["ferry", "boat", "cruise"],
+}
+ACTIVITY_TYPES = {
+    "museums and art": ["museum", "gallery", "art"],
+    "history and heritage": ["history", "historic", "heritage", "temple", "fort", "monument"],
+    "nature and hiking": ["nature", "hike", "hiking", "trek", "wildlife", "national park"],
+    "beaches": ["beach", "coast"],
+    "food": ["food", "cuisine", "restaurant", "culinary"],
+    "nightlife": ["nightlife", "bar", "club", "party"],
+    "shopping": ["shopping", "market"],
+    "adventure sports": ["adventure", "rafting", "diving", "paragliding", "surfing"],
+    "relaxation": ["relax", "spa", "leisure", "slower pace"],
+}
+CHEAPER = ["cheaper", "budget", "affordable", "expensive", "lower price", "economical"]
+PRICIER = ["luxury", "upscale", "premium", "5 star", "five star", "nicer"]
+NEGATIONS = ["no ", "not ", "avoid", "without", "don't", "dont", "hate", "fewer", "less ", "skip"]
+
+_BUDGET = re.compile(
+    r"(?:under|below|less than|max(?:imum)?|at most|up to|within|no more than)\s+"
+    r"((?:[$€£₹]|rs\.?\s?|inr\s?)?\d[\d,]*(?:\.\d+)?\s*k?"
+    r"(?:\s*(?:usd|eur|gbp|inr|rupees|dollars|euros))?"
+    r"(?:\s*(?:/|per|a)\s*(?:night|day|person))?)",
+    re.IGNORECASE,
+)
+_CLAUSES = re.compile(r"[,.;!?]|\bbut\b|\band\b|\binstead\b", re.IGNORECASE)
+_PROPOSAL_LINE = re.compile(r"^\s*(Transportation|Price|Highlights):\s*(.+)$", re.MULTILINE)
+
+
+# ============================================================================
+# EXTRACTION
+# ============================================================================
+
+def _mentions(text: str, keywords: list[str]) -> bool:
+    return any(re.search(rf"\b{re.escape(keyword)}", text) for keyword in keywords)
+
+
+def _scored_mentions(text: str, categories: dict, weight: int) -> dict[str, int]:
+    """+weight for each category mentioned, -weight when the clause negates it."""
+    scores = {}
+    for clause in _CLAUSES.split(text.lower()):
+        negated = any(negation in f" {clause}" for negation in NEGATIONS)
+        for category, keywords in categories.items():
+            if _mentions(clause, keywords):
+                scores[category] = -weight if negated else weight
+    return scores
+
+
+def preferences_from_feedback(feedback: str) -> dict:
+    """Preference updates implied by one rejection feedback."""
+    text = (feedback or "").lower()
+    updates: dict = {"counters": {}, "values": {}}
+
+    budget = _BUDGET.search(feedback or "")
+    if budget:
+        updates["values"]["budget_ceiling"] = budget.group(1).strip()
+    if _mentions(text, CHEAPER):
+        updates["values"]["price_level"] = "budget"
+    elif _mentions(text, PRICIER):
+        updates["values"]["price_level"] = "upscale"
+
+    for mode, score in _scored_mentions(text, TRANSPORT_MODES, FEEDBACK_WEIGHT).items():
+        updates["counters"][f"transport:{mode}"] = score
+    for kind, score in _scored_mentions(text, ACTIVITY_TYPES, FEEDBACK_WEIGHT).items():
+        updates["counters"][f"activity:{kind}"] = score
+    return updates
+
+
+def preferences_from_proposal(proposal: str) -> dict:
+    """Preference updates implied by approving a proposal."""
+    updates: dict = {"counters": {}, "values": {}}
+    for field, value in _PROPOSAL_LINE.findall(proposal or ""):
+        value = value.strip()
+        if field == "Price":
+            updates["values"]["approved_price_range"] = value
+        elif field == "Transportation":
+            updates["values"]["approved_transportation"] = value
+            for mode in _scored_mentions(value, TRANSPORT_MODES, APPROVAL_WEIGHT):
+                updates["counters"][f"transport:{mode}"] = APPROVAL_WEIGHT
+        else:
+            for kind in _scored_mentions(value, ACTIVITY_TYPES, APPROVAL_WEIGHT):
+                updates["counters"][f"activity:{kind}"] = APPROVAL_WEIGHT
+    return updates
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class PreferenceStore:
+    """Preference profiles as (user_id, key) -> JSON value rows in SQLite."""
+
+    def __init__(self, path: str = PREFERENCE_STORE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS preferences ("
+                "user_id TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (user_id, key))"
+            )
+
+    def _connect(self):
+        # A connection per call keeps this safe across threads and worker processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, user_id: str) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT key, value FROM preferences WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def update(self, user_id: str, updates: dict, event: str) -> None:
+        """Add counters, overwrite values and count the event, in one transaction."""
+        now = time.time()
+        counters = {**updates.get("counters", {}), f"{event}s": 1}
+        with self._connect() as conn:
+            for key, delta in counters.items():
+                conn.execute(
+                    "INSERT INTO preferences (user_id, key, value, updated_at) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT (user_id, key) DO UPDATE SET "
+                    "value = CAST(value AS INTEGER) + excluded.value, updated_at = excluded.updated_at",
+                    (user_id, key, delta, now),
+                )
+            for key, value in updates.get("values", {}).items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO preferences (user_id, key, value, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (user_id, key, json.dumps(value), now),
+                )
+
+
+_store: Optional[PreferenceStore] = None
+
+
+def get_preference_store() -> PreferenceStore:
+    global _store
+    if _store is None:
+        _store = PreferenceStore()
+    return _store
+
+
+def learn_from_rejection(user_id: str, feedback: str) -> None:
+    """Update the user's profile from rejection feedback (never raises)."""
+    if not PREFERENCES_ENABLED or not user_id:
+        return
+    try:
+        get_preference_store().update(user_id, preferences_from_feedback(feedback), "rejection")
+    except Exception as e:
+        print(f"[Preferences] Could not update profile for {user_id}: {e}")
+
+
+def learn_from_approval(user_id: str, proposal: str) -> None:
+    """Update the user's profile from an approved proposal (never raises)."""
+    if not PREFERENCES_ENABLED or not user_id:
+        return
+    try:
+        get_preference_store().update(user_id, preferences_from_proposal(proposal), "approval")
+    except Exception as e:
+        print(f"[Preferences] Could not update profile for {user_id}: {e}")
+
+
+# ============================================================================
+# PROMPT INJECTION
+# ============================================================================
+
+def format_profile(profile: dict) -> str:
+    """Compact profile text for a prompt, or "" when nothing was learned yet."""
+    lines = []
+    if profile.get("budget_ceiling"):
+        lines.append(f"- Budget ceiling: {profile['budget_ceiling']}")
+    if profile.get("price_level"):
+        lines.append(f"- Price level: {profile['price_level']}")
+
+    for prefix, label in (("transport:", "Transport"), ("activity:", "Activities")):
+        scores = sorted(
+            ((key[len(prefix):], score) for key, score in profile.items() if key.startswith(prefix)),
+            key=lambda item: -abs(item[1]),
+        )
+        liked = [name for name, score in scores if score > 0][:4]
+        avoided = [name for name, score in scores if score < 0][:4]
+        parts = []
+        if liked:
+            parts.append("prefers " + ", ".join(liked))
+        if avoided:
+            parts.append("avoids " + ", ".join(avoided))
+        if parts:
+            lines.append(f"- {label}: {'; '.join(parts)}")
+
+    if profile.get("approved_price_range"):
+        lines.append(f"- Last approved price range: {profile['approved_price_range']}")
+    if profile.get("approved_transportation"):
+        lines.append(f"- Last approved transportation: {profile['approved_transportation']}")
+
+    if not lines:
+        return ""
+    return (
+        f"{PROFILE_MARKER} (learned from their earlier approvals and rejections; "
+        "follow them unless the current request says otherwise):\n" + "\n".join(lines)
+    )
+
+
+def profile_text(user_id: str) -> str:
+    """The user's formatted profile, or "" (never raises)."""
+    if not PREFERENCES_ENABLED or not user_id:
+        return ""
+    try:
+        return format_profile(get_preference_store().get(user_id))
+    except Exception as e:
+        print(f"[Preferences] Could not load profile for {user_id}: {e}")
+        return ""
+
+
+class PreferenceProfilePlugin(BasePlugin):
+    """Appends the user's preference profile to generation agents' instructions."""
+
+    def __init__(self, agents: set[str] = PROFILE_AGENTS):
+        super().__init__(name="preferences")
+        self.agents = agents
+
+    async def before_model_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+    ) -> Optional[LlmResponse]:
+        if re.sub(r"_\d+$", "", callback_context.agent_name) not in self.agents:
+            return None
+        text = await asyncio.to_thread(profile_text, callback_context.session.user_id)
+        if text:
+            llm_request.append_instructions([text])
+        return None
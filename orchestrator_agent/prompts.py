@@ -24,7 +24,8 @@ Use this context to personalize responses and recall past trips.
 -> Say "Trip finalized!"
 
 ### Rejection/feedback (e.g., "cheaper hotels"):
--> Call process_rejection(feedback, affected_section)
+-> Call process_rejection(feedback, affected_sections) listing EVERY section the
+   feedback touches (route, accommodation, activities)
 -> Delegate to iterative_agent
 
 ## RULES:
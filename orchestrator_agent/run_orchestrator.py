@@ -9,17 +9,25 @@ load_dotenv()
 from google.adk.runners import Runner
 from google.genai import types
 
-from google.adk.memory import VertexAiMemoryBankService
-from google.adk.sessions import VertexAiSessionService
+from google.adk.memory import InMemoryMemoryService, VertexAiMemoryBankService
+from google.adk.sessions import InMemorySessionService, VertexAiSessionService
+
+from local_a2a import A2A_LOCAL_MODE, start_local_agents_if_enabled
 
 # Use factory function instead of importing root_agent directly
 from agent import create_root_agent
+from caching import context_cache
+from plugins import get_plugins
+from metrics import observe_services, track_turn
+from tracing import setup_tracing, turn_span, shutdown_tracing
 
 
 def get_services():
     """Initialize VertexAI services."""
     engine_id = os.getenv("AGENT_ENGINE_ID")
     
+    if A2A_LOCAL_MODE and not engine_id:
+        return InMemorySessionService(), InMemoryMemoryService()
     if not engine_id:
         raise ValueError("AGENT_ENGINE_ID is required. Run setup_agent_engine.py first.")
     
@@ -31,7 +39,11 @@ def get_services():
 
 async def main():
     """Run interactive chat with the orchestrator."""
+    setup_tracing("orchestrator_agent")
+    # Before create_root_agent(), which reads the remote agent URLs
+    start_local_agents_if_enabled()
     session_service, memory_service = get_services()
+    observe_services(session_service, memory_service)
     
     # Create fresh agent instance inside async context
     # This prevents 'client has been closed' errors
@@ -42,6 +54,7 @@ async def main():
         app_name="hitl_orchestrator",
         session_service=session_service,
         memory_service=memory_service,
+        plugins=get_plugins(),
     )
     
     print("\n" + "="*60)
@@ -99,45 +112,49 @@ async def main():
                 print(f"\nNew session created: {session.id}\n")
                 continue
             
-            # Send message to agent
-            content = types.Content(
-                role="user",
-                parts=[types.Part(text=user_input)]
-            )
+            with turn_span("local_turn", user_id, session.id), track_turn("cli"):
+                # Send message to agent
+                content = types.Content(
+                    role="user",
+                    parts=[types.Part(text=user_input)]
+                )
             
-            print("\nAgent: ", end="", flush=True)
+                print("\nAgent: ", end="", flush=True)
             
-            async for event in runner.run_async(
-                user_id=user_id,
-                session_id=session.id,
-                new_message=content,
-            ):
-                if hasattr(event, "content") and event.content:
-                    if hasattr(event.content, "parts"):
-                        for part in event.content.parts:
-                            if hasattr(part, "text") and part.text:
-                                print(part.text, end="", flush=True)
+                async for event in runner.run_async(
+                    user_id=user_id,
+                    session_id=session.id,
+                    new_message=content,
+                ):
+                    if hasattr(event, "content") and event.content:
+                        if hasattr(event.content, "parts"):
+                            for part in event.content.parts:
+                                if hasattr(part, "text") and part.text:
+                                    print(part.text, end="", flush=True)
             
-            print("\n")
+                print("\n")
             
-            # Check if approved and save to memory
-            session = await session_service.get_session(
-                app_name="hitl_orchestrator",
-                user_id=user_id,
-                session_id=session.id,
-            )
-            if session.state and session.state.get("approved"):
-                try:
-                    await memory_service.add_session_to_memory(session)
-                    print("[Session saved to Memory Bank]\n")
-                except Exception as e:
-                    print(f"[Warning: Could not save to memory: {e}]\n")
+                # Check if approved and save to memory
+                session = await session_service.get_session(
+                    app_name="hitl_orchestrator",
+                    user_id=user_id,
+                    session_id=session.id,
+                )
+                if session.state and session.state.get("approved"):
+                    try:
+                        await memory_service.add_session_to_memory(session)
+                        print("[Session saved to Memory Bank]\n")
+                    except Exception as e:
+                        print(f"[Warning: Could not save to memory: {e}]\n")
                     
         except KeyboardInterrupt:
             print("\n\nInterrupted. Goodbye!")
             break
         except Exception as e:
             print(f"\nError: {e}\n")
+    
+    await context_cache.close()
+    shutdown_tracing()
 
 
 if __name__ == "__main__":
@@ -11,23 +11,30 @@ Usage:
     # Option 2: Run directly
     python run_rest.py
     
+    # Option 3: Multiple worker processes (one per CPU core)
+    WEB_CONCURRENCY=auto python run_rest.py
+    
 Endpoints:
     POST /chat - Send message to agent
+    POST /jobs - Submit a message to run in the background
+    GET /jobs/{job_id} - Poll a background job
     POST /end-session/{user_id}/{session_id} - End and save to memory
     GET /memories/{user_id} - Retrieve user's memories
     GET /docs - Swagger UI
 """
 
+import asyncio
 import os
 import sys
+import time
 from pathlib import Path
 from typing import Optional
 from contextlib import asynccontextmanager
 
+import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
-import uvicorn
 
 # Ensure we can import from current directory
 sys.path.insert(0, str(Path(__file__).parent))
@@ -36,10 +43,18 @@ load_dotenv()
 
 from google.adk.runners import Runner
 from google.genai import types
-from google.adk.memory import VertexAiMemoryBankService
-from google.adk.sessions import VertexAiSessionService
+from google.adk.memory import InMemoryMemoryService, VertexAiMemoryBankService
+from google.adk.sessions import InMemorySessionService, VertexAiSessionService
 
+from local_a2a import A2A_LOCAL_MODE, start_local_agents_if_enabled
 from agent import create_root_agent
+from caching import context_cache
+from idempotency import IdempotencyConflict, IdempotencyStore, request_fingerprint
+from job_store import JobStore, RUNNING, SUCCEEDED, FAILED
+from plugins import get_plugins
+from serving import serve
+from metrics import metrics_endpoint, observe_services, track_turn
+from tracing import setup_tracing, turn_span, shutdown_tracing
 
 
 # CRITICAL: Use the SAME app_name across ALL agents for shared memory!
@@ -50,14 +65,25 @@ APP_NAME = "hitl_trip_planner"
 ENGINE_ID = os.getenv("AGENT_ENGINE_ID")
 
 
+# Background jobs run at most this many at a time per worker
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "8"))
+JOB_CALLBACK_ATTEMPTS = int(os.getenv("JOB_CALLBACK_ATTEMPTS", "3"))
+
+
 # Global services
 session_service = None
 memory_service = None
 runner = None
+job_store = None
+idempotency = None
+job_slots = asyncio.Semaphore(JOB_CONCURRENCY)
+job_tasks = set()
 
 
 def get_services():
     """Initialize VertexAI services."""
+    if A2A_LOCAL_MODE and not ENGINE_ID:
+        return InMemorySessionService(), InMemoryMemoryService()
     if not ENGINE_ID:
         raise ValueError("AGENT_ENGINE_ID is required. Set it in your .env file.")
     
@@ -70,9 +96,16 @@ def get_services():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize services on startup."""
-    global session_service, memory_service, runner
+    global session_service, memory_service, runner, job_store, idempotency
     
+    setup_tracing("orchestrator_agent")
+    # Before create_root_agent(), which reads the remote agent URLs
+    await asyncio.to_thread(start_local_agents_if_enabled)
     session_service, memory_service = get_services()
+    observe_services(session_service, memory_service)
+    
+    job_store = JobStore()
+    idempotency = IdempotencyStore()
     
     # Create fresh agent instance
     root_agent = create_root_agent()
@@ -82,6 +115,7 @@ async def lifespan(app: FastAPI):
         app_name=APP_NAME,
         session_service=session_service,
         memory_service=memory_service,
+        plugins=get_plugins(),
     )
     
     print("\n" + "="*60)
@@ -93,14 +127,22 @@ async def lifespan(app: FastAPI):
     print("="*60)
     print("\nEndpoints:")
     print("  POST /chat              - Send message to agent")
+    print("  POST /jobs              - Submit a background job")
+    print("  GET  /jobs/{job_id}     - Poll a background job")
     print("  POST /end-session/{user_id}/{session_id} - Save to memory")
     print("  GET  /memories/{user_id} - Get user's memories")
+    print("  GET  /metrics           - Prometheus metrics")
     print("  GET  /docs              - Swagger UI")
     print("="*60 + "\n")
     
     yield
     
     print("\nShutting down...")
+    for task in list(job_tasks):
+        task.cancel()
+    await asyncio.gather(*job_tasks, return_exceptions=True)
+    await context_cache.close()
+    shutdown_tracing()
 
 
 app = FastAPI(
@@ -111,6 +153,16 @@ app = FastAPI(
 )
 
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """One span per request, parent of the ADK model/tool and service spans."""
+    with turn_span(f"{request.method} {request.url.path}"):
+        return await call_next(request)
+
+
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+
 # ============================================================================
 # Request/Response Models
 # ============================================================================
@@ -119,6 +171,7 @@ class ChatRequest(BaseModel):
     user_id: str
     session_id: Optional[str] = None
     message: str
+    request_id: Optional[str] = None  # retries with the same id run only once
     
     class Config:
         json_schema_extra = {
@@ -137,6 +190,21 @@ class ChatResponse(BaseModel):
     trip_finalized: bool = False
 
 
+class JobRequest(ChatRequest):
+    callback_url: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    user_id: str
+    session_id: str
+    created_at: float
+    updated_at: float
+    result: Optional[ChatResponse] = None
+    error: Optional[str] = None
+
+
 class MemoriesResponse(BaseModel):
     user_id: str
     count: int
@@ -147,7 +215,74 @@ class MemoriesResponse(BaseModel):
 # Endpoints
 # ============================================================================
 
+async def _get_or_create_session(request: ChatRequest):
+    """Load the request's session, or create one if it has none or it is gone."""
+    if request.session_id:
+        try:
+            session = await session_service.get_session(
+                app_name=APP_NAME,
+                user_id=request.user_id,
+                session_id=request.session_id,
+            )
+            if session:
+                return session
+        except Exception:
+            # Session not found, create new
+            pass
+    return await session_service.create_session(
+        app_name=APP_NAME,
+        user_id=request.user_id,
+    )
+
+
+async def _run_chat(request: ChatRequest, session) -> ChatResponse:
+    """Run one turn in the session; shared by /chat and /jobs."""
+    print(f"[Chat] User: {request.user_id}, Session: {session.id}")
+    print(f"[Chat] Message: {request.message[:100]}...")
+    
+    # Run agent
+    content = types.Content(
+        role="user",
+        parts=[types.Part(text=request.message)]
+    )
+    
+    response_text = ""
+    async for event in runner.run_async(
+        user_id=request.user_id,
+        session_id=session.id,
+        new_message=content,
+    ):
+        if hasattr(event, "content") and event.content:
+            if hasattr(event.content, "parts"):
+                for part in event.content.parts:
+                    if hasattr(part, "text") and part.text:
+                        response_text += part.text
+    
+    # Get updated session state
+    session = await session_service.get_session(
+        app_name=APP_NAME,
+        user_id=request.user_id,
+        session_id=session.id,
+    )
+    
+    state = session.state or {}
+    awaiting_approval = state.get("awaiting_approval", False)
+    trip_finalized = state.get("trip_finalized", False)
+    
+    # Note: Memory is automatically saved via after_agent_callback in the agent
+    # The callback extracts info from session events (conversation history)
+    # See: https://google.github.io/adk-docs/sessions/memory/
+    
+    return ChatResponse(
+        session_id=session.id,
+        response=response_text or "No response generated.",
+        awaiting_approval=awaiting_approval,
+        trip_finalized=trip_finalized,
+    )
+
+
 @app.post("/chat", response_model=ChatResponse, tags=["Chat"])
+@track_turn("rest")
 async def chat(request: ChatRequest):
     """
     Send a message to the Orchestrator Agent.
@@ -160,76 +295,119 @@ async def chat(request: ChatRequest):
     2. Request a trip: "Plan a 5 day trip to Kerala from Bangalore"
     3. Review proposal and approve: "approve" or reject with feedback
     4. On rejection: provide feedback like "I want budget hotels instead"
+    
+    For long proposals use POST /jobs instead, which returns immediately.
+    
+    Send a request_id to make retries safe: a retry with the same id gets the
+    original response instead of running the turn again.
     """
+    async def run() -> dict:
+        session = await _get_or_create_session(request)
+        return (await _run_chat(request, session)).model_dump()
+    
     try:
-        # Create or get session
-        if request.session_id:
-            try:
-                session = await session_service.get_session(
-                    app_name=APP_NAME,
-                    user_id=request.user_id,
-                    session_id=request.session_id,
-                )
-            except Exception:
-                # Session not found, create new
-                session = await session_service.create_session(
-                    app_name=APP_NAME,
-                    user_id=request.user_id,
-                )
-        else:
-            session = await session_service.create_session(
-                app_name=APP_NAME,
-                user_id=request.user_id,
-            )
-        
-        print(f"[Chat] User: {request.user_id}, Session: {session.id}")
-        print(f"[Chat] Message: {request.message[:100]}...")
-        
-        # Run agent
-        content = types.Content(
-            role="user",
-            parts=[types.Part(text=request.message)]
-        )
-        
-        response_text = ""
-        async for event in runner.run_async(
-            user_id=request.user_id,
-            session_id=session.id,
-            new_message=content,
-        ):
-            if hasattr(event, "content") and event.content:
-                if hasattr(event.content, "parts"):
-                    for part in event.content.parts:
-                        if hasattr(part, "text") and part.text:
-                            response_text += part.text
-        
-        # Get updated session state
-        session = await session_service.get_session(
-            app_name=APP_NAME,
+        if not request.request_id:
+            return ChatResponse(**await run())
+        return ChatResponse(**await idempotency.run(
+            f"chat:{request.user_id}:{request.request_id}",
+            request_fingerprint(request.session_id, request.message),
+            run,
+        ))
+    
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"[Error] {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ============================================================================
+# Asynchronous Jobs
+# ============================================================================
+
+async def _send_callback(job: dict) -> None:
+    """POST the finished job to its callback_url, retrying with backoff."""
+    for attempt in range(JOB_CALLBACK_ATTEMPTS):
+        try:
+            async with httpx.AsyncClient(timeout=30) as client:
+                response = await client.post(job["callback_url"], json=job)
+                response.raise_for_status()
+            print(f"[Jobs] Callback for {job['job_id']} delivered")
+            return
+        except Exception as e:
+            print(f"[Jobs] Callback for {job['job_id']} failed (attempt {attempt + 1}): {e}")
+            await asyncio.sleep(2 ** attempt)
+
+
+async def _run_job(job: dict, request: ChatRequest, session) -> None:
+    """Run a job's turn in the background and record the outcome."""
+    try:
+        async with job_slots:
+            await job_store.update(job, status=RUNNING, started_at=time.time())
+            with turn_span("job", request.user_id, session.id), track_turn("job"):
+                result = await _run_chat(request, session)
+        await job_store.update(job, status=SUCCEEDED, result=result.model_dump())
+        print(f"[Jobs] {job['job_id']} succeeded")
+    except asyncio.CancelledError:
+        await job_store.update(job, status=FAILED, error="Server shut down before the job finished")
+        raise
+    except Exception as e:
+        print(f"[Jobs] {job['job_id']} failed: {e}")
+        await job_store.update(job, status=FAILED, error=str(e))
+    
+    if job.get("callback_url"):
+        await _send_callback(job)
+
+
+@app.post("/jobs", response_model=JobResponse, status_code=202, tags=["Jobs"])
+async def submit_job(request: JobRequest):
+    """
+    Submit a message to run in the background.
+    
+    Returns at once with a job_id and the session_id. Poll GET /jobs/{job_id},
+    or pass callback_url to receive the finished job as a POST. Wait for a
+    job to finish before submitting the next message for the same session.
+    Resubmitting with the same request_id returns the original job.
+    """
+    async def submit() -> dict:
+        session = await _get_or_create_session(request)
+        job = await job_store.create(
             user_id=request.user_id,
             session_id=session.id,
+            callback_url=request.callback_url,
         )
-        
-        state = session.state or {}
-        awaiting_approval = state.get("awaiting_approval", False)
-        trip_finalized = state.get("trip_finalized", False)
-        
-        # Note: Memory is automatically saved via after_agent_callback in the agent
-        # The callback extracts info from session events (conversation history)
-        # See: https://google.github.io/adk-docs/sessions/memory/
-        
-        return ChatResponse(
-            session_id=session.id,
-            response=response_text or "No response generated.",
-            awaiting_approval=awaiting_approval,
-            trip_finalized=trip_finalized,
+        task = asyncio.create_task(_run_job(job, request, session))
+        job_tasks.add(task)
+        task.add_done_callback(job_tasks.discard)
+        print(f"[Jobs] Submitted {job['job_id']} for session {session.id}")
+        return dict(job)
+    
+    try:
+        if not request.request_id:
+            return JobResponse(**await submit())
+        job = await idempotency.run(
+            f"job:{request.user_id}:{request.request_id}",
+            request_fingerprint(request.session_id, request.message, request.callback_url),
+            submit,
         )
-        
+        # A duplicate gets the job as it is now, not as it was submitted
+        return JobResponse(**(await job_store.get(job["job_id"]) or job))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"[Error] {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/jobs/{job_id}", response_model=JobResponse, tags=["Jobs"])
+async def get_job(job_id: str):
+    """Get a job's status, and its result once it has succeeded."""
+    job = await job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    return JobResponse(**job)
+
+
 @app.post("/end-session/{user_id}/{session_id}", tags=["Session"])
 async def end_session(user_id: str, session_id: str):
     """
@@ -341,7 +519,7 @@ def main():
     port = int(os.getenv("PORT", 8080))
     host = os.getenv("HOST", "0.0.0.0")
     print(f"Starting Orchestrator Agent REST API on {host}:{port}...")
-    uvicorn.run(app, host=host, port=port)
+    serve("run_rest:app", app, host=host, port=port)
 
 
 if __name__ == "__main__":
@@ -11,9 +11,13 @@ Usage:
     # Option 2: Run directly
     python run_web.py
     
+    # Option 3: Multiple worker processes (one per CPU core)
+    WEB_CONCURRENCY=auto python run_web.py
+    
 Then open http://localhost:8080 in your browser.
 """
 
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -23,7 +27,6 @@ from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
-import uvicorn
 
 # Ensure we can import from current directory
 sys.path.insert(0, str(Path(__file__).parent))
@@ -32,10 +35,17 @@ load_dotenv()
 
 from google.adk.runners import Runner
 from google.genai import types
-from google.adk.memory import VertexAiMemoryBankService
-from google.adk.sessions import VertexAiSessionService
+from google.adk.memory import InMemoryMemoryService, VertexAiMemoryBankService
+from google.adk.sessions import InMemorySessionService, VertexAiSessionService
 
+from local_a2a import A2A_LOCAL_MODE, start_local_agents_if_enabled
 from agent import create_root_agent
+from caching import context_cache
+from plugins import get_plugins
+from reconnect import ConnectionSnapshots, SessionUnavailable
+from serving import serve
+from metrics import metrics_endpoint, observe_services, track_turn, track_websocket
+from tracing import setup_tracing, turn_span, shutdown_tracing
 
 
 # CRITICAL: Use the SAME app_name across ALL agents for shared memory!
@@ -50,10 +60,13 @@ ENGINE_ID = os.getenv("AGENT_ENGINE_ID")
 session_service = None
 memory_service = None
 runner = None
+snapshots = None
 
 
 def get_services():
     """Initialize VertexAI services."""
+    if A2A_LOCAL_MODE and not ENGINE_ID:
+        return InMemorySessionService(), InMemoryMemoryService()
     if not ENGINE_ID:
         raise ValueError("AGENT_ENGINE_ID is required. Set it in your .env file.")
     
@@ -66,9 +79,13 @@ def get_services():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize services on startup."""
-    global session_service, memory_service, runner
+    global session_service, memory_service, runner, snapshots
     
+    setup_tracing("orchestrator_agent")
+    # Before create_root_agent(), which reads the remote agent URLs
+    await asyncio.to_thread(start_local_agents_if_enabled)
     session_service, memory_service = get_services()
+    observe_services(session_service, memory_service)
     
     # Create fresh agent instance
     root_agent = create_root_agent()
@@ -78,7 +95,9 @@ async def lifespan(app: FastAPI):
         app_name=APP_NAME,
         session_service=session_service,
         memory_service=memory_service,
+        plugins=get_plugins(),
     )
+    snapshots = ConnectionSnapshots(session_service, memory_service, APP_NAME)
     
     print("\n" + "="*60)
     print("ORCHESTRATOR AGENT - Web Interface")
@@ -91,9 +110,12 @@ async def lifespan(app: FastAPI):
     yield
     
     print("\nShutting down...")
+    await context_cache.close()
+    shutdown_tracing()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 
 # Store active sessions
@@ -388,6 +410,7 @@ HTML_PAGE = """
     
     <script>
         let ws;
+        let reconnectDelay = 1000;
         let sessionId = localStorage.getItem('orchestrator_sessionId');
         let userId = localStorage.getItem('orchestrator_userId') || 'user_' + Math.random().toString(36).substr(2, 8);
         localStorage.setItem('orchestrator_userId', userId);
@@ -398,6 +421,7 @@ HTML_PAGE = """
             ws = new WebSocket(wsUrl);
             
             ws.onopen = () => {
+                reconnectDelay = 1000;
                 addMessage('Connected to Orchestrator Agent', 'system');
             };
             
@@ -421,7 +445,9 @@ HTML_PAGE = """
             
             ws.onclose = () => {
                 addMessage('Disconnected. Reconnecting...', 'system warning');
-                setTimeout(connect, 2000);
+                // Jittered backoff so clients do not all reconnect at once after a deploy
+                setTimeout(connect, reconnectDelay + Math.random() * reconnectDelay);
+                reconnectDelay = Math.min(reconnectDelay * 2, 30000);
             };
             
             ws.onerror = (error) => {
@@ -482,6 +508,7 @@ async def get_home():
 
 
 @app.websocket("/ws/{user_id}")
+@track_websocket
 async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Optional[str] = None):
     """WebSocket endpoint for real-time chat."""
     await websocket.accept()
@@ -489,27 +516,18 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Opt
     session = None
     
     try:
-        # Create or retrieve session
-        if session_id:
-            try:
-                session = await session_service.get_session(
-                    app_name=APP_NAME,
-                    user_id=user_id,
-                    session_id=session_id,
-                )
-                print(f"[WS] Retrieved session {session_id} for user {user_id}")
-            except Exception as e:
-                print(f"[WS] Session {session_id} not found, creating new: {e}")
-                session = await session_service.create_session(
-                    app_name=APP_NAME,
-                    user_id=user_id,
-                )
-        else:
-            session = await session_service.create_session(
-                app_name=APP_NAME,
-                user_id=user_id,
-            )
-            print(f"[WS] Created new session {session.id} for user {user_id}")
+        # Resume the session (from the reconnect snapshot if recent) or create one
+        try:
+            session = await snapshots.open_session(user_id, session_id)
+        except SessionUnavailable as e:
+            print(f"[WS] Session {session_id} unavailable: {e}")
+            await websocket.send_json({
+                "type": "error",
+                "text": "Session service unavailable, retrying...",
+            })
+            await websocket.close(code=1011)
+            return
+        print(f"[WS] Using session {session.id} for user {user_id}")
         
         # Send session info
         await websocket.send_json({
@@ -518,22 +536,14 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Opt
             "user_id": user_id,
         })
         
-        # Load memory for this user
-        try:
-            memory_response = await memory_service.search_memory(
-                app_name=APP_NAME,
-                user_id=user_id,
-                query="previous trip plans and preferences",
-            )
-            memory_list = getattr(memory_response, 'memories', []) or []
-            if memory_list:
-                await websocket.send_json({
-                    "type": "memory_loaded",
-                    "count": len(memory_list),
-                })
-                print(f"[Memory] Loaded {len(memory_list)} memories for user {user_id}")
-        except Exception as e:
-            print(f"[Memory] Search error: {e}")
+        # Memory count for this user (searched at most once per snapshot TTL)
+        memory_count = await snapshots.memory_count(user_id)
+        if memory_count:
+            await websocket.send_json({
+                "type": "memory_loaded",
+                "count": memory_count,
+            })
+            print(f"[Memory] Loaded {memory_count} memories for user {user_id}")
         
         # Message loop
         while True:
@@ -546,35 +556,37 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Opt
             print(f"[WS] User {user_id}: {user_text[:100]}...")
             
             try:
-                # Run agent
-                content = types.Content(
-                    role="user",
-                    parts=[types.Part(text=user_text)]
-                )
+                with turn_span("ws_turn", user_id, session.id), track_turn("ws"):
+                    # Run agent
+                    content = types.Content(
+                        role="user",
+                        parts=[types.Part(text=user_text)]
+                    )
                 
-                response_text = ""
-                async for event in runner.run_async(
-                    user_id=user_id,
-                    session_id=session.id,
-                    new_message=content,
-                ):
-                    if hasattr(event, "content") and event.content:
-                        if hasattr(event.content, "parts"):
-                            for part in event.content.parts:
-                                if hasattr(part, "text") and part.text:
-                                    response_text += part.text
+                    response_text = ""
+                    async for event in runner.run_async(
+                        user_id=user_id,
+                        session_id=session.id,
+                        new_message=content,
+                    ):
+                        if hasattr(event, "content") and event.content:
+                            if hasattr(event.content, "parts"):
+                                for part in event.content.parts:
+                                    if hasattr(part, "text") and part.text:
+                                        response_text += part.text
                 
-                await websocket.send_json({
-                    "type": "response",
-                    "text": response_text or "No response generated.",
-                })
+                    await websocket.send_json({
+                        "type": "response",
+                        "text": response_text or "No response generated.",
+                    })
                 
-                # Update session reference
-                session = await session_service.get_session(
-                    app_name=APP_NAME,
-                    user_id=user_id,
-                    session_id=session.id,
-                )
+                    # Update session reference
+                    session = await session_service.get_session(
+                        app_name=APP_NAME,
+                        user_id=user_id,
+                        session_id=session.id,
+                    ) or session
+                    snapshots.remember(session)
                 
                 # Note: Memory is automatically saved via after_agent_callback in the agent
                 # The callback extracts info from session events (conversation history)
@@ -592,8 +604,8 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Opt
         # Save session to memory on disconnect
         if session:
             try:
-                await memory_service.add_session_to_memory(session)
-                print(f"[Memory] Session saved on disconnect")
+                if await snapshots.save_to_memory(session):
+                    print(f"[Memory] Session saved on disconnect")
             except Exception as e:
                 print(f"[Memory] Error saving on disconnect: {e}")
 
@@ -612,7 +624,7 @@ def main():
     port = int(os.getenv("PORT", 8080))
     host = os.getenv("HOST", "0.0.0.0")
     print(f"Starting Orchestrator Agent Web Interface on http://{host}:{port}")
-    uvicorn.run(app, host=host, port=port)
+    serve("run_web:app", app, host=host, port=port)
 
 
 if __name__ == "__main__":
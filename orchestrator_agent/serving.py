@@ -0,0 +1,59 @@
+"""Uvicorn serving for the orchestrator runners, with optional multi-worker mode."""
+
+import inspect
+import os
+
+import uvicorn
+
+from local_a2a import A2A_LOCAL_MODE
+
+
+# Seconds a worker may take to import the app (the ADK import alone is slow)
+WORKER_STARTUP_TIMEOUT = int(os.getenv("WORKER_STARTUP_TIMEOUT", "60"))
+
+
+def get_worker_count() -> int:
+    """Worker processes from WEB_CONCURRENCY ("auto" = one per CPU core)."""
+    value = os.getenv("WEB_CONCURRENCY", "1").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def sessions_shared_across_processes() -> bool:
+    """Whether sessions live in the Agent Engine rather than in process memory."""
+    return not (A2A_LOCAL_MODE and not os.getenv("AGENT_ENGINE_ID"))
+
+
+def serve(app_path: str, app, host: str = "0.0.0.0", port: int = 8080):
+    """
+    Run the app with uvicorn.
+    
+    Each worker is a separate process that builds its own runner, remote agents
+    and VertexAI services in the app lifespan; sessions are shared through the
+    Agent Engine. In A2A_LOCAL_MODE without AGENT_ENGINE_ID sessions are
+    in-memory, so we stay at one worker. A WebSocket stays on the worker that
+    accepted it, and a reconnect reloads the session from the Agent Engine, so
+    it may land on any worker.
+    
+    Args:
+        app_path: Import string of the app (e.g. "run_rest:app"), needed by workers
+        app: The app object, used directly in single-worker mode
+    """
+    workers = get_worker_count()
+    if workers > 1 and not sessions_shared_across_processes():
+        print(
+            f"WEB_CONCURRENCY={workers} ignored: in-memory sessions are per process. "
+            "Set AGENT_ENGINE_ID to share sessions across workers."
+        )
+        workers = 1
+
+    if workers == 1:
+        uvicorn.run(app, host=host, port=port)
+    else:
+        print(f"Starting {workers} worker processes...")
+        options = {}
+        # Older uvicorn versions have no worker healthcheck setting
+        if "timeout_worker_healthcheck" in inspect.signature(uvicorn.Config).parameters:
+            options["timeout_worker_healthcheck"] = WORKER_STARTUP_TIMEOUT
+        uvicorn.run(app_path, host=host, port=port, workers=workers, **options)
@@ -1,25 +1,44 @@
 """Tools for Orchestrator Agent."""
 
+import os
+import re
+
 from google.adk.tools import ToolContext
 
+from .preferences import learn_from_approval, learn_from_rejection
+
+
+# Proposal sections a rejection can revise, in proposal order
+SECTIONS = ("route", "accommodation", "activities")
+
+# Hand off to proposal_agent in capture_request's own response, saving the root
+# model call that would otherwise decide on the transfer. Generation still runs
+# inline in the turn; it is not started in the background.
+DIRECT_PROPOSAL_HANDOFF = os.getenv("DIRECT_PROPOSAL_HANDOFF", "FALSE").upper() == "TRUE"
+
+
+def missing_request_details(request: dict) -> list[str]:
+    """Details a request needs before proposal_agent can plan it."""
+    missing = []
+    if not str(request.get("start_location") or "").strip():
+        missing.append("origin")
+    if not str(request.get("destination") or "").strip():
+        missing.append("destination")
+    try:
+        days = int(request.get("duration_days") or 0)
+    except (TypeError, ValueError):
+        days = 0
+    if days < 1:
+        missing.append("number of days")
+    return missing
 
-def store_proposal_response(
-    proposal_text: str,
-    destination: str,
-    tool_context: ToolContext,
-) -> str:
-    """
-    Store the proposal response from sub-agent in orchestrator's session.
-    Call this AFTER receiving proposal_agent or iterative_agent response.
-    
-    Args:
-        proposal_text: The full trip proposal text to store
-        destination: The trip destination
-    """
-    tool_context.state["pending_proposal"] = proposal_text
-    tool_context.state["trip_destination"] = destination
-    tool_context.state["awaiting_approval"] = True
-    return f"Proposal for {destination} stored. Please review and say 'approve' or provide feedback."
+
+def parse_sections(sections) -> list[str]:
+    """Known sections named in a list or comma-separated string, in proposal order."""
+    if isinstance(sections, str):
+        sections = re.split(r"[,/\s]+", sections)
+    names = {str(section).strip().lower() for section in sections or []}
+    return [section for section in SECTIONS if section in names]
 
 
 def show_final_plan(
@@ -95,31 +114,19 @@ def capture_request(
     session_id = getattr(tool_context, 'session_id', None)
     if session_id:
         tool_context.state["orchestrator_session_id"] = session_id
-    
-    return f"Request captured: {duration_days} day trip to {destination} from {start_location}. Delegating to proposal_agent."
-
 
-def get_delegation_message(
-    task_description: str,
-    tool_context: ToolContext,
-) -> str:
-    """
-    Get a message with session marker for delegating to sub-agents.
-    Call this before delegating to proposal_agent or iterative_agent.
+    missing = missing_request_details(tool_context.state["request"])
+    if missing:
+        # Never hand off an incomplete request: the root agent confirms it first
+        return (
+            f"Request captured, but the {', '.join(missing)} is missing. "
+            "Ask the user for it before delegating to proposal_agent."
+        )
+    if DIRECT_PROPOSAL_HANDOFF:
+        # ADK runs the transfer (and the A2A delegation) right after this tool's response
+        tool_context.actions.transfer_to_agent = "proposal_agent"
     
-    Args:
-        task_description: What to tell the sub-agent to do
-    
-    Returns:
-        Message with [SESSION:xxx] marker for session sharing
-    """
-    session_id = tool_context.state.get("orchestrator_session_id")
-    if not session_id:
-        session_id = getattr(tool_context, 'session_id', None)
-    
-    if session_id:
-        return f"[SESSION:{session_id}] {task_description}"
-    return task_description
+    return f"Request captured: {duration_days} day trip to {destination} from {start_location}. Delegating to proposal_agent."
 
 
 def process_approval(
@@ -127,6 +134,7 @@ def process_approval(
 ) -> str:
     """Process approval and finalize the trip."""
     proposal = tool_context.state.get("pending_proposal", "")
+    learn_from_approval(tool_context.session.user_id, proposal)
     tool_context.state["final_proposal"] = proposal
     tool_context.state["awaiting_approval"] = False
     tool_context.state["trip_finalized"] = True
@@ -137,7 +145,7 @@ def process_approval(
 
 def process_rejection(
     feedback: str,
-    affected_section: str,
+    affected_sections: list[str],
     tool_context: ToolContext,
 ) -> str:
     """
@@ -145,11 +153,14 @@ def process_rejection(
     
     Args:
         feedback: What the user wants changed
-        affected_section: Which section to fix (route/accommodation/activities)
+        affected_sections: Every section the feedback touches (route/accommodation/activities)
     """
+    # Feedback that names no known section revises the whole plan
+    sections = parse_sections(affected_sections) or list(SECTIONS)
     tool_context.state["feedback"] = feedback
-    tool_context.state["affected_section"] = affected_section
+    tool_context.state["affected_sections"] = sections
     tool_context.state["awaiting_approval"] = False
+    learn_from_rejection(tool_context.session.user_id, feedback)
     
     # Include full proposal for iterative agent to preserve other sections
     pending = tool_context.state.get("pending_proposal", "")
@@ -158,10 +169,10 @@ def process_rejection(
     # Return structured info for delegation - iterative agent needs the full context
     return f"""REVISION_REQUEST:
 FEEDBACK: {feedback}
-SECTION: {affected_section}
+SECTIONS: {', '.join(sections)}
 REQUEST: destination={request.get('destination', 'unknown')}, start={request.get('start_location', 'unknown')}, days={request.get('duration_days', '?')}
 CURRENT_PROPOSAL:
 {pending}
 
-Route to iterative_agent with this context to fix {affected_section} based on: {feedback}"""
+Route to iterative_agent with this context to fix {', '.join(sections)} based on: {feedback}"""
 
@@ -10,19 +10,23 @@ import uvicorn
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import (
     AgentCapabilities,
     AgentCard,
     AgentSkill,
 )
 from starlette.applications import Starlette
+from starlette.routing import Route
 
 from dotenv import load_dotenv
 load_dotenv()
 
 from agent import root_agent
 from agent_executor import ADKAgentExecutor
+from caching import context_cache
+from task_store import create_task_store
+from metrics import metrics_endpoint
+from tracing import setup_tracing, shutdown_tracing
 
 
 logging.basicConfig(level=logging.INFO)
@@ -49,6 +53,8 @@ def make_sync(f):
 async def main(host, port):
     """Start the Proposal Agent A2A server."""
     
+    setup_tracing("proposal_agent")
+    
     # Define agent skill
     skill = AgentSkill(
         id="ProposalGeneration",
@@ -87,8 +93,8 @@ async def main(host, port):
         supportsAuthenticatedExtendedCard=True,
     )
     
-    # Create task store
-    task_store = InMemoryTaskStore()
+    # Create durable task store (see TASK_STORE_BACKEND)
+    task_store = create_task_store()
     
     # Create request handler with our executor
     request_handler = DefaultRequestHandler(
@@ -107,6 +113,7 @@ async def main(host, port):
     )
     
     routes = a2a_app.routes()
+    routes.append(Route("/metrics", metrics_endpoint))
     app = Starlette(
         routes=routes,
         middleware=[],
@@ -120,15 +127,20 @@ async def main(host, port):
     print(f"Port: {port}")
     print(f"Service URL: {service_url}")
     print(f"Agent Engine ID: {os.getenv('AGENT_ENGINE_ID', 'NOT SET')}")
+    if os.getenv("A2A_LOCAL_MODE", "FALSE").upper() == "TRUE":
+        print(f"Local mode: in-memory services, model {os.getenv('MODEL_ID', 'gemini-2.5-pro')}")
     print("="*60)
     print("\nEndpoints:")
     print(f"  GET  {service_url}/.well-known/agent.json")
     print(f"  POST {service_url}/")
+    print(f"  GET  {service_url}/metrics")
     print("="*60 + "\n")
     
     config = uvicorn.Config(app, host=host, port=port, log_level='info')
     server = uvicorn.Server(config)
     await server.serve()
+    await context_cache.close()
+    shutdown_tracing()
 
 
 if __name__ == '__main__':
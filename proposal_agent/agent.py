@@ -18,9 +18,10 @@ from google.adk.tools import FunctionTool, load_memory
 from tools import (
     generate_route,
     generate_accommodation,
-    generate_activities,
+    format_activities,
     present_proposal,
 )
+from itinerary import create_activity_agent
 from prompts import (
     ROUTE_PROMPT,
     ACCOMMODATION_PROMPT,
@@ -31,6 +32,11 @@ from prompts import (
 
 MODEL_ID = os.getenv("MODEL_ID", "gemini-2.5-pro")
 
+if MODEL_ID.startswith("stub"):
+    # Offline stand-in model for local benchmarking (see stub_model.py)
+    from stub_model import register_stub_model
+    register_stub_model()
+
 
 # ============================================================================
 # PROPOSAL SUB-AGENTS
@@ -56,14 +62,12 @@ accommodation_agent = LlmAgent(
     ],
 )
 
-activity_agent = LlmAgent(
-    name="activity_agent",
+# Day ranges of long trips are generated in parallel (see itinerary.py)
+activity_agent = create_activity_agent(
     model=MODEL_ID,
-    instruction=ACTIVITY_PROMPT,
-    tools=[
-        FunctionTool(func=generate_activities),
-        load_memory,  # Can recall user's activity preferences
-    ],
+    prompt=ACTIVITY_PROMPT,
+    format_activities=format_activities,
+    tools=[load_memory],  # Each day range can recall user's activity preferences
 )
 
 finalizer_agent = LlmAgent(
@@ -1,6 +1,9 @@
 """A2A Agent Executor for Proposal Agent with Memory Bank support."""
 
+import hashlib
+import json
 import os
+import time
 import uuid
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
@@ -9,21 +12,51 @@ from a2a.server.tasks import TaskUpdater
 from a2a.types import Part, TaskState, TextPart
 from a2a.utils import new_agent_text_message, new_task
 
+from google.adk.events import Event, EventActions
 from google.adk.runners import Runner
 from google.genai import types
-from google.adk.memory import VertexAiMemoryBankService
-from google.adk.sessions import VertexAiSessionService
+from google.adk.memory import InMemoryMemoryService, VertexAiMemoryBankService
+from google.adk.sessions import InMemorySessionService, VertexAiSessionService
 
 from agent import root_agent
+from caching import context_cache
+from metrics import MetricsPlugin, STATE_BYTES, observe_services, track_turn
+from tools import event_text
+from tracing import trace_context, turn_span
 
 
 # Get Agent Engine ID from environment
 ENGINE_ID = os.getenv("AGENT_ENGINE_ID")
 
-if not ENGINE_ID:
+# Local stand-in mode: in-memory sessions and memory, no Agent Engine needed
+A2A_LOCAL_MODE = os.getenv("A2A_LOCAL_MODE", "FALSE").upper() == "TRUE"
+
+if not ENGINE_ID and not A2A_LOCAL_MODE:
     raise ValueError("AGENT_ENGINE_ID environment variable is required")
 
 
+# Keep at most this many compact records in state["conversation_history"]
+HISTORY_MAX_ENTRIES = int(os.getenv("HISTORY_MAX_ENTRIES", "10"))
+
+# Proposal sections fingerprinted in each history record
+SECTION_KEYS = ["route", "accommodation", "activities"]
+
+
+def _digest(text: str) -> str:
+    """Short content hash used to reference full text stored elsewhere."""
+    return hashlib.sha256((text or "").encode()).hexdigest()[:12]
+
+
+def _summarize(text: str, limit: int = 160) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _state_size(state: dict) -> int:
+    """Serialized size of session state in bytes."""
+    return len(json.dumps(state, default=str).encode())
+
+
 class ADKAgentExecutor(AgentExecutor):
     """A2A Executor that integrates ADK agents with VertexAI Memory Bank."""
     
@@ -39,8 +72,13 @@ class ADKAgentExecutor(AgentExecutor):
         self.artifact_name = artifact_name
         
         # Initialize VertexAI services for persistence
-        self.session_service = VertexAiSessionService(agent_engine_id=ENGINE_ID)
-        self.memory_service = VertexAiMemoryBankService(agent_engine_id=ENGINE_ID)
+        if A2A_LOCAL_MODE:
+            self.session_service = InMemorySessionService()
+            self.memory_service = InMemoryMemoryService()
+        else:
+            self.session_service = VertexAiSessionService(agent_engine_id=ENGINE_ID)
+            self.memory_service = VertexAiMemoryBankService(agent_engine_id=ENGINE_ID)
+        observe_services(self.session_service, self.memory_service)
         
         # CRITICAL: Use the SAME app_name across ALL agents for shared memory!
         # This must match orchestrator and iterative_agent
@@ -52,10 +90,19 @@ class ADKAgentExecutor(AgentExecutor):
             agent=agent,
             session_service=self.session_service,
             memory_service=self.memory_service,
+            plugins=[MetricsPlugin(), context_cache],
         )
 
     def _get_task_info(self, context: RequestContext):
-        """Safely extract task_id, context_id, and session_id from RequestContext."""
+        """Extract task_id, context_id, user_id, shared session_id and metadata.
+
+        The orchestrator sends its session id, user id, trace context, the
+        user's preference profile and the captured trip request as message
+        metadata (see the orchestrator's delegation.py); other callers fall
+        back to the A2A context id as user.
+        """
+        metadata = (context.message.metadata if context.message else None) or {}
+
         # Try different attribute patterns based on A2A SDK version
         task_id = (
             getattr(context, 'task_id', None) or
@@ -71,22 +118,25 @@ class ADKAgentExecutor(AgentExecutor):
             "default_user"
         )
         
-        # Try to extract session_id from context for session sharing
+        user_id = metadata.get("user_id") or context_id
+        
+        # Orchestrator session to share, if the caller sent one
         session_id = (
+            metadata.get("session_id") or
             getattr(context, 'session_id', None) or
             getattr(getattr(context, 'task', None), 'session_id', None) or
             None
         )
         
-        return task_id, context_id, session_id
-    
-    def _extract_session_from_message(self, message: str) -> str | None:
-        """Extract session_id from message if passed in format [SESSION:xxx]."""
-        import re
-        match = re.search(r'\[SESSION:([^\]]+)\]', message)
-        if match:
-            return match.group(1)
-        return None
+        return task_id, context_id, user_id, session_id, metadata
+
+    def _record_state_size(self, session_id: str, state: dict) -> int:
+        """Track and log the serialized state size of a session."""
+        size = _state_size(state)
+        STATE_BYTES.labels("proposal_agent").observe(size)
+        history = state.get("conversation_history", [])
+        print(f"[Proposal Agent] Session {session_id} state: {size} bytes, {len(history)} history entries")
+        return size
 
     async def cancel(
         self,
@@ -103,22 +153,29 @@ class ADKAgentExecutor(AgentExecutor):
         context: RequestContext,
         event_queue: EventQueue,
     ) -> None:
-        """Execute the agent and handle Memory Bank operations."""
+        """Execute the request in a span joined to the orchestrator's trace."""
         if not context.message:
             raise ValueError('Message should be present in request context')
 
-        query = context.get_user_input()
-        
+        # Continue the caller's trace, if it sent one
+        metadata = context.message.metadata or {}
+        trace_parent = trace_context(metadata.get("traceparent"))
+        with turn_span("a2a_execute proposal_agent", context=trace_parent), track_turn("a2a"):
+            await self._execute(context, event_queue, context.get_user_input())
+
+    async def _execute(
+        self,
+        context: RequestContext,
+        event_queue: EventQueue,
+        query: str,
+    ) -> None:
+        """Execute the agent and handle Memory Bank operations."""
         # Safely extract task info from context
-        task_id, context_id, shared_session_id = self._get_task_info(context)
-        user_id = context_id
+        task_id, context_id, user_id, shared_session_id, metadata = self._get_task_info(context)
         
-        # Also check if session_id is embedded in the message
-        if not shared_session_id:
-            shared_session_id = self._extract_session_from_message(query)
-            if shared_session_id:
-                # Remove the session marker from query
-                query = query.replace(f'[SESSION:{shared_session_id}]', '').strip()
+        # Learned preferences travel as metadata; the agents read them as text
+        if metadata.get("preferences"):
+            query = f"{query}\n\n{metadata['preferences']}"
         
         updater = TaskUpdater(event_queue, task_id, context_id)
         
@@ -150,6 +207,17 @@ class ADKAgentExecutor(AgentExecutor):
                 )
                 print(f"[Proposal Agent] Created new session {session.id} for user {user_id}")
             
+            # The captured request tells activity_agent how many days to split
+            if metadata.get("request"):
+                await self.session_service.append_event(
+                    session,
+                    Event(
+                        author="proposal_agent",
+                        invocation_id=f"request-{task_id}",
+                        actions=EventActions(state_delta={"request": metadata["request"]}),
+                    ),
+                )
+            
             # Build the content message
             content = types.Content(
                 role='user', 
@@ -164,17 +232,11 @@ class ADKAgentExecutor(AgentExecutor):
                 session_id=session.id, 
                 new_message=content
             ):
-                if (
-                    event.is_final_response()
-                    and event.content
-                    and event.content.parts
-                ):
-                    for part in event.content.parts:
-                        if hasattr(part, 'text') and part.text:
-                            response_text += part.text + '\n'
-                        elif hasattr(part, 'function_call'):
-                            # Function calls are handled internally by ADK
-                            pass
+                if event.is_final_response():
+                    # Includes the proposal passed through by the present tool
+                    text = event_text(event)
+                    if text:
+                        response_text += text + '\n'
 
             # Get updated session with state after execution
             session = await self.session_service.get_session(
@@ -183,16 +245,32 @@ class ADKAgentExecutor(AgentExecutor):
                 session_id=session.id,
             )
             
-            # Store conversation content in state for memory extraction
+            # Record a compact history entry; the full text lives once in
+            # pending_proposal (written by the tools) and in the task artifact
             state = session.state or {}
             conversation_history = state.get("conversation_history", [])
             conversation_history.append({
-                "user_request": query,
-                "agent_response": response_text,
                 "agent": "proposal_agent",
+                "task_id": task_id,
+                "at": int(time.time()),
+                "request_hash": _digest(query),
+                "request_summary": _summarize(query),
+                "response_hash": _digest(response_text),
+                "response_summary": _summarize(response_text),
+                "section_hashes": {
+                    key: _digest(state[key]) for key in SECTION_KEYS if state.get(key)
+                },
             })
-            session.state["conversation_history"] = conversation_history[-10:]
-            session.state["last_proposal"] = response_text
+            history_event = Event(
+                author="proposal_agent",
+                invocation_id=f"history-{task_id}",
+                actions=EventActions(state_delta={
+                    "conversation_history": conversation_history[-HISTORY_MAX_ENTRIES:],
+                }),
+            )
+            await self.session_service.append_event(session, history_event)
+            # The stored state after this turn, history entry included
+            self._record_state_size(session.id, {**state, **history_event.actions.state_delta})
             
             # ALWAYS save to Memory Bank after every execution
             try:
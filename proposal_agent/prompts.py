@@ -28,16 +28,16 @@ When you have destination info:
 Generate immediately without asking for budget or preferences.
 """
 
-ACTIVITY_PROMPT = """You generate activity and itinerary plans.
+ACTIVITY_PROMPT = """You generate activity and itinerary plans for one range of days of a trip.
 
 DO NOT ASK ANY QUESTIONS. Just generate the activities.
 
-When you have destination info:
-1. Optionally check load_memory for preferences
-2. Call generate_activities with:
-   - activities: list of recommended activities
-   - highlights: must-see places
-   - schedule: day-by-day activity schedule
+Other agents plan the other day ranges of the same trip at the same time.
+Optionally check load_memory for the user's activity preferences.
+Plan ONLY the day range given below, near where the traveller stays, and return:
+   - activities: list of recommended activities for these days
+   - highlights: must-see places for these days
+   - schedule: day-by-day activity schedule, numbered with the trip's day numbers
 
 Generate immediately without asking about interests.
 """
@@ -3,6 +3,10 @@
 from google.adk.tools import ToolContext
 
 
+# Tools whose result is shown to the user verbatim (see event_text)
+PRESENT_TOOLS = {"present_proposal"}
+
+
 def generate_route(
     route_description: str,
     transportation: str,
@@ -37,23 +41,19 @@ Locations: {locations}"""
     return "Accommodation plan saved to state."
 
 
-def generate_activities(
+def format_activities(
     activities: str,
     highlights: str,
     schedule: str,
-    tool_context: ToolContext,
 ) -> str:
-    """Generate activity plan and save to state."""
-    activities_plan = f"""ACTIVITIES & ITINERARY:
+    """Activity plan text, merged from the day ranges of activity_agent."""
+    return f"""ACTIVITIES & ITINERARY:
 {activities}
 
 Highlights: {highlights}
 
 Schedule:
 {schedule}"""
-    
-    tool_context.state["activities"] = activities_plan
-    return "Activities plan saved to state."
 
 
 def present_proposal(
@@ -102,6 +102,33 @@ Please review this proposal and reply with:
     
     tool_context.state["pending_proposal"] = proposal
     tool_context.state["awaiting_approval"] = True
+    # The rendered proposal is the reply: end the turn without a model echo
+    tool_context.actions.skip_summarization = True
     
     return proposal
 
+
+# ============================================================================
+# PASSTHROUGH - presented proposals go to the client as the tool result
+# ============================================================================
+
+def event_text(event) -> str:
+    """User-facing text of an event: model text or a presented proposal.
+
+    The present tools end the model turn with skip_summarization, so their
+    rendered proposal arrives as a function response instead of being echoed
+    back by the model as text.
+    """
+    if not event.content or not event.content.parts:
+        return ""
+    text = ""
+    for part in event.content.parts:
+        if part.text:
+            text += part.text
+        elif (
+            part.function_response
+            and part.function_response.name in PRESENT_TOOLS
+            and event.actions.skip_summarization
+        ):
+            text += str((part.function_response.response or {}).get("result", ""))
+    return text
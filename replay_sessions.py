@@ -0,0 +1,409 @@
+"""Replay recorded sessions against the agent graph as a regression benchmark.
+
+Export real sessions from the configured session service (Agent Engine,
+SESSION_DB_URL or in-memory), then replay them offline: every model call is
+answered from the recording, while tools, callbacks, plugins and state
+transitions run for real. Each turn reports latency, model and tool calls,
+prompt size and state size, so two code versions can be compared on
+production-shaped traffic without spending model tokens.
+
+Usage:
+    # Export sessions (all of a user's sessions, or specific ones)
+    python replay_sessions.py export --user-id user123 -o recordings.jsonl
+    python replay_sessions.py export --user-id user123 --session-id abc -o recordings.jsonl
+
+    # Replay through hitl_agent.agent.root_agent (default) or an A2A executor
+    python replay_sessions.py replay recordings.jsonl -o before.json
+    python replay_sessions.py replay recordings.jsonl --target proposal_agent -o before.json
+
+    # Change the code, replay again, compare
+    python replay_sessions.py replay recordings.jsonl -o after.json
+    python replay_sessions.py compare before.json after.json
+
+Each target runs in its own process: the A2A agents use flat imports and
+register the same metric names as hitl_agent.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict, deque
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure project root is on sys.path so we can import hitl_agent before installing.
+ROOT_DIR = Path(__file__).resolve().parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+load_dotenv()
+
+
+APP_NAME = "hitl_trip_planner"
+TARGETS = ["hitl_agent", "proposal_agent", "iterative_agent"]
+NO_RECORDING = "[replay] No recorded model response for this call."
+
+
+def _isolate_environment(workdir: str) -> None:
+    """Keep replays offline and away from the real local stores."""
+    os.environ["CONTEXT_CACHE_ENABLED"] = "FALSE"
+    os.environ["SPECULATION_ENABLED"] = "FALSE"
+    os.environ["TRACE_EXPORTER"] = "none"
+    os.environ["PREFERENCE_STORE_PATH"] = os.path.join(workdir, "preferences.db")
+    os.environ["TASK_STORE_BACKEND"] = "memory"
+    # The A2A executors require it at import; replay swaps in local services
+    os.environ.setdefault("AGENT_ENGINE_ID", "replay")
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+async def export_sessions(user_id: str, session_ids: list[str], out_path: str) -> int:
+    from hitl_agent.services import get_session_service
+
+    session_service = get_session_service()
+    if not session_ids:
+        listed = await session_service.list_sessions(app_name=APP_NAME, user_id=user_id)
+        session_ids = [session.id for session in listed.sessions]
+
+    exported = 0
+    with open(out_path, "w") as f:
+        for session_id in session_ids:
+            session = await session_service.get_session(
+                app_name=APP_NAME, user_id=user_id, session_id=session_id,
+            )
+            if session is None:
+                print(f"[Replay] Session {session_id} not found, skipped")
+                continue
+            f.write(session.model_dump_json(exclude_none=True) + "\n")
+            exported += 1
+            print(f"[Replay] Exported session {session_id} ({len(session.events)} events)")
+    return exported
+
+
+# ============================================================================
+# RECORDINGS
+# ============================================================================
+
+def load_recordings(path: str) -> list:
+    from google.adk.sessions import Session
+
+    with open(path) as f:
+        return [Session.model_validate_json(line) for line in f if line.strip()]
+
+
+def _agent_names(agent) -> set[str]:
+    names = {agent.name}
+    for sub_agent in agent.sub_agents:
+        names |= _agent_names(sub_agent)
+    return names
+
+
+def recorded_turns(session, agent_names: set[str]) -> list[dict]:
+    """Turns of a session handled by the given agents, in order.
+
+    A turn is one invocation: the user message that started it and the model
+    responses of each agent, in the order they were produced.
+    """
+    invocations = defaultdict(lambda: {"message": None, "responses": []})
+    for event in session.events:
+        if event.partial or not event.content or not event.content.parts:
+            continue
+        turn = invocations[event.invocation_id]
+        if event.author == "user":
+            if turn["message"] is None:
+                turn["message"] = event.content
+        elif event.content.role == "model":
+            turn["responses"].append(event)
+
+    turns = []
+    for invocation_id, turn in invocations.items():
+        authors = {event.author for event in turn["responses"]}
+        if turn["message"] is None or not authors or not authors <= agent_names:
+            continue
+        turns.append({"invocation_id": invocation_id, **turn})
+    return turns
+
+
+# ============================================================================
+# RECORDED MODEL
+# ============================================================================
+
+def _make_recorded_model_plugin():
+    from google.adk.models import LlmResponse
+    from google.adk.plugins.base_plugin import BasePlugin
+    from google.genai import types
+
+    class RecordedModelPlugin(BasePlugin):
+        """Answers every model call from the current turn's recorded responses."""
+
+        def __init__(self):
+            super().__init__(name="recorded_model")
+            self._responses: dict[str, deque] = {}
+            self.stats = {}
+
+        def start_turn(self, turn: dict) -> None:
+            self._responses = defaultdict(deque)
+            for event in turn["responses"]:
+                self._responses[event.author].append(event)
+            self.stats = {"model_calls": 0, "tool_calls": 0, "prompt_chars": 0, "missing_responses": 0}
+
+        async def before_model_callback(self, *, callback_context, llm_request):
+            self.stats["model_calls"] += 1
+            self.stats["prompt_chars"] += len(str(llm_request.config.system_instruction or ""))
+            for content in llm_request.contents:
+                self.stats["prompt_chars"] += sum(len(part.text or "") for part in content.parts or [])
+
+            queue = self._responses.get(callback_context.agent_name)
+            if not queue:
+                self.stats["missing_responses"] += 1
+                return LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=NO_RECORDING)])
+                )
+            event = queue.popleft()
+            return LlmResponse(content=event.content, usage_metadata=event.usage_metadata)
+
+        async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+            self.stats["tool_calls"] += 1
+            return None
+
+    return RecordedModelPlugin()
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+class HitlTarget:
+    """Replays turns through hitl_agent.agent.root_agent and the runner plugins."""
+
+    def __init__(self, recorded_model):
+        from google.adk.memory import InMemoryMemoryService
+        from google.adk.runners import Runner
+        from google.adk.sessions import InMemorySessionService
+
+        from hitl_agent.agent import root_agent
+        from hitl_agent.plugins import get_plugins
+
+        self.agent = root_agent
+        self.session_service = InMemorySessionService()
+        # Last, so request-rewriting plugins shape the request it measures
+        self.runner = Runner(
+            agent=root_agent,
+            app_name=APP_NAME,
+            session_service=self.session_service,
+            memory_service=InMemoryMemoryService(),
+            plugins=get_plugins() + [recorded_model],
+        )
+
+    async def run_turn(self, session, message) -> None:
+        async for _ in self.runner.run_async(
+            user_id=session.user_id, session_id=session.id, new_message=message,
+        ):
+            pass
+
+
+class A2ATarget:
+    """Replays turns through an A2A agent's ADKAgentExecutor.execute()."""
+
+    def __init__(self, name: str, recorded_model):
+        from google.adk.memory import InMemoryMemoryService
+        from google.adk.runners import Runner
+        from google.adk.sessions import InMemorySessionService
+
+        sys.path.insert(0, str(ROOT_DIR / name))
+        from agent import root_agent
+        from agent_executor import ADKAgentExecutor
+
+        self.agent = root_agent
+        self.executor = ADKAgentExecutor(agent=root_agent)
+        # Same executor code, local services, model answered from the recording
+        self.session_service = InMemorySessionService()
+        self.executor.session_service = self.session_service
+        self.executor.memory_service = InMemoryMemoryService()
+        self.executor.runner = Runner(
+            app_name=self.executor.app_name,
+            agent=root_agent,
+            session_service=self.executor.session_service,
+            memory_service=self.executor.memory_service,
+            plugins=self.executor.runner.plugin_manager.plugins + [recorded_model],
+        )
+
+    async def run_turn(self, session, message) -> None:
+        from a2a.server.agent_execution import RequestContext
+        from a2a.server.events import EventQueue
+        from a2a.types import Message, MessageSendParams, Part, Role, TextPart
+
+        text = "".join(part.text or "" for part in message.parts)
+        context = RequestContext(
+            request=MessageSendParams(message=Message(
+                role=Role.user,
+                message_id=uuid.uuid4().hex,
+                parts=[Part(root=TextPart(text=text))],
+                metadata={"session_id": session.id, "user_id": session.user_id},
+            )),
+            task_id=uuid.uuid4().hex,
+            context_id=session.user_id,
+        )
+        event_queue = EventQueue()
+        try:
+            await self.executor.execute(context, event_queue)
+        finally:
+            # Nobody consumes the A2A task events here; drop them
+            await event_queue.close(immediate=True)
+
+
+async def replay(recordings_path: str, target_name: str) -> dict:
+    recorded_model = _make_recorded_model_plugin()
+    if target_name == "hitl_agent":
+        target = HitlTarget(recorded_model)
+    else:
+        target = A2ATarget(target_name, recorded_model)
+    agent_names = _agent_names(target.agent)
+
+    report = {"target": target_name, "recordings": recordings_path, "sessions": []}
+    for recording in load_recordings(recordings_path):
+        turns = recorded_turns(recording, agent_names)
+        if not turns:
+            continue
+        session = await target.session_service.create_session(
+            app_name=APP_NAME, user_id=recording.user_id, session_id=recording.id,
+        )
+        results = []
+        for index, turn in enumerate(turns):
+            recorded_model.start_turn(turn)
+            start = time.perf_counter()
+            error = None
+            try:
+                await target.run_turn(session, turn["message"])
+            except Exception as e:
+                error = str(e)
+            latency_ms = (time.perf_counter() - start) * 1000
+
+            session = await target.session_service.get_session(
+                app_name=APP_NAME, user_id=recording.user_id, session_id=recording.id,
+            )
+            results.append({
+                "turn": index,
+                "invocation_id": turn["invocation_id"],
+                "latency_ms": round(latency_ms, 2),
+                "state_bytes": len(json.dumps(session.state, default=str).encode()),
+                "recorded_model_calls": len(turn["responses"]),
+                **recorded_model.stats,
+                "error": error,
+            })
+        report["sessions"].append({"session_id": recording.id, "turns": results})
+        print(f"[Replay] Session {recording.id}: {len(results)} turns replayed")
+
+    report["summary"] = summarize(report)
+    return report
+
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+def summarize(report: dict) -> dict:
+    turns = [turn for session in report["sessions"] for turn in session["turns"]]
+    if not turns:
+        return {"turns": 0}
+    latencies = sorted(turn["latency_ms"] for turn in turns)
+    return {
+        "turns": len(turns),
+        "latency_ms_mean": round(sum(latencies) / len(turns), 2),
+        "latency_ms_p95": latencies[min(len(turns) - 1, int(len(turns) * 0.95))],
+        "model_calls": sum(turn["model_calls"] for turn in turns),
+        "tool_calls": sum(turn["tool_calls"] for turn in turns),
+        "prompt_chars": sum(turn["prompt_chars"] for turn in turns),
+        "state_bytes_mean": round(sum(turn["state_bytes"] for turn in turns) / len(turns)),
+        "state_bytes_max": max(turn["state_bytes"] for turn in turns),
+        "missing_responses": sum(turn["missing_responses"] for turn in turns),
+        "errors": sum(1 for turn in turns if turn["error"]),
+    }
+
+
+def compare(before: dict, after: dict) -> None:
+    print(f"\n{'Metric':<20} {'Before':>14} {'After':>14} {'Change':>10}")
+    print("-" * 61)
+    for metric, old in before["summary"].items():
+        new = after["summary"].get(metric)
+        if new is None:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else ""
+        print(f"{metric:<20} {old:>14} {new:>14} {change:>10}")
+
+    # Turns whose shape changed, not just their timing
+    old_turns = {
+        (session["session_id"], turn["invocation_id"]): turn
+        for session in before["sessions"] for turn in session["turns"]
+    }
+    changed = []
+    for session in after["sessions"]:
+        for turn in session["turns"]:
+            old = old_turns.get((session["session_id"], turn["invocation_id"]))
+            if old and any(old[key] != turn[key] for key in ("model_calls", "tool_calls", "missing_responses")):
+                changed.append((session["session_id"], turn, old))
+    if changed:
+        print(f"\n{len(changed)} turns changed model/tool calls:")
+        for session_id, turn, old in changed[:20]:
+            print(
+                f"  {session_id} turn {turn['turn']}: model calls {old['model_calls']} -> "
+                f"{turn['model_calls']}, tool calls {old['tool_calls']} -> {turn['tool_calls']}"
+            )
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export sessions to a JSONL file")
+    export_parser.add_argument("--user-id", required=True)
+    export_parser.add_argument("--session-id", action="append", default=[],
+                               help="Session to export (repeatable; default: all of the user's)")
+    export_parser.add_argument("-o", "--output", default="recordings.jsonl")
+
+    replay_parser = commands.add_parser("replay", help="Replay exported sessions")
+    replay_parser.add_argument("recordings")
+    replay_parser.add_argument("--target", choices=TARGETS, default="hitl_agent")
+    replay_parser.add_argument("-o", "--output", default="replay_report.json")
+
+    compare_parser = commands.add_parser("compare", help="Compare two replay reports")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        count = asyncio.run(export_sessions(args.user_id, args.session_id, args.output))
+        print(f"Exported {count} sessions to {args.output}")
+
+    elif args.command == "replay":
+        with tempfile.TemporaryDirectory() as workdir:
+            _isolate_environment(workdir)
+            report = asyncio.run(replay(args.recordings, args.target))
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(json.dumps(report["summary"], indent=2))
+        print(f"Report written to {args.output}")
+
+    else:
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        compare(before, after)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,11 @@ from google.genai import types
 
 from hitl_agent.agent import root_agent
 from hitl_agent.services import get_session_service, get_memory_service
+from hitl_agent.caching import context_cache
+from hitl_agent.plugins import get_plugins
+from hitl_agent.tools import event_text
+from hitl_agent.metrics import observe_services, track_turn
+from hitl_agent.tracing import setup_tracing, turn_span, shutdown_tracing
 
 
 # Load environment variables
@@ -20,8 +25,10 @@ async def run_hitl_agent():
     """Run the HITL agent in a local interactive loop."""
     
     # Setup services
+    setup_tracing("hitl_agent")
     session_service = get_session_service()
     memory_service = get_memory_service()
+    observe_services(session_service, memory_service)
     
     # Create runner
     runner = Runner(
@@ -29,6 +36,7 @@ async def run_hitl_agent():
         app_name="hitl_agent",
         session_service=session_service,
         memory_service=memory_service,
+        plugins=get_plugins(),
     )
     
     # Create a new session
@@ -74,40 +82,37 @@ async def run_hitl_agent():
             # Run the agent
             print("\nAgent: ", end="", flush=True)
             
-            content = types.Content(
-                role="user",
-                parts=[types.Part(text=user_input)]
-            )
+            with turn_span("local_turn", user_id, session.id), track_turn("cli"):
+                content = types.Content(
+                    role="user",
+                    parts=[types.Part(text=user_input)]
+                )
             
-            response_text = ""
-            async for event in runner.run_async(
-                user_id=user_id,
-                session_id=session.id,
-                new_message=content,
-            ):
-                # Handle different event types
-                if hasattr(event, "content") and event.content:
-                    if hasattr(event.content, "parts"):
-                        for part in event.content.parts:
-                            if hasattr(part, "text") and part.text:
-                                response_text += part.text
+                response_text = ""
+                async for event in runner.run_async(
+                    user_id=user_id,
+                    session_id=session.id,
+                    new_message=content,
+                ):
+                    # Handle different event types
+                    response_text += event_text(event)
                 
-                # Check for tool calls and their results
-                if hasattr(event, "actions"):
-                    for action in event.actions:
-                        if hasattr(action, "tool_response"):
-                            # Tool response contains the actual output
-                            pass
+                    # Check for tool calls and their results
+                    if hasattr(event, "actions"):
+                        for action in event.actions:
+                            if hasattr(action, "tool_response"):
+                                # Tool response contains the actual output
+                                pass
             
-            if response_text:
-                print(response_text)
+                if response_text:
+                    print(response_text)
             
-            # Update session reference
-            session = await session_service.get_session(
-                app_name="hitl_agent",
-                user_id=user_id,
-                session_id=session.id,
-            )
+                # Update session reference
+                session = await session_service.get_session(
+                    app_name="hitl_agent",
+                    user_id=user_id,
+                    session_id=session.id,
+                )
             
         except KeyboardInterrupt:
             print("\n\nInterrupted. Ending session.")
@@ -116,6 +121,9 @@ async def run_hitl_agent():
             print(f"\nError: {e}")
             import traceback
             traceback.print_exc()
+    
+    await context_cache.close()
+    shutdown_tracing()
 
 
 def main():
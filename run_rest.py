@@ -7,49 +7,70 @@ Usage:
     
 Then call:
     POST /chat - Send message
+    POST /chat/batch - Run many messages, results streamed as NDJSON
     POST /end-session/{user_id}/{session_id} - End and save to memory
     GET /memories/{user_id} - Retrieve user's memories
 """
 
+import asyncio
+import json
 import os
 from typing import Optional
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import uvicorn
 
 from google.adk.runners import Runner
 from google.genai import types
 
 from hitl_agent.agent import root_agent
 from hitl_agent.services import get_session_service, get_memory_service
+from hitl_agent.caching import context_cache
+from hitl_agent.idempotency import IdempotencyConflict, IdempotencyStore, request_fingerprint
+from hitl_agent.plugins import get_plugins
+from hitl_agent.tools import event_text
+from hitl_agent.trips import trip_state
+from hitl_agent.serving import serve
+from hitl_agent.metrics import metrics_endpoint, observe_services, track_turn
+from hitl_agent.tracing import setup_tracing, turn_span, shutdown_tracing
 
 
 load_dotenv()
 
 
+# /chat/batch: items run at most this many at a time, and at most this many per batch
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+
 # Global services
 session_service = None
 memory_service = None
 runner = None
+idempotency = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize services on startup."""
-    global session_service, memory_service, runner
+    global session_service, memory_service, runner, idempotency
     
+    setup_tracing("hitl_agent")
     session_service = get_session_service()
     memory_service = get_memory_service()
+    observe_services(session_service, memory_service)
     
     runner = Runner(
         agent=root_agent,
         app_name="hitl_trip_planner",
         session_service=session_service,
         memory_service=memory_service,
+        plugins=get_plugins(),
     )
+    idempotency = IdempotencyStore()
     
     print("\n" + "="*60)
     print("HITL Agent REST API")
@@ -59,13 +80,17 @@ async def lifespan(app: FastAPI):
     print("="*60)
     print("\nEndpoints:")
     print("  POST /chat              - Send message to agent")
+    print("  POST /chat/batch        - Run many messages (NDJSON stream)")
     print("  POST /end-session/{user_id}/{session_id} - Save to memory")
     print("  GET  /memories/{user_id} - Get user's memories")
+    print("  GET  /metrics           - Prometheus metrics")
     print("="*60 + "\n")
     
     yield
     
     print("\nShutting down...")
+    await context_cache.close()
+    shutdown_tracing()
 
 
 app = FastAPI(
@@ -75,6 +100,16 @@ app = FastAPI(
 )
 
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """One span per request, parent of the ADK model/tool and service spans."""
+    with turn_span(f"{request.method} {request.url.path}"):
+        return await call_next(request)
+
+
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+
 # ============================================================================
 # Request/Response Models
 # ============================================================================
@@ -83,12 +118,18 @@ class ChatRequest(BaseModel):
     user_id: str
     session_id: Optional[str] = None
     message: str
+    request_id: Optional[str] = None  # retries with the same id run only once
 
 class ChatResponse(BaseModel):
     session_id: str
     response: str
     awaiting_approval: bool = False
     trip_finalized: bool = False
+    trip_id: Optional[str] = None  # The trip the two flags above describe
+
+class BatchChatRequest(BaseModel):
+    items: list[ChatRequest]
+    concurrency: Optional[int] = None  # capped at BATCH_CONCURRENCY
 
 class MemoriesResponse(BaseModel):
     user_id: str
@@ -100,79 +141,150 @@ class MemoriesResponse(BaseModel):
 # Endpoints
 # ============================================================================
 
+async def _run_chat(request: ChatRequest) -> ChatResponse:
+    """Run one chat turn; shared by /chat and /chat/batch."""
+    # Create or get session
+    if request.session_id:
+        try:
+            session = await session_service.get_session(
+                app_name="hitl_trip_planner",
+                user_id=request.user_id,
+                session_id=request.session_id,
+            )
+        except Exception:
+            # Session not found, create new
+            session = await session_service.create_session(
+                app_name="hitl_trip_planner",
+                user_id=request.user_id,
+            )
+    else:
+        session = await session_service.create_session(
+            app_name="hitl_trip_planner",
+            user_id=request.user_id,
+        )
+    
+    # Run agent
+    content = types.Content(
+        role="user",
+        parts=[types.Part(text=request.message)]
+    )
+    
+    # Track state from the events' state deltas instead of re-fetching the session
+    state = dict(session.state or {})
+    response_text = ""
+    async for event in runner.run_async(
+        user_id=request.user_id,
+        session_id=session.id,
+        new_message=content,
+    ):
+        if event.actions and event.actions.state_delta:
+            state.update(event.actions.state_delta)
+        response_text += event_text(event)
+    
+    # Note: Memory is automatically saved via after_agent_callback in the agent
+    # The callback extracts info from session events (conversation history)
+    # See: https://google.github.io/adk-docs/sessions/memory/
+    
+    trip = trip_state(state)
+    return ChatResponse(
+        session_id=session.id,
+        response=response_text or "No response generated.",
+        awaiting_approval=trip.get("awaiting_approval", False),
+        trip_finalized=trip.get("trip_finalized", False),
+        trip_id=trip.trip_id,
+    )
+
+
+async def _run_chat_once(request: ChatRequest) -> ChatResponse:
+    """Run a chat turn, deduplicated by request_id when the client sends one."""
+    if not request.request_id:
+        return await _run_chat(request)
+    
+    async def run() -> dict:
+        return (await _run_chat(request)).model_dump()
+    
+    result = await idempotency.run(
+        f"{request.user_id}:{request.request_id}",
+        request_fingerprint(request.session_id, request.message),
+        run,
+    )
+    return ChatResponse(**result)
+
+
 @app.post("/chat", response_model=ChatResponse)
+@track_turn("rest")
 async def chat(request: ChatRequest):
     """
     Send a message to the HITL agent.
     
     - First call: omit session_id to create a new session
     - Subsequent calls: include session_id to continue conversation
+    - Retries: send the same request_id to get the original response
+      instead of running the turn again
     """
     try:
-        # Create or get session
-        if request.session_id:
-            try:
-                session = await session_service.get_session(
-                    app_name="hitl_trip_planner",
-                    user_id=request.user_id,
-                    session_id=request.session_id,
-                )
-            except Exception:
-                # Session not found, create new
-                session = await session_service.create_session(
-                    app_name="hitl_trip_planner",
-                    user_id=request.user_id,
-                )
-        else:
-            session = await session_service.create_session(
-                app_name="hitl_trip_planner",
-                user_id=request.user_id,
-            )
-        
-        # Run agent
-        content = types.Content(
-            role="user",
-            parts=[types.Part(text=request.message)]
-        )
-        
-        response_text = ""
-        async for event in runner.run_async(
-            user_id=request.user_id,
-            session_id=session.id,
-            new_message=content,
-        ):
-            if hasattr(event, "content") and event.content:
-                if hasattr(event.content, "parts"):
-                    for part in event.content.parts:
-                        if hasattr(part, "text") and part.text:
-                            response_text += part.text
-        
-        # Get updated session state
-        session = await session_service.get_session(
-            app_name="hitl_trip_planner",
-            user_id=request.user_id,
-            session_id=session.id,
-        )
-        
-        state = session.state or {}
-        awaiting_approval = state.get("awaiting_approval", False)
-        trip_finalized = state.get("trip_finalized", False)
-        
-        # Note: Memory is automatically saved via after_agent_callback in the agent
-        # The callback extracts info from session events (conversation history)
-        # See: https://google.github.io/adk-docs/sessions/memory/
-        
-        return ChatResponse(
-            session_id=session.id,
-            response=response_text or "No response generated.",
-            awaiting_approval=awaiting_approval,
-            trip_finalized=trip_finalized,
-        )
-        
+        return await _run_chat_once(request)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """
+    Run many chat requests with bounded concurrency.
+    
+    Items for the same session run one after another, in batch order, so each
+    turn sees the state left by the one before it; only different sessions
+    run in parallel. Results are streamed as NDJSON, one line per item in completion order:
+    {"index": 0, "ok": true, "result": {...ChatResponse}} or
+    {"index": 1, "ok": false, "error": "..."}. A failed item never fails the batch.
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(request.items)} items; the limit is {BATCH_MAX_ITEMS}",
+        )
+    
+    concurrency = min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    # Items without a session_id each start a new session and need no lock
+    session_locks = {
+        (item.user_id, item.session_id): asyncio.Lock()
+        for item in request.items
+        if item.session_id
+    }
+    
+    async def run_item(index: int, item: ChatRequest) -> dict:
+        lock = session_locks.get((item.user_id, item.session_id)) or nullcontext()
+        # Take the session lock first so waiting items do not hold a batch slot
+        async with lock, semaphore:
+            with turn_span("batch_item", item.user_id, item.session_id), track_turn("batch"):
+                try:
+                    result = await _run_chat_once(item)
+                    return {"index": index, "ok": True, "result": result.model_dump()}
+                except Exception as e:
+                    print(f"[Batch] Item {index} failed: {e}")
+                    return {"index": index, "ok": False, "error": str(e)}
+    
+    async def stream():
+        tasks = [
+            asyncio.create_task(run_item(index, item))
+            for index, item in enumerate(request.items)
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            # Client went away: stop the remaining items
+            for task in tasks:
+                task.cancel()
+    
+    print(f"[Batch] {len(request.items)} items, concurrency {concurrency}")
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.post("/end-session/{user_id}/{session_id}")
 async def end_session(user_id: str, session_id: str):
     """
@@ -252,7 +364,7 @@ async def health():
 def main():
     port = int(os.getenv("PORT", 8080))
     print(f"Starting HITL Agent REST API on port {port}...")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    serve("run_rest:app", app, host="0.0.0.0", port=port)
 
 
 if __name__ == "__main__":
@@ -13,13 +13,19 @@ from dotenv import load_dotenv
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
-import uvicorn
 
 from google.adk.runners import Runner
 from google.genai import types
 
 from hitl_agent.agent import root_agent
 from hitl_agent.services import get_session_service, get_memory_service
+from hitl_agent.caching import context_cache
+from hitl_agent.plugins import get_plugins
+from hitl_agent.tools import event_text
+from hitl_agent.reconnect import ConnectionSnapshots, SessionUnavailable
+from hitl_agent.serving import serve
+from hitl_agent.metrics import metrics_endpoint, observe_services, track_turn, track_websocket
+from hitl_agent.tracing import setup_tracing, turn_span, shutdown_tracing
 
 
 load_dotenv()
@@ -29,15 +35,18 @@ load_dotenv()
 session_service = None
 memory_service = None
 runner = None
+snapshots = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize services on startup."""
-    global session_service, memory_service, runner
+    global session_service, memory_service, runner, snapshots
     
+    setup_tracing("hitl_agent")
     session_service = get_session_service()
     memory_service = get_memory_service()
+    observe_services(session_service, memory_service)
     
     # CRITICAL: Use the SAME app_name across ALL agents for shared memory!
     runner = Runner(
@@ -45,7 +54,9 @@ async def lifespan(app: FastAPI):
         app_name="hitl_trip_planner",
         session_service=session_service,
         memory_service=memory_service,
+        plugins=get_plugins(),
     )
+    snapshots = ConnectionSnapshots(session_service, memory_service, "hitl_trip_planner")
     
     print("\n" + "="*60)
     print("HITL Agent Web Interface")
@@ -57,9 +68,12 @@ async def lifespan(app: FastAPI):
     yield
     
     print("\nShutting down...")
+    await context_cache.close()
+    shutdown_tracing()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 
 # Store active sessions
@@ -182,6 +196,7 @@ HTML_PAGE = """
     
     <script>
         let ws;
+        let reconnectDelay = 1000;
         let sessionId = localStorage.getItem('sessionId');
         let userId = localStorage.getItem('userId') || 'user_' + Math.random().toString(36).substr(2, 8);
         localStorage.setItem('userId', userId);
@@ -192,6 +207,7 @@ HTML_PAGE = """
             ws = new WebSocket(wsUrl);
             
             ws.onopen = () => {
+                reconnectDelay = 1000;
                 addMessage('Connected to HITL Agent', 'system');
             };
             
@@ -206,12 +222,16 @@ HTML_PAGE = """
                     document.getElementById('send-btn').disabled = false;
                 } else if (data.type === 'memory_loaded') {
                     addMessage(`Memory loaded: ${data.count} items from previous sessions`, 'system');
+                } else if (data.type === 'error') {
+                    addMessage(data.text, 'system');
                 }
             };
             
             ws.onclose = () => {
                 addMessage('Disconnected. Reconnecting...', 'system');
-                setTimeout(connect, 2000);
+                // Jittered backoff so clients do not all reconnect at once after a deploy
+                setTimeout(connect, reconnectDelay + Math.random() * reconnectDelay);
+                reconnectDelay = Math.min(reconnectDelay * 2, 30000);
             };
         }
         
@@ -260,28 +280,23 @@ async def get_home():
 
 
 @app.websocket("/ws/{user_id}")
+@track_websocket
 async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Optional[str] = None):
     await websocket.accept()
+    session = None
     
     try:
-        # Create or retrieve session
-        if session_id:
-            try:
-                session = await session_service.get_session(
-                    app_name="hitl_trip_planner",
-                    user_id=user_id,
-                    session_id=session_id,
-                )
-            except Exception:
-                session = await session_service.create_session(
-                    app_name="hitl_trip_planner",
-                    user_id=user_id,
-                )
-        else:
-            session = await session_service.create_session(
-                app_name="hitl_trip_planner",
-                user_id=user_id,
-            )
+        # Resume the session (from the reconnect snapshot if recent) or create one
+        try:
+            session = await snapshots.open_session(user_id, session_id)
+        except SessionUnavailable as e:
+            print(f"Session {session_id} unavailable: {e}")
+            await websocket.send_json({
+                "type": "error",
+                "text": "Session service unavailable, retrying...",
+            })
+            await websocket.close(code=1011)
+            return
         
         await websocket.send_json({
             "type": "session",
@@ -289,23 +304,14 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Opt
             "user_id": user_id,
         })
         
-        # Load memory for this user
-        try:
-            memory_response = await memory_service.search_memory(
-                app_name="hitl_trip_planner",
-                user_id=user_id,
-                query="previous trip plans and preferences",
-            )
-            # SearchMemoryResponse has a .memories attribute
-            memory_list = getattr(memory_response, 'memories', []) or []
-            if memory_list:
-                await websocket.send_json({
-                    "type": "memory_loaded",
-                    "count": len(memory_list),
-                })
-                print(f"Loaded {len(memory_list)} memories for user {user_id}")
-        except Exception as e:
-            print(f"Memory search error: {e}")
+        # Memory count for this user (searched at most once per snapshot TTL)
+        memory_count = await snapshots.memory_count(user_id)
+        if memory_count:
+            await websocket.send_json({
+                "type": "memory_loaded",
+                "count": memory_count,
+            })
+            print(f"Loaded {memory_count} memories for user {user_id}")
         
         # Message loop
         while True:
@@ -315,35 +321,33 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Opt
             if not user_text:
                 continue
             
-            # Run agent
-            content = types.Content(
-                role="user",
-                parts=[types.Part(text=user_text)]
-            )
+            with turn_span("ws_turn", user_id, session.id), track_turn("ws"):
+                # Run agent
+                content = types.Content(
+                    role="user",
+                    parts=[types.Part(text=user_text)]
+                )
             
-            response_text = ""
-            async for event in runner.run_async(
-                user_id=user_id,
-                session_id=session.id,
-                new_message=content,
-            ):
-                if hasattr(event, "content") and event.content:
-                    if hasattr(event.content, "parts"):
-                        for part in event.content.parts:
-                            if hasattr(part, "text") and part.text:
-                                response_text += part.text
+                response_text = ""
+                async for event in runner.run_async(
+                    user_id=user_id,
+                    session_id=session.id,
+                    new_message=content,
+                ):
+                    response_text += event_text(event)
             
-            await websocket.send_json({
-                "type": "response",
-                "text": response_text or "No response generated.",
-            })
+                await websocket.send_json({
+                    "type": "response",
+                    "text": response_text or "No response generated.",
+                })
             
-            # Update session reference
-            session = await session_service.get_session(
-                app_name="hitl_trip_planner",
-                user_id=user_id,
-                session_id=session.id,
-            )
+                # Update session reference
+                session = await session_service.get_session(
+                    app_name="hitl_trip_planner",
+                    user_id=user_id,
+                    session_id=session.id,
+                ) or session
+                snapshots.remember(session)
             
             # Note: Memory is automatically saved via after_agent_callback in the agent
             # The callback extracts info from session events (conversation history)
@@ -353,8 +357,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Opt
         print(f"User {user_id} disconnected")
         # Save session to memory on disconnect
         try:
-            if session:
-                await memory_service.add_session_to_memory(session)
+            if await snapshots.save_to_memory(session):
                 print(f"Session saved to memory on disconnect")
         except Exception as e:
             print(f"Error saving on disconnect: {e}")
@@ -363,7 +366,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str, session_id: Opt
 def main():
     port = int(os.getenv("PORT", 8080))
     print(f"Starting HITL Agent Web Interface on port {port}...")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    serve("run_web:app", app, host="0.0.0.0", port=port)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+"""Request-id deduplication: claim, replay, lease and a cancelled caller."""
+
+import asyncio
+
+import pytest
+
+from hitl_agent.idempotency import IdempotencyConflict, IdempotencyStore
+
+
+class Turn:
+    """A chat turn that counts its runs and can be held until released."""
+
+    def __init__(self, hold: bool = False):
+        self.runs = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        if not hold:
+            self.release.set()
+
+    async def __call__(self) -> dict:
+        self.runs += 1
+        self.started.set()
+        await self.release.wait()
+        return {"response": f"run {self.runs}"}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "idempotency.db")
+
+
+@pytest.mark.asyncio
+async def test_duplicate_replays_the_stored_response(path):
+    turn = Turn()
+    store = IdempotencyStore(path=path)
+    assert await store.run("u1:r1", "fp", turn) == {"response": "run 1"}
+    assert await store.run("u1:r1", "fp", turn) == {"response": "run 1"}
+
+    # Another worker on the same host replays it too
+    assert await IdempotencyStore(path=path).run("u1:r1", "fp", turn) == {"response": "run 1"}
+    assert turn.runs == 1
+
+
+@pytest.mark.asyncio
+async def test_reused_request_id_with_another_request_conflicts(path):
+    store = IdempotencyStore(path=path)
+    await store.run("u1:r1", "fp", Turn())
+    with pytest.raises(IdempotencyConflict):
+        await store.run("u1:r1", "other", Turn())
+
+
+@pytest.mark.asyncio
+async def test_failed_run_stores_nothing(path):
+    store = IdempotencyStore(path=path)
+
+    async def fail():
+        raise RuntimeError("model unavailable")
+
+    with pytest.raises(RuntimeError):
+        await store.run("u1:r1", "fp", fail)
+    turn = Turn()
+    assert await store.run("u1:r1", "fp", turn) == {"response": "run 1"}
+    assert turn.runs == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_abort_the_run(path):
+    turn = Turn(hold=True)
+    store = IdempotencyStore(path=path)
+    original = asyncio.create_task(store.run("u1:r1", "fp", turn))
+    await turn.started.wait()
+    duplicate = asyncio.create_task(store.run("u1:r1", "fp", turn))
+    await asyncio.sleep(0)
+
+    # The client that sent the original disconnects
+    original.cancel()
+    await asyncio.sleep(0)
+    turn.release.set()
+
+    assert await duplicate == {"response": "run 1"}
+    assert original.cancelled()
+    assert await store.run("u1:r1", "fp", turn) == {"response": "run 1"}
+    assert turn.runs == 1
+
+
+@pytest.mark.asyncio
+async def test_running_lease_is_renewed_for_long_turns(path):
+    turn = Turn(hold=True)
+    running = IdempotencyStore(path=path, lease_seconds=0.3)
+    task = asyncio.create_task(running.run("u1:r1", "fp", turn))
+    await turn.started.wait()
+
+    # Past the first lease, another worker still sees the request running
+    await asyncio.sleep(0.5)
+    assert not IdempotencyStore(path=path)._claim("u1:r1", "fp")
+
+    turn.release.set()
+    assert await task == {"response": "run 1"}
+
+
+@pytest.mark.asyncio
+async def test_lease_of_a_crashed_worker_expires(path):
+    # A worker claimed the request and died without renewing the lease
+    assert IdempotencyStore(path=path, lease_seconds=0.1)._claim("u1:r1", "fp")
+    await asyncio.sleep(0.15)
+
+    turn = Turn()
+    assert await IdempotencyStore(path=path).run("u1:r1", "fp", turn) == {"response": "run 1"}
+    assert turn.runs == 1
@@ -0,0 +1,24 @@
+"""The agent packages import as packages, the way Agent Engine and adk web load them."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+@pytest.mark.parametrize("package, agent", [
+    ("orchestrator_agent", "get_root_agent()"),
+    ("hitl_agent", "root_agent"),
+])
+def test_package_imports(package, agent):
+    # A fresh interpreter, so no module directory another test put on sys.path
+    # can satisfy a flat sibling import
+    result = subprocess.run(
+        [sys.executable, "-c", f"import {package}; print({package}.{agent}.name)"],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip()
@@ -0,0 +1,56 @@
+"""Day-range chunking of activity generation."""
+
+from types import SimpleNamespace
+
+import pytest
+from google.adk.tools import load_memory
+
+from hitl_agent import itinerary
+from hitl_agent.itinerary import create_activity_agent, day_ranges
+
+
+@pytest.mark.parametrize("days, ranges", [
+    (1, [(1, 1)]),
+    (4, [(1, 4)]),
+    (5, [(1, 4), (5, 5)]),
+    (12, [(1, 4), (5, 8), (9, 12)]),
+    (16, [(1, 4), (5, 8), (9, 12), (13, 16)]),
+    # Past ACTIVITY_MAX_CHUNKS ranges, the ranges get longer instead
+    (17, [(1, 5), (6, 10), (11, 15), (16, 17)]),
+    (30, [(1, 8), (9, 16), (17, 24), (25, 30)]),
+])
+def test_day_ranges_cover_every_day_once(days, ranges):
+    assert day_ranges(days) == ranges
+
+
+@pytest.mark.parametrize("duration", [None, 0, -2, "", "a week"])
+def test_unknown_length_has_no_ranges(duration):
+    assert day_ranges(duration) == []
+
+
+def test_day_ranges_accept_numeric_strings():
+    assert day_ranges("6") == [(1, 4), (5, 6)]
+
+
+def format_activities(activities, highlights, schedule):
+    return f"{activities}|{highlights}|{schedule}"
+
+
+@pytest.mark.asyncio
+async def test_ranges_are_skipped_and_merged_in_day_order():
+    agent = create_activity_agent(
+        model="stub", prompt="Plan activities.", format_activities=format_activities,
+        tools=[load_memory],
+    )
+    assert len(agent.sub_agents) == itinerary.ACTIVITY_MAX_CHUNKS
+    assert all(load_memory in range_agent.tools for range_agent in agent.sub_agents)
+
+    state = {"request": {"destination": "Goa", "duration_days": 6}}
+    context = SimpleNamespace(state=state)
+    skipped = [await range_agent.before_agent_callback(context) is not None for range_agent in agent.sub_agents]
+    assert skipped == [False, False, True, True]
+
+    state["activity_days_1"] = {"activities": "beaches", "highlights": "Baga", "schedule": "Day 1-4"}
+    state["activity_days_2"] = {"activities": "forts", "highlights": "Aguada", "schedule": "Day 5-6"}
+    await agent.after_agent_callback(context)
+    assert state["activities"] == "beaches\nforts|Baga; Aguada|Day 1-4\nDay 5-6"
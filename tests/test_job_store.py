@@ -0,0 +1,47 @@
+"""/jobs records: shared between store instances and expired after the TTL."""
+
+import pytest
+
+from orchestrator_agent import job_store
+from orchestrator_agent.job_store import JobStore, QUEUED, RUNNING, SUCCEEDED
+
+
+@pytest.mark.asyncio
+async def test_job_lifecycle_is_visible_to_other_workers(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path=path)
+    job = await store.create(session_id="s1", user_id="u1")
+    assert job["status"] == QUEUED
+
+    # Another uvicorn worker opens its own store on the same file
+    other = JobStore(path=path)
+    assert (await other.get(job["job_id"]))["session_id"] == "s1"
+
+    await store.update(job, status=RUNNING)
+    assert (await other.get(job["job_id"]))["status"] == RUNNING
+    await store.update(job, status=SUCCEEDED, result={"response": "done"})
+    stored = await other.get(job["job_id"])
+    assert stored["status"] == SUCCEEDED
+    assert stored["result"] == {"response": "done"}
+
+
+@pytest.mark.asyncio
+async def test_jobs_expire_ttl_after_their_last_update(tmp_path, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(job_store.time, "time", lambda: now)
+    store = JobStore(path=str(tmp_path / "jobs.db"), ttl_seconds=60)
+    job = await store.create()
+
+    now += 50
+    await store.update(job, status=RUNNING)
+    now += 50
+    assert (await store.get(job["job_id"]))["status"] == RUNNING
+
+    now += 11
+    assert await store.get(job["job_id"]) is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_job_is_none(tmp_path):
+    store = JobStore(path=str(tmp_path / "jobs.db"))
+    assert await store.get("missing") is None
@@ -0,0 +1,55 @@
+"""Multi-city trips: splitting into legs and stitching the leg plans."""
+
+from hitl_agent.legs import build_legs, leg_for_feedback, stitch_legs, trip_path
+
+
+def test_legs_chain_the_cities_in_order():
+    legs = build_legs("Mumbai", ["Goa", "Hampi", "Bengaluru"], 9, [3, 2, 4])
+    assert legs == [
+        {"from": "Mumbai", "to": "Goa", "days": 3},
+        {"from": "Goa", "to": "Hampi", "days": 2},
+        {"from": "Hampi", "to": "Bengaluru", "days": 4},
+    ]
+    assert trip_path({"legs": legs}) == "Mumbai → Goa → Hampi → Bengaluru"
+
+
+def test_days_are_split_evenly_without_a_usable_split():
+    # Earlier cities get the remainder days
+    assert [leg["days"] for leg in build_legs("Delhi", ["Agra", "Jaipur"], 5)] == [3, 2]
+    # A split that does not fit the cities is ignored
+    assert [leg["days"] for leg in build_legs("Delhi", ["Agra", "Jaipur"], 6, [6])] == [3, 3]
+    assert [leg["days"] for leg in build_legs("Delhi", ["Agra", "Jaipur"], 6, [4, 0])] == [3, 3]
+    # Every city gets at least a day
+    assert [leg["days"] for leg in build_legs("Delhi", ["Agra", "Jaipur", "Udaipur"], 1)] == [1, 1, 1]
+
+
+def test_no_cities_no_legs():
+    assert build_legs("Delhi", ["", None], 4) == []
+
+
+def test_feedback_names_one_leg():
+    legs = build_legs("Mumbai", ["Goa", "Hampi"], 6)
+    assert leg_for_feedback(legs, "cheaper hotels in hampi") == 2
+    assert leg_for_feedback(legs, "fewer activities in Goa and Hampi") == 0
+    assert leg_for_feedback(legs, "faster trains") == 0
+
+
+def test_replanned_leg_is_stitched_with_the_kept_legs():
+    legs = build_legs("Mumbai", ["Goa", "Hampi"], 5, [3, 2])
+    state = {
+        "request": {"legs": legs},
+        "leg_plan_1": {"route": "train", "accommodation": "beach hut", "activities": "beaches"},
+        "leg_plan_2": {"route": "bus", "accommodation": "guesthouse", "activities": "temples"},
+    }
+    stitch_legs(state)
+    assert "Goa (days 1-3):\nbeaches" in state["activities"]
+    assert "Hampi (days 4-5):\ntemples" in state["activities"]
+
+    state.update(
+        affected_leg=2,
+        leg_plan_1={"route": "stale", "accommodation": "stale", "activities": "stale"},
+        leg_plan_2={"route": "bus", "accommodation": "homestay", "activities": "temples"},
+    )
+    stitch_legs(state, replan=True)
+    assert [plan["accommodation"] for plan in state["leg_plans"]] == ["beach hut", "homestay"]
+    assert state["accommodation"] == "ACCOMMODATIONS:\n\nGoa (leg 1):\nbeach hut\n\nHampi (leg 2):\nhomestay"
@@ -0,0 +1,39 @@
+"""WebSocket reconnect snapshots stay small and bounded."""
+
+import pytest
+from google.adk.memory import InMemoryMemoryService
+from google.adk.sessions import InMemorySessionService
+
+from hitl_agent import reconnect
+from hitl_agent.reconnect import ConnectionSnapshots, SessionSnapshot, SnapshotCache
+
+
+def test_put_purges_expired_entries(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr(reconnect.time, "monotonic", lambda: now)
+    cache = SnapshotCache(ttl_seconds=10, max_entries=3)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    now += 11
+    cache.put("c", 3)
+    assert list(cache._entries) == ["c"]
+
+    for key in "defg":
+        cache.put(key, 0)
+    assert list(cache._entries) == ["e", "f", "g"]
+
+
+@pytest.mark.asyncio
+async def test_quick_reconnect_keeps_only_the_session_version():
+    session_service = InMemorySessionService()
+    memory_service = InMemoryMemoryService()
+    snapshots = ConnectionSnapshots(session_service, memory_service, app_name="app")
+    session = await snapshots.open_session("u1")
+
+    resumed = await snapshots.open_session("u1", session.id)
+    assert isinstance(resumed, SessionSnapshot)
+    assert (resumed.id, resumed.last_update_time) == (session.id, session.last_update_time)
+
+    # Disconnecting with the snapshot saves the stored session, once
+    assert await snapshots.save_to_memory(resumed)
+    assert not await snapshots.save_to_memory(resumed)
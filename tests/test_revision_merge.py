@@ -0,0 +1,74 @@
+"""A revision from iterative_agent replaces only its sections in the stored proposal."""
+
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+from orchestrator_agent.agent import merge_revision
+
+
+ROOT = Path(__file__).parent.parent
+
+
+def load(agent: str, module: str):
+    spec = importlib.util.spec_from_file_location(f"{agent}_{module}", ROOT / agent / f"{module}.py")
+    loaded = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(loaded)
+    return loaded
+
+
+proposal_tools = load("proposal_agent", "tools")
+iterative_tools = load("iterative_agent", "tools")
+
+
+def tool_context(**state):
+    return SimpleNamespace(state=state, actions=SimpleNamespace())
+
+
+def make_proposal() -> str:
+    context = tool_context(request={"destination": "Goa", "start_location": "Mumbai", "duration_days": 3})
+    proposal_tools.generate_route("Mumbai to Goa along the coast", "Train", "9 hours", context)
+    proposal_tools.generate_accommodation("Taj Exotica", "INR 20,000", "Benaulim", context)
+    context.state["activities"] = proposal_tools.format_activities(
+        "Beaches and forts", "Fort Aguada", "Day 1: Baga\n\nDay 2: Old Goa",
+    )
+    return proposal_tools.present_proposal("A relaxed coastal trip", context).strip()
+
+
+def make_revision(**revised) -> str:
+    context = tool_context(feedback="cheaper", affected_sections=list(revised), **revised)
+    return iterative_tools.present_revised_proposal("Cheaper stays", context).strip()
+
+
+def test_revised_section_replaces_its_block():
+    proposal = make_proposal()
+    merged = merge_revision(proposal, make_revision(
+        accommodation="ACCOMMODATION (REVISED based on: cheaper):\nZostel Goa\n\nPrice Range: INR 1,500",
+    ))
+
+    assert "Zostel Goa" in merged
+    assert "Taj Exotica" not in merged
+    # Unchanged sections and the proposal frame are kept
+    assert "Mumbai to Goa along the coast" in merged
+    assert "Day 1: Baga\n\nDay 2: Old Goa" in merged
+    assert merged.startswith("=" * 80 + "\nTRIP PROPOSAL: Mumbai to Goa")
+    assert "SUMMARY: A relaxed coastal trip" in merged
+
+
+def test_several_revisions_in_a_row():
+    merged = merge_revision(make_proposal(), make_revision(
+        route="ROUTE PLAN (REVISED based on: faster):\nFly to Goa",
+        activities="ACTIVITIES & ITINERARY (REVISED based on: faster):\nDay 1: Beaches",
+    ))
+    merged = merge_revision(merged, make_revision(
+        route="ROUTE PLAN (REVISED based on: cheaper):\nOvernight bus",
+    ))
+
+    assert "Overnight bus" in merged
+    assert "Fly to Goa" not in merged
+    assert "Day 1: Beaches" in merged
+    assert "Taj Exotica" in merged
+
+
+def test_revision_without_a_matching_block_is_not_merged():
+    assert merge_revision("Free-form proposal text", make_revision(route="ROUTE PLAN: Fly")) == ""
@@ -0,0 +1,28 @@
+"""parse_sections: the sections a rejection revises, in proposal order."""
+
+import pytest
+
+from hitl_agent.tools import parse_sections as hitl_parse_sections
+from orchestrator_agent.tools import parse_sections as orchestrator_parse_sections
+
+
+@pytest.fixture(params=[hitl_parse_sections, orchestrator_parse_sections], ids=["hitl", "orchestrator"])
+def parse_sections(request):
+    return request.param
+
+
+@pytest.mark.parametrize("sections, expected", [
+    (["accommodation"], ["accommodation"]),
+    (["activities", "route"], ["route", "activities"]),
+    ("accommodation, activities", ["accommodation", "activities"]),
+    ("route/accommodation", ["route", "accommodation"]),
+    ("Activities Route", ["route", "activities"]),
+    ([" ROUTE ", "route"], ["route"]),
+])
+def test_sections_in_proposal_order(parse_sections, sections, expected):
+    assert parse_sections(sections) == expected
+
+
+@pytest.mark.parametrize("sections", [None, "", [], ["hotels", "budget"], "everything"])
+def test_unknown_sections_are_dropped(parse_sections, sections):
+    assert parse_sections(sections) == []
@@ -0,0 +1,174 @@
+"""Speculative revisions: served by process_rejection, within the token budget."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import AsyncGenerator
+
+import pytest
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from hitl_agent.agent import root_agent
+from hitl_agent.speculation import (
+    ESTIMATED_OUTPUT_TOKENS,
+    STATS_KEY,
+    Speculation,
+    SpeculationPlugin,
+    record_rejection,
+)
+from hitl_agent.tools import event_text
+from hitl_agent.trips import trip_key
+
+
+APP_NAME = "hitl_trip_planner"
+TRIP_ID = "goa-3f9a1c"
+FEEDBACK = "cheaper hotels"
+
+
+class RejectingLlm(BaseLlm):
+    """Root model that rejects the accommodation once, then just replies."""
+
+    model: str = "rejecting"
+    calls: int = 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        if self.calls == 1:
+            part = types.Part(function_call=types.FunctionCall(
+                name="process_rejection",
+                args={"feedback": FEEDBACK, "affected_sections": ["accommodation"]},
+            ))
+        else:
+            # Only reached when the speculation was not served
+            part = types.Part(text="Sending your feedback to the iterative agent.")
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+def trip_fields(**fields) -> dict:
+    return {trip_key(TRIP_ID, field): value for field, value in fields.items()}
+
+
+@pytest.mark.asyncio
+async def test_speculation_hit_returns_revised_proposal():
+    model = RejectingLlm()
+    agent = root_agent.clone(update={"model": model})
+    plugin = SpeculationPlugin()
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app_name=APP_NAME,
+        agent=agent,
+        session_service=session_service,
+        plugins=[plugin],
+    )
+    session = await session_service.create_session(
+        app_name=APP_NAME,
+        user_id="user",
+        state={
+            **trip_fields(
+                created_at=1.0,
+                selected_at=1.0,
+                request={"destination": "Goa", "start_location": "Mumbai", "duration_days": 3},
+                route="ROUTE: Mumbai to Goa by train",
+                accommodation="ACCOMMODATIONS: Taj Exotica, premium beach resort",
+                activities="ACTIVITIES: beaches and forts",
+                pending_proposal="TRIP PROPOSAL",
+                awaiting_approval=True,
+            ),
+        },
+    )
+    # A finished speculation, as _generate leaves it
+    speculation = Speculation("accommodation", FEEDBACK, trip_id=TRIP_ID)
+    speculation.fix_args = {
+        "improved_hotels": "Zostel Goa, budget hostel near Anjuna",
+        "price_range": "INR 1,500 per night",
+        "locations": "Anjuna",
+    }
+    plugin._speculations[session.id] = speculation
+
+    text = ""
+    authors = set()
+    async for event in runner.run_async(
+        user_id="user",
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text=f"reject: {FEEDBACK}")]),
+    ):
+        authors.add(event.author)
+        text += event_text(event)
+
+    assert "REVISED TRIP PROPOSAL" in text
+    assert "Zostel Goa" in text
+    # Served by process_rejection alone: no follow-up model call, no iterative_agent
+    assert model.calls == 1
+    assert "iterative_agent" not in authors
+
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id="user", session_id=session.id,
+    )
+    assert session.state[trip_key(TRIP_ID, "awaiting_approval")] is True
+    assert "Zostel Goa" in session.state[trip_key(TRIP_ID, "pending_proposal")]
+
+
+class HeldClient:
+    """genai client stand-in whose calls finish when released."""
+
+    def __init__(self, tokens_used: int):
+        self.tokens_used = tokens_used
+        self.release = asyncio.Event()
+        self.calls = 0
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self.generate_content))
+
+    async def generate_content(self, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        return SimpleNamespace(
+            usage_metadata=SimpleNamespace(total_token_count=self.tokens_used),
+            text=json.dumps({"improved_hotels": "Zostel Goa"}),
+        )
+
+
+@pytest.mark.asyncio
+async def test_running_speculations_reserve_the_token_budget():
+    state = {"accommodation": "ACCOMMODATIONS: Taj Exotica", "request": {"destination": "Goa"}}
+    for _ in range(3):
+        record_rejection(state, "accommodation", FEEDBACK)
+    assert state[STATS_KEY]
+
+    # Room for one speculation's estimate, not two
+    plugin = SpeculationPlugin(token_budget=ESTIMATED_OUTPUT_TOKENS * 2)
+    plugin._client = client = HeldClient(tokens_used=100)
+
+    plugin._start("s1", state, trip_id=None)
+    plugin._start("s2", state, trip_id=None)
+    assert list(plugin._speculations) == ["s1"]
+
+    # Settled against the actual usage, the budget has room again
+    client.release.set()
+    await plugin._speculations["s1"].task
+    assert plugin._tokens_spent() == 100
+    plugin._start("s2", state, trip_id=None)
+    assert "s2" in plugin._speculations
+    await plugin._speculations["s2"].task
+    assert client.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_speculation_is_charged_its_estimate():
+    state = {"accommodation": "ACCOMMODATIONS: Taj Exotica", "request": {"destination": "Goa"}}
+    for _ in range(3):
+        record_rejection(state, "accommodation", FEEDBACK)
+    plugin = SpeculationPlugin()
+    plugin._client = HeldClient(tokens_used=100)
+
+    plugin._start("s1", state, trip_id=None)
+    speculation = plugin._speculations["s1"]
+    await asyncio.sleep(0)
+    plugin._cancel("s1")
+    with pytest.raises(asyncio.CancelledError):
+        await speculation.task
+    assert plugin._reserved == {}
+    assert plugin._tokens_spent() == speculation.estimated_tokens
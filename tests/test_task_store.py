@@ -0,0 +1,86 @@
+"""A2A task store: per-key expiry, TTL by task state, backend selection."""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+from a2a.types import Task, TaskState, TaskStatus
+
+
+# proposal_agent and iterative_agent deploy identical copies with flat imports
+task_store = importlib.util.module_from_spec(importlib.util.spec_from_file_location(
+    "proposal_task_store", Path(__file__).parent.parent / "proposal_agent" / "task_store.py",
+))
+task_store.__spec__.loader.exec_module(task_store)
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key, (None, None))[0]
+
+    async def set(self, key, value, ttl=None):
+        self.values[key] = (value, ttl)
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+
+def make_task(state: TaskState) -> Task:
+    return Task(id="task-1", context_id="context-1", status=TaskStatus(state=state))
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_expires_keys(tmp_path, monkeypatch):
+    backend = task_store.SQLiteBackend(str(tmp_path / "tasks.db"))
+    now = 1_000_000.0
+    monkeypatch.setattr(task_store.time, "time", lambda: now)
+    await backend.set("short", "a", ttl=10)
+    await backend.set("forever", "b")
+
+    assert await backend.get("short") == "a"
+    now += 11
+    assert await backend.get("short") is None
+    assert await backend.get("forever") == "b"
+
+    await backend.delete("forever")
+    assert await backend.get("forever") is None
+
+
+@pytest.mark.asyncio
+async def test_unfinished_tasks_keep_max_age_and_finished_tasks_the_ttl():
+    backend = RecordingBackend()
+    store = task_store.KeyValueTaskStore(backend, ttl_seconds=60, max_age_seconds=3600)
+
+    await store.save(make_task(TaskState.working))
+    assert backend.values["a2a:task:task-1"][1] == 3600
+    await store.save(make_task(TaskState.completed))
+    assert backend.values["a2a:task:task-1"][1] == 60
+
+    loaded = await store.get("task-1")
+    assert loaded.status.state == TaskState.completed
+    await store.delete("task-1")
+    assert await store.get("task-1") is None
+
+
+def test_default_backend_refused_on_cloud_run(monkeypatch):
+    monkeypatch.setattr(task_store, "TASK_STORE_BACKEND", "")
+    monkeypatch.setenv("K_SERVICE", "proposal-agent-service")
+    with pytest.raises(RuntimeError, match="TASK_STORE_BACKEND"):
+        task_store.create_task_store()
+
+
+def test_default_backend_is_sqlite_locally(monkeypatch, tmp_path):
+    monkeypatch.setattr(task_store, "TASK_STORE_BACKEND", "")
+    monkeypatch.setattr(task_store, "TASK_STORE_PATH", str(tmp_path / "tasks.db"))
+    monkeypatch.delenv("K_SERVICE", raising=False)
+    store = task_store.create_task_store()
+    assert isinstance(store.backend, task_store.SQLiteBackend)
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setattr(task_store, "TASK_STORE_BACKEND", "postgres")
+    with pytest.raises(ValueError, match="Unknown TASK_STORE_BACKEND"):
+        task_store.create_task_store()
@@ -0,0 +1,85 @@
+"""Trip-scoped session state: trip keys, the current trip and find_trip."""
+
+from hitl_agent import trips
+from hitl_agent.trips import (
+    CURRENT_TRIP_KEY,
+    find_trip,
+    new_trip,
+    other_trips_text,
+    select_trip,
+    trip_ids,
+    trip_key,
+    trip_state,
+)
+
+
+def plan(state: dict, destination: str, now: float, monkeypatch):
+    monkeypatch.setattr(trips.time, "time", lambda: now)
+    trip = new_trip(state, destination)
+    trip["request"] = {"destination": destination}
+    return trip
+
+
+def next_turn(state: dict) -> None:
+    """temp: keys do not outlive their invocation."""
+    state.pop(CURRENT_TRIP_KEY, None)
+
+
+def test_trip_fields_live_under_the_trip_key(monkeypatch):
+    state = {}
+    trip = plan(state, "Goa", 1.0, monkeypatch)
+    trip["route"] = "by train"
+    trip["app:shared"] = 1
+
+    assert trip.trip_id.startswith("goa-")
+    assert state[trip_key(trip.trip_id, "route")] == "by train"
+    assert "route" not in state
+    # Non-trip keys pass through unchanged
+    assert state["app:shared"] == 1
+    assert trip.to_dict()["route"] == "by train"
+
+
+def test_trip_ids_are_unique_per_destination(monkeypatch):
+    state = {}
+    first = plan(state, "Goa", 1.0, monkeypatch)
+    second = plan(state, "Goa", 2.0, monkeypatch)
+    assert first.trip_id != second.trip_id
+    assert trip_ids(state) == [first.trip_id, second.trip_id]
+
+
+def test_current_trip_is_the_invocations_else_the_latest_selected(monkeypatch):
+    state = {}
+    goa = plan(state, "Goa", 1.0, monkeypatch)
+    next_turn(state)
+    jaipur = plan(state, "Jaipur", 2.0, monkeypatch)
+    assert trip_state(state).trip_id == jaipur.trip_id
+
+    # Naming a trip pins it for the invocation and makes it the default after
+    monkeypatch.setattr(trips.time, "time", lambda: 3.0)
+    assert select_trip(state, "goa").trip_id == goa.trip_id
+    next_turn(state)
+    assert trip_state(state).trip_id == goa.trip_id
+    assert other_trips_text(state) == f"Other trips in this session: {jaipur.trip_id} (in progress)"
+
+
+def test_find_trip_by_id_or_destination(monkeypatch):
+    state = {}
+    old_goa = plan(state, "Goa", 1.0, monkeypatch)
+    jaipur = plan(state, "Jaipur", 2.0, monkeypatch)
+    goa = plan(state, "Goa", 3.0, monkeypatch)
+
+    assert find_trip(state, old_goa.trip_id) == old_goa.trip_id
+    assert find_trip(state, jaipur.trip_id.upper()) == jaipur.trip_id
+    # A destination finds its latest trip, in either direction of containment
+    assert find_trip(state, "goa") == goa.trip_id
+    assert find_trip(state, "the Jaipur trip") == jaipur.trip_id
+    assert find_trip(state, "Kerala") is None
+    assert find_trip(state, " ") is None
+
+
+def test_sessions_without_trips_use_flat_keys():
+    state = {"route": "old route"}
+    trip = select_trip(state, "Goa")
+    assert trip.trip_id is None
+    assert trip["route"] == "old route"
+    assert CURRENT_TRIP_KEY not in state